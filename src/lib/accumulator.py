@@ -0,0 +1,75 @@
+import math
+
+
+class RunningStats:
+    """
+    Numerically stable single-pass accumulator of count, mean and variance
+
+    ----
+
+    Values are accumulated with Welford's algorithm, which keep the running mean and the sum of squared differences
+    from it (M2) instead of the raw sums, so no precision is lost on large values
+
+    |  Two accumulators built on different parts of the data can be merged with Chan's formula, which give the same
+    result as if every value had been accumulated by one of them
+    """
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0) -> None:
+        """
+        Class constructor
+
+        :param count: number of values already accumulated
+        :param mean: mean of the values already accumulated
+        :param m2: sum of squared differences from the mean of the values already accumulated
+        """
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float) -> None:
+        """
+        Accumulate one value
+
+        :param value: value to accumulate
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: 'RunningStats') -> None:
+        """
+        Merge the values accumulated by another accumulator into this one
+
+        :param other: accumulator to merge, it is left unchanged
+        """
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    @property
+    def variance(self) -> float:
+        """
+        Sample variance of the accumulated values
+
+        :return: variance of the values, 0 if there are less than 2 values
+        """
+        if self.count < 2:
+            return 0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def standard_deviation(self) -> float:
+        """
+        Sample standard deviation of the accumulated values
+
+        :return: standard deviation of the values, 0 if there are less than 2 values
+        """
+        return math.sqrt(self.variance)
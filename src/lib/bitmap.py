@@ -0,0 +1,202 @@
+from collections.abc import Sequence
+from typing import Any, Iterable, Iterator, List
+
+# positions of the set bits of every byte value
+_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+class RowBitmap(Sequence):
+    """
+    Set of row numbers stored as a bitmap, bit i of byte k is set if row 8k + i is in the set
+
+    ----
+
+    A list of row numbers cost a pointer and an int object per row, around 36 bytes, the bitmap cost one bit per row of
+    the file whatever the number of rows in the set, which is much smaller for attributes missing in many rows
+
+    |  The bitmap behave as the sorted sequence of its row numbers, so it can be used in place of the list it replace,
+    its length is counted from the bits and row numbers are only produced when it is iterated or indexed. Both are
+    computed once and kept until a row is added, so indexing in a loop cost no more than indexing a list. Sets are
+    combined as Python ints, which OR and shift every bit at once
+    """
+
+    def __init__(self, rows: Iterable[int] = ()) -> None:
+        """
+        Class constructor
+
+        :param rows: row numbers in the set
+        """
+        self._bits = bytearray()
+        self._count = None
+        self._rows = None
+        for row_number in rows:
+            self.add(row_number)
+
+    @classmethod
+    def from_int(cls, value: int) -> 'RowBitmap':
+        """
+        Create a bitmap from an int, bit i of the int being row i
+
+        :param value: non negative int
+        :return: the bitmap
+        """
+        bitmap = cls()
+        bitmap._bits = bytearray(value.to_bytes((value.bit_length() + 7) // 8, 'little'))
+        return bitmap
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'RowBitmap':
+        """
+        Create a bitmap from the bytes returned by ``to_bytes``
+
+        :param data: bytes of the bitmap
+        :return: the bitmap
+        """
+        bitmap = cls()
+        bitmap._bits = bytearray(data)
+        return bitmap
+
+    def to_int(self) -> int:
+        """
+        Turn the bitmap into an int, bit i of the int being row i
+
+        :return: the int
+        """
+        return int.from_bytes(self._bits, 'little')
+
+    def to_bytes(self) -> bytes:
+        """
+        Bytes of the bitmap, without its trailing empty bytes
+
+        :return: bytes of the bitmap
+        """
+        return bytes(self._bits).rstrip(b'\0')
+
+    def add(self, row_number: int) -> None:
+        """
+        Add a row to the set
+
+        :param row_number: number of the row
+        """
+        index = row_number >> 3
+        if index >= len(self._bits):
+            self._bits.extend(bytes(index + 1 - len(self._bits)))
+        self._bits[index] |= 1 << (row_number & 7)
+        self._count = self._rows = None
+
+    def merge(self, other: 'RowBitmap', row_offset: int = 0) -> None:
+        """
+        Add the rows of another set, shifted by row_offset
+
+        :param other: set of rows following the ones of this set, it is left unchanged
+        :param row_offset: number added to the row numbers of the other set
+        """
+        self._bits = RowBitmap.from_int(self.to_int() | other.to_int() << row_offset)._bits
+        self._count = self._rows = None
+
+    def copy(self) -> 'RowBitmap':
+        """
+        Copy of the set
+
+        :return: a new bitmap holding the same rows
+        """
+        return RowBitmap.from_bytes(self._bits)
+
+    def _row_numbers(self) -> List[int]:
+        """
+        Row numbers of the set, produced from the bits once and kept until the set change
+
+        :return: list of the row numbers, in increasing order, shared with the bitmap so it must not be modified
+        """
+        if self._rows is None:
+            self._rows = [position << 3 | bit for position, byte in enumerate(self._bits) if byte
+                          for bit in _BITS[byte]]
+        return self._rows
+
+    def tolist(self) -> List[int]:
+        """
+        Row numbers of the set
+
+        :return: new list of the row numbers, in increasing order
+        """
+        return list(self._row_numbers())
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = bin(self.to_int()).count('1')
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._row_numbers())
+
+    def __contains__(self, row_number: Any) -> bool:
+        if not isinstance(row_number, int) or row_number < 0 or row_number >> 3 >= len(self._bits):
+            return False
+        return bool(self._bits[row_number >> 3] >> (row_number & 7) & 1)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self._row_numbers()[index]
+
+    def __or__(self, other: 'RowBitmap') -> 'RowBitmap':
+        return RowBitmap.from_int(self.to_int() | other.to_int())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, RowBitmap):
+            return self.to_int() == other.to_int()
+        if isinstance(other, (list, tuple)):
+            return self._row_numbers() == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"RowBitmap({self.tolist()})"
+
+
+def union(bitmaps: Iterable[RowBitmap]) -> RowBitmap:
+    """
+    Rows which are in at least one of the sets
+
+    :param bitmaps: sets of rows
+    :return: union of the sets
+    """
+    value = 0
+    for bitmap in bitmaps:
+        value |= bitmap.to_int()
+    return RowBitmap.from_int(value)
+
+
+def at_least(bitmaps: Iterable[RowBitmap], threshold: int) -> RowBitmap:
+    """
+    Rows which are in at least threshold of the sets
+
+    ----
+
+    The number of sets holding each row is counted for every row at once in bit-sliced counters, slice j holding bit j
+    of every count, each set is added with a carry propagated through the slices. The counts are then compared to the
+    threshold from their highest bit down, so no row number is ever produced
+
+    :param bitmaps: sets of rows
+    :param threshold: minimum number of sets a row must be in, at least 1
+    :return: set of the rows found in at least threshold sets
+    """
+    slices = []
+    rows = 0
+    for bitmap in bitmaps:
+        carry = bitmap.to_int()
+        rows |= carry
+        for index, counts in enumerate(slices):
+            if not carry:
+                break
+            slices[index], carry = counts ^ carry, counts & carry
+        if carry:
+            slices.append(carry)
+    if threshold >= 1 << len(slices):
+        return RowBitmap()
+    greater = 0
+    equal = rows
+    for index in range(len(slices) - 1, -1, -1):
+        if threshold >> index & 1:
+            equal &= slices[index]
+        else:
+            greater |= equal & slices[index]
+            equal &= ~slices[index]
+    return RowBitmap.from_int(greater | equal)
@@ -0,0 +1,199 @@
+import os
+import json
+import hashlib
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .profile import ColumnProfile
+
+# directory of the cache if none is given, under the user's cache directory
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                         'preprocessor')
+
+# maximum size in bytes of the cache entries if none is given
+CACHE_SIZE = 64 << 20
+
+# number of blocks sampled across the data file for its content hash, and the size of each of them
+_SAMPLES = 16
+_SAMPLE_SIZE = 4096
+
+# suffix of the cache entries
+_SUFFIX = '.profile.json'
+
+# version of the entries' content, entries of another version are ignored
+_VERSION = 2
+
+
+def sample_hash(file: str, size: int) -> str:
+    """
+    Hash of a few blocks spread evenly across the first size bytes of a data file, from its first to its last byte
+
+    ----
+
+    Unlike a hash of the whole file, reading the blocks cost the same whatever the size of the file, it catch
+    modifications which keep the size and modification time of the file, ex: a copy preserving them, as long as they
+    touch one of the sampled blocks
+
+    :param file: name of the data file
+    :param size: number of bytes sampled from the start of the file, the size of the file to sample all of it
+    :return: hexadecimal blake2b digest of the sampled blocks
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    step = max(0, size - _SAMPLE_SIZE) / (_SAMPLES - 1)
+    with open(file, 'rb') as data_file:
+        for sample in range(_SAMPLES):
+            offset = round(step * sample)
+            data_file.seek(offset)
+            digest.update(data_file.read(min(_SAMPLE_SIZE, size - offset)))
+    return digest.hexdigest()
+
+
+class ProfileCache:
+    """
+    Persistent cache of the profiles of data files, with least recently used eviction
+
+    ----
+
+    Each entry hold the profiles of one data file computed with some options, saved as JSON in the cache directory, it
+    is keyed by the path, size and modification time of the file, a hash of blocks sampled across its content, and the
+    options of the profiling, so an entry is never used for a file which has changed since
+
+    |  Entries are touched when they are read, and once the entries take more than max_size bytes, the least recently
+    used ones are deleted
+
+    |  If refresh is set, entries are never read, profiles are always computed again and replace the cached ones
+    """
+
+    def __init__(self, directory: str = None, max_size: int = None, refresh: bool = False) -> None:
+        """
+        Class constructor
+
+        :param directory: directory of the cache entries, created if needed, if not specified, ``CACHE_DIR`` is used
+        :param max_size: maximum size in bytes of the entries, if not specified, ``CACHE_SIZE`` is used
+        :param refresh: whether to ignore the cached entries and replace them
+        """
+        self.directory = directory or CACHE_DIR
+        self.max_size = CACHE_SIZE if max_size is None else max_size
+        self.refresh = refresh
+
+    def key(self, file: str, delimiter: str, columns: Optional[Iterable[str]], options: Iterable[Any]) -> str:
+        """
+        Key of the profiles of a data file in its current state
+
+        :param file: name of the data file
+        :param delimiter: delimiter of each value in the file
+        :param columns: names of the profiled attributes, None for all attributes
+        :param options: any other option changing the profiles, ex: distributions, quantile_error, mode_capacity
+        :return: hexadecimal key of the entry
+        """
+        status = os.stat(file)
+        identity = [os.path.abspath(file), status.st_size, status.st_mtime_ns, sample_hash(file, status.st_size),
+                    delimiter, None if columns is None else list(columns), list(options)]
+        return hashlib.blake2b(json.dumps(identity).encode('utf-8'), digest_size=16).hexdigest()
+
+    def _entry(self, key: str) -> str:
+        """
+        Name of the file of an entry
+
+        :param key: key of the entry
+        :return: name of the entry's file in the cache directory
+        """
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[Dict[str, ColumnProfile]]:
+        """
+        Read the profiles of an entry, and mark it as the most recently used
+
+        :param key: key of the entry, as returned by ``key``
+        :return: profiles of the entry, None if there is no such entry, it can't be read, or refresh is set
+        """
+        if self.refresh:
+            return None
+        entry = self._entry(key)
+        try:
+            with open(entry, 'r', encoding='utf-8') as json_file:
+                data = json.load(json_file)
+            profiles = {name: ColumnProfile.from_dict(column) for name, column in data['profiles'].items()} \
+                if data.get('version') == _VERSION else None
+        except OSError:
+            return None
+        except (ValueError, KeyError, TypeError, AttributeError):
+            profiles = None
+        if profiles is None:
+            self._remove(entry)
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return profiles
+
+    def put(self, key: str, profiles: Dict[str, ColumnProfile]) -> None:
+        """
+        Save profiles as an entry, then evict the least recently used entries if the cache is too big
+
+        :param key: key of the entry, as returned by ``key``
+        :param profiles: profiles to save
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as json_file:
+                json.dump({'version': _VERSION,
+                           'profiles': {name: column.to_dict() for name, column in profiles.items()}}, json_file)
+            os.replace(temporary, self._entry(key))
+        except BaseException:
+            self._remove(temporary)
+            raise
+        self._evict()
+
+    def clear(self) -> None:
+        """
+        Delete every entry of the cache
+        """
+        for entry, _, _ in self._entries():
+            self._remove(entry)
+
+    def _entries(self) -> List[Tuple[str, int, int]]:
+        """
+        Entries of the cache
+
+        :return: list of (file name, size, last use time) of each entry
+        """
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if name.endswith(_SUFFIX):
+                entry = os.path.join(self.directory, name)
+                try:
+                    status = os.stat(entry)
+                except OSError:
+                    continue
+                entries.append((entry, status.st_size, status.st_mtime_ns))
+        return entries
+
+    def _evict(self) -> None:
+        """
+        Delete the least recently used entries until the entries take at most max_size bytes
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in entries:
+            if total <= self.max_size:
+                break
+            self._remove(entry)
+            total -= size
+
+    @staticmethod
+    def _remove(entry: str) -> None:
+        """
+        Delete a file of the cache, which may already have been deleted by another process
+
+        :param entry: name of the file
+        """
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
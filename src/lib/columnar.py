@@ -0,0 +1,522 @@
+import os
+import sys
+import csv
+import json
+import mmap
+import struct
+import tempfile
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from .profile import DataType, ColumnProfile
+from .sketch import SpaceSaving
+from .cache import sample_hash
+from .bitmap import RowBitmap
+
+# suffix added to the data file's name to get the name of its columnar file
+COLUMNAR_SUFFIX = '.col'
+
+# first bytes of a columnar file
+_MAGIC = b'PPCOLUMN'
+
+# version of the format, files of another version are ignored
+_VERSION = 1
+
+# every section start at a multiple of this, so arrays can be read in place
+_ALIGNMENT = 8
+
+# number of rows encoded in memory before they are spilled to disk, a multiple of 8 so validity bitmaps can be joined
+_BLOCK_ROWS = 1 << 16
+
+# size of the pieces copied from the spill file to the columnar file
+_COPY_SIZE = 1 << 20
+
+
+def columnar_name(file: str) -> str:
+    """
+    Name of the columnar file of a data file
+
+    :param file: name of the data file
+    :return: name of the columnar file, next to the data file
+    """
+    return file + COLUMNAR_SUFFIX
+
+
+def _source(file: str, delimiter: str) -> Dict[str, Any]:
+    """
+    Identity of a data file in its current state, a columnar file is fresh while its data file has the same
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :return: size, modification time and sampled content hash of the file, delimiter and byte order of the arrays
+    """
+    status = os.stat(file)
+    return {'size': status.st_size, 'mtime_ns': status.st_mtime_ns, 'hash': sample_hash(file, status.st_size),
+            'delimiter': delimiter, 'byteorder': sys.byteorder}
+
+
+def _unset_bits(bitmap: bytes, size: int) -> RowBitmap:
+    """
+    Indexes of the unset bits of a validity bitmap
+
+    :param bitmap: bytes of the bitmap
+    :param size: number of flags in the bitmap
+    :return: set of the indexes of the unset flags
+    """
+    return RowBitmap.from_int(~int.from_bytes(bitmap, 'little') & ((1 << size) - 1))
+
+
+class _ColumnBuilder:
+    """
+    Encode the values of one attribute while the data file is being read
+
+    ----
+
+    Every value is dictionary-encoded: its code is its index in the table of distinct values, in the order they are
+    first seen, and a validity flag tell whether it is missing. Values of a NUMERIC attribute are also parsed into a
+    float64 array, NaN for missing values and values which are not numbers
+
+    |  Codes, validity and values are only kept for a block of rows, each block is then spilled to a temporary file,
+    see ``spill``, so only the table of distinct values grow with the data file. Missing values are flagged in a bitmap
+    which is complemented into the validity bitmap with a single int operation when the block is spilled
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Class constructor
+
+        :param name: name of the attribute
+        """
+        self.name = name
+        self.data_type = DataType.UNKNOWN
+        self.table = {}
+        self.rows = 0
+        self.values_start = None
+        self.chunks = {'validity': [], 'codes': [], 'values': []}
+        self._missing = RowBitmap()
+        self._codes = array('I')
+        self._values = None
+
+    def update(self, value: Optional[str]) -> None:
+        """
+        Encode the value of the next row
+
+        :param value: raw string value read from the data file, empty string or None for a missing value
+        """
+        if value == '' or value is None:
+            self._missing.add(len(self._codes))
+            self._codes.append(0)
+            if self._values is not None:
+                self._values.append(float('nan'))
+            return
+        code = self.table.get(value)
+        if code is None:
+            code = self.table[value] = len(self.table)
+        self._codes.append(code)
+        if self.data_type == DataType.UNKNOWN:
+            try:
+                float(value)
+                self.data_type = DataType.NUMERIC
+                self.values_start = self.rows
+                self._values = array('d', [float('nan')] * (len(self._codes) - 1))
+            except ValueError:
+                self.data_type = DataType.CATEGORICAL
+        if self._values is not None:
+            try:
+                self._values.append(float(value))
+            except ValueError:
+                self._values.append(float('nan'))
+
+    def spill(self, spill_file: Any) -> None:
+        """
+        Append the encoded block of rows to the spill file and start a new block
+
+        :param spill_file: binary file the chunks of every attribute are appended to
+        """
+        size = len(self._codes)
+        if not size:
+            return
+        validity = ~self._missing.to_int() & ((1 << size) - 1)
+        chunks = [('validity', validity.to_bytes((size + 7) // 8, 'little')), ('codes', self._codes.tobytes())]
+        if self._values is not None:
+            chunks.append(('values', self._values.tobytes()))
+        for section, data in chunks:
+            self.chunks[section].append((spill_file.tell(), len(data)))
+            spill_file.write(data)
+        self.rows += size
+        self._missing = RowBitmap()
+        self._codes = array('I')
+        if self._values is not None:
+            self._values = array('d')
+
+    def strings(self) -> Dict[str, bytes]:
+        """
+        Bytes of the table of distinct values, once every row was encoded
+
+        :return: offsets and UTF-8 bytes of the table's strings
+        """
+        strings = [value.encode('utf-8') for value in self.table]
+        offsets = array('Q', [0])
+        for string in strings:
+            offsets.append(offsets[-1] + len(string))
+        return {'offsets': offsets.tobytes(), 'strings': b''.join(strings)}
+
+
+def _copy(spill_file: Any, chunks: List, columnar_file: Any) -> None:
+    """
+    Copy chunks of the spill file to the columnar file, a piece at a time
+
+    :param spill_file: binary file the chunks were spilled to
+    :param chunks: (offset, length) of each chunk, in the order they are copied
+    :param columnar_file: binary file being written
+    """
+    for offset, length in chunks:
+        spill_file.seek(offset)
+        while length > 0:
+            data = spill_file.read(min(_COPY_SIZE, length))
+            columnar_file.write(data)
+            length -= len(data)
+
+
+def compile_columnar(file: str, delimiter: str = ',', target: str = None) -> str:
+    """
+    Convert a data file into the binary columnar format
+
+    ----
+
+    The file is read once, then written as a JSON header followed by the sections of every attribute, each one aligned
+    on 8 bytes so it can be read in place from a memory map:
+
+    |      PPCOLUMN | header length (uint64) | header | validity | codes | offsets | strings | values | ...
+
+    |  NUMERIC attributes are stored as float64 values with a validity bitmap, every attribute is also stored as
+    dictionary codes with its table of distinct strings, which give modes in the exact text of the file. The header
+    record the identity of the data file, the columnar file is only used while the data file keep it
+
+    |  Rows are encoded by blocks, each block of every attribute is spilled to a temporary file as soon as it is full,
+    then the chunks of each section are copied one after the other into the columnar file, so only a block of rows and
+    the tables of distinct values are held in memory
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param target: name of the columnar file, if not specified, the data file's name followed by ``COLUMNAR_SUFFIX``
+    :return: name of the columnar file
+    """
+    target = target or columnar_name(file)
+    source = _source(file, delimiter)
+    directory = os.path.dirname(os.path.abspath(target))
+    with tempfile.TemporaryFile(dir=directory) as spill_file:
+        with open(file, 'r') as csv_file:
+            csv_reader = csv.reader(csv_file, delimiter=delimiter)
+            fieldnames = next(csv_reader, [])
+            builders = [_ColumnBuilder(name) for name in fieldnames]
+            rows = 0
+            for row in csv_reader:
+                if not row:
+                    continue
+                for index, builder in enumerate(builders):
+                    builder.update(row[index] if index < len(row) else None)
+                rows += 1
+                if rows % _BLOCK_ROWS == 0:
+                    for builder in builders:
+                        builder.spill(spill_file)
+            for builder in builders:
+                builder.spill(spill_file)
+
+        columns = []
+        layout = []
+        position = 0
+        for builder in builders:
+            column = {'name': builder.name, 'type': builder.data_type.name}
+            strings = builder.strings()
+            sections = [('validity', (rows + 7) // 8, None), ('codes', 4 * rows, None),
+                        ('offsets', len(strings['offsets']), strings['offsets']),
+                        ('strings', len(strings['strings']), strings['strings'])]
+            if builder.values_start is not None:
+                sections.append(('values', 8 * rows, None))
+            for section, length, data in sections:
+                column[section] = [position, length]
+                padding = -length % _ALIGNMENT
+                layout.append((builder, section, data, padding))
+                position += length + padding
+            columns.append(column)
+        header = json.dumps({'version': _VERSION, 'source': source, 'rows': rows, 'fieldnames': fieldnames,
+                             'columns': columns}).encode('utf-8')
+        header += b' ' * (-len(header) % _ALIGNMENT)
+
+        fd, temporary = tempfile.mkstemp(suffix=COLUMNAR_SUFFIX, dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as columnar_file:
+                columnar_file.write(_MAGIC + struct.pack('<Q', len(header)) + header)
+                for builder, section, data, padding in layout:
+                    if data is not None:
+                        columnar_file.write(data)
+                    else:
+                        if section == 'values':
+                            nan = array('d', [float('nan')]).tobytes()
+                            for start in range(0, builder.values_start, _BLOCK_ROWS):
+                                columnar_file.write(nan * min(_BLOCK_ROWS, builder.values_start - start))
+                        _copy(spill_file, builder.chunks[section], columnar_file)
+                    columnar_file.write(b'\0' * padding)
+            os.replace(temporary, target)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+    return target
+
+
+class ColumnarStore:
+    """
+    Read-only access to a columnar file through a memory map
+
+    ----
+
+    Sections are returned as memoryviews of the map, without copy, so reading one attribute only touch the pages of
+    that attribute's sections. Views should be released, ex: with a ``with`` statement, before the store is closed
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Class constructor, open and map the columnar file
+
+        :param path: name of the columnar file
+        :raise: ValueError if the file is not a columnar file of the current version
+        """
+        with open(path, 'rb') as columnar_file:
+            self._map = mmap.mmap(columnar_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._map[:len(_MAGIC)] != _MAGIC:
+                raise ValueError("Not a columnar file")
+            length, = struct.unpack_from('<Q', self._map, len(_MAGIC))
+            start = len(_MAGIC) + 8
+            header = json.loads(self._map[start:start + length].decode('utf-8'))
+            if header.get('version') != _VERSION:
+                raise ValueError("Unsupported columnar file version")
+        except BaseException:
+            self._map.close()
+            raise
+        self._data = start + length
+        self.source = header['source']
+        self.rows = header['rows']
+        self.fieldnames = header['fieldnames']
+        self._columns = {column['name']: column for column in header['columns']}
+
+    @classmethod
+    def open_fresh(cls, file: str, delimiter: str = ',', path: str = None) -> Optional['ColumnarStore']:
+        """
+        Open the columnar file of a data file, if it is up to date
+
+        :param file: name of the data file
+        :param delimiter: delimiter of each value in the file
+        :param path: name of the columnar file, if not specified, the data file's name followed by ``COLUMNAR_SUFFIX``
+        :return: the store, None if there is no readable columnar file or the data file changed since it was compiled
+        """
+        path = path or columnar_name(file)
+        if not os.path.isfile(path):
+            return None
+        try:
+            store = cls(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        if store.source != _source(file, delimiter):
+            store.close()
+            return None
+        return store
+
+    def close(self) -> None:
+        """
+        Unmap the columnar file
+        """
+        self._map.close()
+
+    def __enter__(self) -> 'ColumnarStore':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def data_type(self, name: str) -> DataType:
+        """
+        Data type of an attribute, decided by its first non-empty value
+
+        :param name: name of the attribute
+        :return: data type of the attribute
+        :raise: AttributeError if there's no attribute with the given name
+        """
+        return DataType[self._column(name)['type']]
+
+    def _column(self, name: str) -> Dict[str, Any]:
+        """
+        Header entry of an attribute
+
+        :param name: name of the attribute
+        :return: type and [offset, length] of each section of the attribute
+        :raise: AttributeError if there's no attribute with the given name
+        """
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise AttributeError(f"No such attribute: {name}") from None
+
+    def _section(self, name: str, section: str) -> memoryview:
+        """
+        View of a section of an attribute
+
+        :param name: name of the attribute
+        :param section: name of the section
+        :return: bytes of the section, without copy
+        """
+        offset, length = self._column(name)[section]
+        start = self._data + offset
+        return memoryview(self._map)[start:start + length]
+
+    def validity(self, name: str) -> memoryview:
+        """
+        Validity bitmap of an attribute, bit i of byte k is unset if the value of row 8k + i is missing
+
+        :param name: name of the attribute
+        :return: bytes of the bitmap
+        """
+        return self._section(name, 'validity')
+
+    def codes(self, name: str) -> memoryview:
+        """
+        Dictionary code of each value of an attribute, 0 for missing values
+
+        :param name: name of the attribute
+        :return: uint32 view of the codes
+        """
+        return self._section(name, 'codes').cast('I')
+
+    def values(self, name: str) -> memoryview:
+        """
+        Parsed values of a NUMERIC attribute, NaN for missing values and values which are not numbers
+
+        :param name: name of the NUMERIC attribute
+        :return: float64 view of the values
+        :raise: TypeError if the attribute is not NUMERIC
+        """
+        if 'values' not in self._column(name):
+            raise TypeError(f"Attribute is not of type {DataType.NUMERIC.name}")
+        return self._section(name, 'values').cast('d')
+
+    def table(self, name: str) -> List[str]:
+        """
+        Distinct values of an attribute, in the order they first appear, a code is an index in this list
+
+        :param name: name of the attribute
+        :return: list of the distinct values
+        """
+        with self._section(name, 'offsets') as offsets_view, offsets_view.cast('Q') as offsets, \
+                self._section(name, 'strings') as strings:
+            data = bytes(strings)
+            return [data[offsets[index]:offsets[index + 1]].decode('utf-8') for index in range(len(offsets) - 1)]
+
+
+def _is_nan(value: str) -> bool:
+    """
+    Tell whether a value of the file is parsed into NaN, the same way ``ColumnProfile.update`` parse it
+
+    :param value: raw string value
+    :return: whether the value is a number, and NaN
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        return False
+    return number != number
+
+
+def _column_profile(store: ColumnarStore, name: str, distributions: bool, quantile_error: Optional[float],
+                    mode_capacity: Optional[int]) -> ColumnProfile:
+    """
+    Compute the profile of one attribute from its sections
+
+    ----
+
+    NUMERIC values are accumulated in the order of the rows, like ``ColumnProfile.update`` does, so the profile is the
+    same as the one of the text file. Only the validity and values sections are read, and codes and table too if
+    distributions are kept
+
+    |  A NaN value is either a value which is not a number, which ``ColumnProfile.update`` skip, or a literal NaN of the
+    file, ex: ``nan``, which it accumulate since ``float`` parse it. When some non-missing values are NaN, the table is
+    read to find the codes of the literal NaNs, and their rows are accumulated too
+
+    :param store: opened columnar file
+    :param name: name of the attribute
+    :param distributions: whether to keep what median and mode need
+    :param quantile_error: if specified, quantiles are approximated with this normalized rank error
+    :param mode_capacity: if specified, modes are approximated by counting at most this many distinct values
+    :return: profile of the attribute
+    """
+    column = ColumnProfile(name, distributions, quantile_error, mode_capacity)
+    column.data_type = store.data_type(name)
+    column.rows = store.rows
+    with store.validity(name) as validity:
+        column.missing_rows = _unset_bits(validity, store.rows)
+    column.missing = len(column.missing_rows)
+    if column.data_type == DataType.NUMERIC:
+        with store.values(name) as values:
+            numbers = array('d', [number for number in values if number == number])
+            if len(numbers) + column.missing < store.rows:
+                nan_codes = {code for code, value in enumerate(store.table(name)) if _is_nan(value)}
+                if nan_codes:
+                    missing = column.missing_rows
+                    with store.codes(name) as codes:
+                        numbers = array('d', [number for row_number, (number, code) in enumerate(zip(values, codes))
+                                              if number == number or code in nan_codes and row_number not in missing])
+        stats = column._stats
+        total = 0.0
+        for number in numbers:
+            stats.update(number)
+            total += number
+        column.total = total
+        if numbers:
+            column.min = min(numbers)
+            column.max = max(numbers)
+        if column._sketch is not None:
+            for number in numbers:
+                column._sketch.update(number)
+        elif distributions:
+            column._values = numbers
+    if distributions and column.missing < column.rows:
+        table = store.table(name)
+        with store.codes(name) as codes:
+            if isinstance(column._frequency, SpaceSaving):
+                missing = column.missing_rows
+                for row_number, code in enumerate(codes):
+                    if row_number not in missing:
+                        column._frequency.update(table[code])
+            else:
+                counts = Counter(codes)
+                counts[0] -= column.missing
+                column._frequency = {value: counts[code] for code, value in enumerate(table)}
+    return column
+
+
+def profile(store: ColumnarStore, columns: Iterable[str] = None, distributions: bool = True,
+            quantile_error: float = None, mode_capacity: int = None) -> Dict[str, ColumnProfile]:
+    """
+    Compute the profile of the attributes of a data file from its columnar file
+
+    ----
+
+    Same as ``profile.profile``, but no text is parsed, and only the sections of the requested attributes are read
+
+    :param store: opened columnar file of the data file
+    :param columns: names of the attributes to profile, if not specified, all attributes will be profiled
+    :param distributions: whether to keep what median and mode need
+    :param quantile_error: if specified, quantiles are approximated with this normalized rank error
+    :param mode_capacity: if specified, modes are approximated by counting at most this many distinct values
+    :return: a dictionary which hold key-value pair, in the order of the file's fieldnames:
+                key: name of the attribute
+                value: profile of this attribute
+    :raise: AttributeError if one of the given columns is not an attribute of the file
+    """
+    names = list(store.fieldnames) if columns is None else list(columns)
+    for name in names:
+        if name not in store.fieldnames:
+            raise AttributeError(f"No such attribute: {name}")
+    return {name: _column_profile(store, name, distributions, quantile_error, mode_capacity)
+            for name in store.fieldnames if name in names}
@@ -0,0 +1,365 @@
+import os
+import csv
+import heapq
+import math
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+from typing import Sequence, Iterable, Iterator, List, Tuple
+
+# fraction of the table's slots that may be used before it is grown
+_MAX_LOAD = 0.9
+
+# factor the size of the table is multiplied by when it is grown
+_GROWTH = 1.5
+
+# memory used by each digest of a DigestSet, in bytes, at its worst load, right after the table is grown
+DIGEST_MEMORY = math.ceil(16 * _GROWTH / _MAX_LOAD)
+
+# number of bytes read from the start of a file to estimate its number of rows
+_SAMPLE_SIZE = 1 << 16
+
+# maximum number of partition files written at once, each one is an open file
+MAX_PARTITIONS = 128
+
+# maximum number of survivors files merged at once
+_MAX_FAN_IN = 64
+
+# number of digest bits skipped at each level of partitioning, so each level spread rows with other bits
+_KEY_SHIFT = 16
+
+# maximum number of times rows are partitioned again, the digest has no more bits to spread them past it
+_MAX_DEPTH = 6
+
+
+def row_digest(row: Sequence[str]) -> bytes:
+    """
+    Fingerprint a row by hashing its raw values into a 128-bit digest
+
+    ----
+
+    The values are hashed through their ``repr``, which quote and escape every value, so two different rows can't be
+    turned into the same hashed bytes whatever characters their values contain
+
+    :param row: values of the row, in the order of the file
+    :return: 16 bytes digest of the row
+    """
+    return blake2b(repr(row).encode('utf-8'), digest_size=16).digest()
+
+
+def _next_prime(number: int) -> int:
+    """
+    Smallest prime number which is not smaller than a given number
+
+    :param number: lower bound
+    :return: the prime number, at least 3
+    """
+    candidate = max(number, 3) | 1
+    while any(candidate % divisor == 0 for divisor in range(3, math.isqrt(candidate) + 1, 2)):
+        candidate += 2
+    return candidate
+
+
+class DigestSet:
+    """
+    Set of 128-bit digests stored in flat arrays
+
+    ----
+
+    A Python set of bytes objects cost around 100 bytes per digest, this set store each digest as two 64-bit halves in
+    two ``array('Q')`` slots of an open-addressing table, which cost 16 bytes per slot. The table is filled up to 90%
+    and grown by 1.5 times, so a digest cost between 18 and 27 bytes depending on how full the table is
+
+    |  Slots are probed with double hashing: the table has a prime number of slots, the first slot is taken from one
+    half of the digest and the step between probed slots from the other one, so probe sequences don't pile up into
+    long runs as they do with linear probing, and a full table stay fast to search
+
+    |  An empty slot is marked by a zero digest, the (astronomically unlikely) zero digest is stored as 1 instead
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        """
+        Class constructor
+
+        :param capacity: expected number of digests, the table grow when needed anyway
+        """
+        size = _next_prime(math.ceil(capacity / _MAX_LOAD))
+        self._high = array('Q', bytes(8 * size))
+        self._low = array('Q', bytes(8 * size))
+        self._count = 0
+
+    def __len__(self) -> int:
+        """
+        Number of digests in the set
+
+        :return: number of digests
+        """
+        return self._count
+
+    def _insert(self, high: int, low: int) -> bool:
+        """
+        Insert a digest given as its two halves into the table, which must have a free slot
+
+        :param high: first 64 bits of the digest
+        :param low: last 64 bits of the digest, not 0 if high is 0
+        :return: True if the digest was not in the set
+        """
+        high_slots = self._high
+        low_slots = self._low
+        size = len(high_slots)
+        index = low % size
+        step = 1 + high % (size - 1)
+        while True:
+            slot_low = low_slots[index]
+            slot_high = high_slots[index]
+            if not slot_low and not slot_high:
+                high_slots[index] = high
+                low_slots[index] = low
+                return True
+            if slot_low == low and slot_high == high:
+                return False
+            index += step
+            if index >= size:
+                index -= size
+
+    def _grow(self) -> None:
+        """
+        Grow the table by ``_GROWTH`` times and re-insert every digest
+
+        ----
+
+        Digests of the table are all different, so each one is put in the first free slot of its probe sequence without
+        comparing it to the others, in an inlined loop as the table grow more often than if it was doubled
+        """
+        high_slots = self._high
+        low_slots = self._low
+        size = _next_prime(int(_GROWTH * len(high_slots)))
+        new_high = self._high = array('Q', bytes(8 * size))
+        new_low = self._low = array('Q', bytes(8 * size))
+        for high, low in zip(high_slots, low_slots):
+            if high or low:
+                index = low % size
+                step = 1 + high % (size - 1)
+                while new_low[index] or new_high[index]:
+                    index += step
+                    if index >= size:
+                        index -= size
+                new_high[index] = high
+                new_low[index] = low
+
+    def add(self, digest: bytes) -> bool:
+        """
+        Add a digest to the set
+
+        :param digest: 16 bytes digest, as returned by ``row_digest``
+        :return: True if the digest was not in the set yet, False if it was already there
+        """
+        high = int.from_bytes(digest[:8], 'little')
+        low = int.from_bytes(digest[8:16], 'little')
+        if not high and not low:
+            low = 1
+        if self._count + 1 > _MAX_LOAD * len(self._high):
+            self._grow()
+        if self._insert(high, low):
+            self._count += 1
+            return True
+        return False
+
+
+def estimate_rows(file: str) -> int:
+    """
+    Estimate the number of rows of a data file from the size of its first rows
+
+    :param file: name of the data file
+    :return: estimated number of rows, fieldnames row included
+    """
+    size = os.path.getsize(file)
+    with open(file, 'rb') as data_file:
+        sample = data_file.read(_SAMPLE_SIZE)
+    lines = sample.count(b'\n')
+    if not lines or len(sample) >= size:
+        return max(lines, 1)
+    return math.ceil(size * lines / len(sample))
+
+
+def _partition_key(digest: bytes, partitions: int, depth: int) -> int:
+    """
+    Partition of a row from its digest
+
+    ----
+
+    Each level of partitioning take the digest from a different bit, so the rows of a partition which is partitioned
+    again are spread over the new partitions
+
+    :param digest: 16 bytes digest of the row, as returned by ``row_digest``
+    :param partitions: number of partitions
+    :param depth: number of times the rows were already partitioned
+    :return: index of the partition of the row
+    """
+    return (int.from_bytes(digest, 'little') >> (_KEY_SHIFT * depth)) % partitions
+
+
+def _spill(rows: Iterable[List[str]], paths: Sequence[Tuple[str, str]], depth: int) -> List[int]:
+    """
+    Append rows to the partition files chosen from their digest
+
+    :param rows: rows prefixed by their row number
+    :param paths: name of the partition file and name of its survivors file of each partition
+    :param depth: number of times the rows were already partitioned
+    :return: number of rows written to each partition
+    """
+    counts = [0] * len(paths)
+    spill_files = [open(partition, 'w', newline='', encoding='utf-8') for partition, _ in paths]
+    try:
+        spill_writers = [csv.writer(spill_file) for spill_file in spill_files]
+        for row in rows:
+            index = _partition_key(row_digest(row[1:]), len(paths), depth)
+            spill_writers[index].writerow(row)
+            counts[index] += 1
+    finally:
+        for spill_file in spill_files:
+            spill_file.close()
+    return counts
+
+
+def _merge(paths: Sequence[str]) -> Iterator[List[str]]:
+    """
+    Merge survivors files by row number
+
+    :param paths: names of the survivors files, at most ``_MAX_FAN_IN``, each sorted by row number
+    :return: generator of the rows of every file, prefixed by their row number, in increasing row number
+    """
+    survivor_files = [open(path, 'r', newline='', encoding='utf-8') for path in paths]
+    try:
+        readers = [csv.reader(survivor_file) for survivor_file in survivor_files]
+        yield from heapq.merge(*readers, key=lambda item: int(item[0]))
+    finally:
+        for survivor_file in survivor_files:
+            survivor_file.close()
+
+
+def _merge_files(paths: List[str], target: str) -> List[str]:
+    """
+    Merge survivors files into fewer files, by batches of at most ``_MAX_FAN_IN`` files open at once
+
+    :param paths: names of the survivors files, each sorted by row number, they are removed once merged
+    :param target: prefix of the names of the merged files
+    :return: names of the remaining files, at most ``_MAX_FAN_IN``, each sorted by row number
+    """
+    level = 0
+    while len(paths) > _MAX_FAN_IN:
+        merged = []
+        for start in range(0, len(paths), _MAX_FAN_IN):
+            batch = paths[start:start + _MAX_FAN_IN]
+            path = f'{target}.merge_{level}_{len(merged)}'
+            with open(path, 'w', newline='', encoding='utf-8') as out_file:
+                csv.writer(out_file).writerows(_merge(batch))
+            for batch_path in batch:
+                os.remove(batch_path)
+            merged.append(path)
+        paths = merged
+        level += 1
+    return paths
+
+
+def _dedup_partition(task: Tuple[str, str, int, int, int]) -> int:
+    """
+    Deduplicate the rows of one partition file
+
+    ----
+
+    Rows of a partition are stored with their row number as first value, they are read in order and the first occurrence
+    of each row is written to the survivors file, so survivors stay sorted by row number, the partition file is then
+    removed
+
+    |  A partition with more rows than max_rows is partitioned again into at most ``MAX_PARTITIONS`` partitions, each
+    one deduplicated the same way, and their survivors merged into the survivors file. As identical rows always end up
+    in the same partition, a partition which can't be spread over several ones is deduplicated as it is
+
+    |  Defined at module level so it can be run by the workers of a process pool
+
+    :param task: name of the partition file, name of the survivors file to write, number of rows of the partition,
+                 maximum number of rows whose digests fit in memory and number of times the rows were already
+                 partitioned
+    :return: number of surviving rows
+    """
+    partition, survivors, rows, max_rows, depth = task
+    if rows > max_rows and depth < _MAX_DEPTH:
+        partitions = min(math.ceil(rows / max_rows), MAX_PARTITIONS)
+        paths = [(f'{partition}.{index}', f'{survivors}.{index}') for index in range(partitions)]
+        with open(partition, 'r', newline='', encoding='utf-8') as in_file:
+            counts = _spill(csv.reader(in_file), paths, depth + 1)
+        os.remove(partition)
+        kept = 0
+        for (sub_partition, sub_survivors), count in zip(paths, counts):
+            kept += _dedup_partition((sub_partition, sub_survivors, count, max_rows if count < rows else count,
+                                      depth + 1))
+        remaining = _merge_files([sub_survivors for _, sub_survivors in paths], survivors)
+        with open(survivors, 'w', newline='', encoding='utf-8') as out_file:
+            csv.writer(out_file).writerows(_merge(remaining))
+        for path in remaining:
+            os.remove(path)
+        return kept
+    digests = DigestSet()
+    with open(partition, 'r', newline='', encoding='utf-8') as in_file, \
+            open(survivors, 'w', newline='', encoding='utf-8') as out_file:
+        csv_writer = csv.writer(out_file)
+        for row in csv.reader(in_file):
+            if digests.add(row_digest(row[1:])):
+                csv_writer.writerow(row)
+    os.remove(partition)
+    return len(digests)
+
+
+def partitioned_unique_rows(file: str, delimiter: str = ',', partitions: int = 2, workers: int = 1,
+                            max_rows: int = None) -> Iterator[List[str]]:
+    """
+    Deduplicate the rows of a data file bigger than memory by spilling them to disk
+
+    ----
+
+    Operate in three steps:
+        1. Read the file once and append each row, prefixed by its row number, to one of the partition files chosen
+           from its digest, so identical rows always end up in the same partition
+        2. Deduplicate each partition independently with its own ``DigestSet``, in a process pool if there is more than
+           one worker, a partition with more than max_rows rows is partitioned again, see ``_dedup_partition``
+        3. Merge the survivors of every partition back by row number, so rows keep their original order
+
+    |  Only the digests of a single partition are held in memory at once by each worker, so the digests in memory are
+    those of workers partitions at most, partition files are written in a temporary directory next to the data file and
+    removed once every row has been yielded. Blank lines are skipped
+
+    |  At most ``MAX_PARTITIONS`` partition files are written at once, and survivors are merged by batches of at most
+    ``_MAX_FAN_IN`` files, so the number of open files stay bounded whatever the size of the data file
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param partitions: number of partitions to spill rows into, at most ``MAX_PARTITIONS`` are used
+    :param workers: number of processes deduplicating partitions in parallel
+    :param max_rows: maximum number of rows deduplicated at once by a worker, if not specified, partitions are never
+                     partitioned again
+    :return: generator of the first occurrence of each row, fieldnames row and blank rows excluded, in their original
+             order
+    """
+    partitions = max(1, min(partitions, MAX_PARTITIONS))
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(file))) as directory:
+        paths = [(os.path.join(directory, f'partition_{index}.csv'), os.path.join(directory, f'survivors_{index}.csv'))
+                 for index in range(partitions)]
+        with open(file, 'r') as csv_file:
+            csv_reader = csv.reader(csv_file, delimiter=delimiter)
+            next(csv_reader, None)
+            counts = _spill(([row_number] + row for row_number, row in enumerate(filter(None, csv_reader))), paths, 0)
+
+        tasks = [(partition, survivors, count, max_rows or count, 0)
+                 for (partition, survivors), count in zip(paths, counts)]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_dedup_partition, tasks))
+        else:
+            for task in tasks:
+                _dedup_partition(task)
+
+        remaining = _merge_files([survivors for _, survivors in paths], os.path.join(directory, 'survivors'))
+        for row in _merge(remaining):
+            yield row[1:]
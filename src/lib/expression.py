@@ -0,0 +1,212 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple, Union
+from .xfix import Node, Number, Attribute, Negation, parse_expression, optimize
+
+# operators whose operands can be swapped without changing the result, even with floats
+_COMMUTATIVE = {'+', '*'}
+
+
+class Program:
+    """
+    Formulas turned into a flat list of operations on numbered slots (value numbering)
+
+    ----
+
+    Each slot hold one value of the row being evaluated: either the value of an attribute loaded from the row, a numeric
+    literal, or the result of an operator applied to earlier slots. Identical sub-expressions, ex: 'a + b' in
+    '(a + b) / c' and '(b + a) * d', are given a single slot, so they are computed once per row whatever the number of
+    formulas using them (common sub-expression elimination)
+
+    |  A formula may use the result of a formula defined before it, which is then just a reference to its slot
+    """
+
+    def __init__(self) -> None:
+        """
+        Class constructor
+        """
+        self.loads = {}
+        self.constants = {}
+        self.steps = {}
+        self.results = {}
+        self._slots = {}
+
+    @property
+    def size(self) -> int:
+        """
+        Number of slots of the program
+
+        :return: number of slots
+        """
+        return len(self._slots)
+
+    def _slot(self, key: Tuple) -> int:
+        """
+        Give the slot of a value, a new slot is allocated the first time the value is seen
+
+        :param key: ('load', attribute) for a loaded attribute, ('constant', repr of value) for a numeric literal,
+                    ('neg', slot, None) for a negation, (operator, slot_a, slot_b) for an operation
+        :return: slot holding this value
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = len(self._slots)
+            if key[0] == 'load':
+                self.loads[slot] = key[1]
+            elif key[0] == 'constant':
+                self.constants[slot] = float(key[1])
+            else:
+                self.steps[slot] = key
+        return slot
+
+    def _node(self, node: Node, attributes: Optional[Set[str]]) -> int:
+        """
+        Allocate the slots of a sub-expression, its operands first
+
+        :param node: root of the sub-expression
+        :param attributes: names of the attributes which can be loaded from the rows, None for any
+        :return: slot of the sub-expression's result
+        :raise: AttributeError if an attribute is neither loadable nor the result of an earlier formula
+        """
+        if isinstance(node, Number):
+            return self._slot(('constant', repr(node.value)))
+        if isinstance(node, Attribute):
+            if node.name in self.results:
+                return self.results[node.name]
+            if attributes is not None and node.name not in attributes:
+                raise AttributeError(f"No such attribute: {node.name}")
+            return self._slot(('load', node.name))
+        if isinstance(node, Negation):
+            return self._slot(('neg', self._node(node.operand, attributes), None))
+        slot_a = self._node(node.left, attributes)
+        slot_b = self._node(node.right, attributes)
+        if node.operator in _COMMUTATIVE and slot_b < slot_a:
+            slot_a, slot_b = slot_b, slot_a
+        return self._slot((node.operator, slot_a, slot_b))
+
+    def add(self, name: str, expression: Node, attributes: Optional[Iterable[str]] = None) -> int:
+        """
+        Add a formula to the program
+
+        :param name: name of the formula's result, which following formulas can use as an attribute
+        :param expression: tree of the formula, as returned by ``xfix.parse_expression``
+        :param attributes: names of the attributes which can be loaded from the rows, if not specified, every attribute
+                           which is not the result of an earlier formula is considered loadable
+        :return: slot of the formula's result
+        :raise: AttributeError if an attribute is neither loadable nor the result of an earlier formula
+        """
+        if attributes is not None and not isinstance(attributes, (set, dict)):
+            attributes = set(attributes)
+        slot = self._node(expression, attributes)
+        self.results[name] = slot
+        return slot
+
+
+def parse_formulas(calc_str: Union[str, Dict[str, str]], col_name: str = None) -> Dict[str, Node]:
+    """
+    Turn the formulas given to ``DataPreprocessor.attributes_calculation`` into optimized expression trees
+
+    :param calc_str: infix form of a single formula, or a dictionary of new attribute's name to infix formula
+    :param col_name: name of the result of a single formula, if not specified, the formula without spaces is used
+    :return: a dictionary which hold key-value pair, in the order of the formulas:
+                key: name of the new attribute
+                value: tree of its formula, see ``xfix.optimize``
+    :raise: ValueError if a formula is not well-formed
+    """
+    if isinstance(calc_str, str):
+        calc_str = {col_name or calc_str.replace(' ', ''): calc_str}
+    return {name: optimize(parse_expression(formula)) for name, formula in calc_str.items()}
+
+
+def plan_formulas(formulas: Dict[str, Node], attributes: Optional[Iterable[str]] = None) -> Program:
+    """
+    Turn several formulas into a single program, in order, so later formulas can use the results of earlier ones
+
+    :param formulas: tree of each formula, by name of its result
+    :param attributes: names of the attributes which can be loaded from the rows, if not specified, every attribute
+                       which is not the result of an earlier formula is considered loadable
+    :return: program computing every formula
+    :raise: AttributeError if an attribute is neither loadable nor the result of an earlier formula
+    """
+    if attributes is not None:
+        attributes = set(attributes)
+    program = Program()
+    for name, expression in formulas.items():
+        program.add(name, expression, attributes)
+    return program
+
+
+def _number(row: Any, key: Any, name: str) -> Optional[float]:
+    """
+    Slow path of a compiled program, load one attribute which can't be converted to a number directly
+
+    :param row: row the program is evaluated on
+    :param key: key of the attribute in the row
+    :param name: name of the attribute
+    :return: value of the attribute, None if it is missing
+    :raise: TypeError if the value is not NUMERIC
+    """
+    try:
+        value = row[key]
+    except LookupError:
+        return None
+    if value == '' or value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise TypeError(f"Data type of attribute {name} is not NUMERIC") from None
+
+
+def compile_program(program: Program, keys: Dict[str, Any]) -> Callable[[Any], Tuple]:
+    """
+    Compile a program into a Python function evaluating it on a row
+
+    ----
+
+    The program is turned once into the source code of a function, with every attribute resolved to its key in the
+    row, ex: for the formulas {'x': 'a + b', 'y': '(b + a) / c'} and keys {'a': 0, 'b': 1, 'c': 2}:
+
+    |      def evaluate(row):
+    |          try:
+    |              s0 = float(row[0])
+    |              s1 = float(row[1])
+    |              s3 = float(row[2])
+    |          except (ValueError, TypeError, LookupError):
+    |              s0 = _number(row, 0, 'a')
+    |              s1 = _number(row, 1, 'b')
+    |              s3 = _number(row, 2, 'c')
+    |          s2 = None if s0 is None or s1 is None else s0 + s1
+    |          s4 = None if s2 is None or not s3 else s2 / s3
+    |          return (s2, s4)
+
+    |  So evaluating a row is a single call, without looking at the tokens again, each attribute is converted once and
+    each sub-expression computed once. A missing operand or a division by zero make the result None, as well as the
+    result of every formula using it
+
+    :param program: program to compile, as returned by ``plan_formulas``
+    :param keys: key of each attribute in the rows, its index for lists of values or its name for dictionaries
+    :return: function taking a row and returning the result of each formula, in the order of the formulas
+    :raise: AttributeError if an attribute of the program is not in keys
+    """
+    for name in program.loads.values():
+        if name not in keys:
+            raise AttributeError(f"No such attribute: {name}")
+    lines = ["def evaluate(row):"]
+    if program.loads:
+        lines.append("    try:")
+        lines.extend(f"        s{slot} = float(row[{keys[name]!r}])" for slot, name in program.loads.items())
+        lines.append("    except (ValueError, TypeError, LookupError):")
+        lines.extend(f"        s{slot} = _number(row, {keys[name]!r}, {name!r})" for slot, name in program.loads.items())
+    lines.extend(f"    s{slot} = _c{slot}" for slot in program.constants)
+    for slot, (item, slot_a, slot_b) in program.steps.items():
+        if item == 'neg':
+            lines.append(f"    s{slot} = None if s{slot_a} is None else -s{slot_a}")
+        elif item == '/':
+            lines.append(f"    s{slot} = None if s{slot_a} is None or not s{slot_b} else s{slot_a} / s{slot_b}")
+        else:
+            lines.append(f"    s{slot} = None if s{slot_a} is None or s{slot_b} is None else s{slot_a} {item} s{slot_b}")
+    results = [f"s{slot}" for slot in program.results.values()]
+    lines.append(f"    return ({', '.join(results)},)")
+    namespace = {'_number': _number}
+    namespace.update((f"_c{slot}", value) for slot, value in program.constants.items())
+    exec(compile('\n'.join(lines), '<expression>', 'exec'), namespace)
+    return namespace['evaluate']
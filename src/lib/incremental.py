@@ -0,0 +1,290 @@
+import os
+import csv
+import json
+import hashlib
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .profile import ColumnProfile, profile
+from .projection import ends_quoted
+
+# suffix added to the data file's name to get the name of its statistics sidecar
+SIDECAR_SUFFIX = '.stats'
+
+# size of the blocks read while looking for the last record boundary or computing the checksum of the covered region
+_BLOCK_SIZE = 1 << 20
+
+# version of the sidecar's content, sidecars of another version are ignored and written again
+_VERSION = 4
+
+
+def sidecar_name(file: str) -> str:
+    """
+    Name of the statistics sidecar of a data file
+
+    :param file: name of the data file
+    :return: name of the sidecar file, next to the data file
+    """
+    return file + SIDECAR_SUFFIX
+
+
+def _hash(digest: Any, file: str, start: int, end: int) -> None:
+    """
+    Feed a byte range of a data file into a checksum
+
+    :param digest: hashlib object to update
+    :param file: name of the data file
+    :param start: offset of the first byte of the range
+    :param end: offset following the last byte of the range
+    """
+    with open(file, 'rb') as data_file:
+        data_file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = data_file.read(min(_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+
+
+def _last_boundary(file: str, start: int, delimiter: str) -> int:
+    """
+    Find the last record boundary of a data file after a given record boundary
+
+    ----
+
+    A record boundary is the offset following a newline which is not inside a quoted value, the bytes after the last
+    one belong to a record which may still be being appended
+
+    |  The file is read by blocks cut after their last newline, a block without quotes outside of a quoted value end at
+    a boundary, other blocks are read line by line with the quotes read as ``csv.reader`` does, see
+    ``projection.ends_quoted``
+
+    :param file: name of the data file
+    :param start: offset of a record boundary
+    :param delimiter: delimiter of each value in the file
+    :return: offset of the last record boundary, start if there is none after it
+    """
+    separator = delimiter.encode('utf-8')
+    boundary = start
+    position = start
+    quoted = False
+    rest = b''
+    with open(file, 'rb') as data_file:
+        data_file.seek(start)
+        for block in iter(lambda: data_file.read(_BLOCK_SIZE), b''):
+            data = rest + block
+            cut = data.rfind(b'\n') + 1
+            rest = data[cut:]
+            if not quoted and data.find(b'"', 0, cut) == -1:
+                if cut:
+                    boundary = position + cut
+            else:
+                end = position
+                for line in data[:cut].split(b'\n')[:-1]:
+                    end += len(line) + 1
+                    if quoted or b'"' in line:
+                        quoted = ends_quoted(line, separator, quoted)
+                    if not quoted:
+                        boundary = end
+            position += cut
+    return boundary
+
+
+def _answers(saved: List, options: List) -> bool:
+    """
+    Tell whether profiles computed with some options can answer a profiling request
+
+    ----
+
+    Profiles keeping distributions answer requests which don't need them, and for the medians, exact values or a
+    sketch at most as wrong as requested are enough
+
+    :param saved: distributions, quantile_error and mode_capacity the profiles were computed with
+    :param options: distributions, quantile_error and mode_capacity of the request
+    :return: whether the profiles answer the request
+    """
+    saved_distributions, saved_error, saved_capacity = saved
+    distributions, quantile_error, mode_capacity = options
+    if not distributions:
+        return True
+    if not saved_distributions or saved_capacity != mode_capacity:
+        return False
+    return saved_error is None or quantile_error is not None and saved_error <= quantile_error
+
+
+def _load(sidecar: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a statistics sidecar
+
+    :param sidecar: name of the sidecar file
+    :return: content of the sidecar, None if it does not exist or can't be read
+    """
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as json_file:
+            saved = json.load(json_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(saved, dict) or saved.get('version') != _VERSION:
+        return None
+    return saved
+
+
+def _store(sidecar: str, data: Dict[str, Any]) -> None:
+    """
+    Write a statistics sidecar, the old one is only replaced once the new one is complete
+
+    :param sidecar: name of the sidecar file
+    :param data: content of the sidecar
+    """
+    fd, temporary = tempfile.mkstemp(suffix=SIDECAR_SUFFIX, dir=os.path.dirname(os.path.abspath(sidecar)))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as json_file:
+            json.dump(data, json_file)
+        os.replace(temporary, sidecar)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def _read_range(file: str, start: int, end: int) -> Iterator[str]:
+    """
+    Read the lines of a byte range of a data file one by one, the range is never held in memory as a whole
+
+    :param file: name of the data file
+    :param start: offset of the first byte of the range, a record boundary
+    :param end: offset following the last byte of the range
+    :return: generator of the decoded lines of the range
+    """
+    with open(file, 'rb') as data_file:
+        data_file.seek(start)
+        position = start
+        for line in data_file:
+            if position >= end:
+                break
+            position += len(line)
+            yield line.decode('utf-8')
+
+
+def _profile_range(file: str, start: int, end: int, delimiter: str, fieldnames: Optional[List[str]],
+                   options: List) -> Tuple[List[str], int, Dict[str, ColumnProfile]]:
+    """
+    Profile every attribute on the rows of a byte range
+
+    :param file: name of the data file
+    :param start: offset of the first byte of the range, a record boundary
+    :param end: offset following the last byte of the range
+    :param delimiter: delimiter of each value in the file
+    :param fieldnames: fieldnames of the file, if None, the first row of the range is the fieldnames row
+    :param options: distributions, quantile_error and mode_capacity of the profiles
+    :return: fieldnames, number of rows of the range and the profiles of its attributes, row numbers starting at 0
+    """
+    rows = csv.reader(_read_range(file, start, end), delimiter=delimiter)
+    if fieldnames is None:
+        fieldnames = next(rows, [])
+    profiles = {name: ColumnProfile(name, *options) for name in fieldnames}
+    targets = list(enumerate(profiles.values()))
+    row_number = 0
+    for row in rows:
+        if not row:
+            continue
+        for index, column in targets:
+            column.update(row[index] if index < len(row) else None, row_number)
+        row_number += 1
+    return fieldnames, row_number, profiles
+
+
+def incremental_profile(file: str, delimiter: str = ',', columns: Iterable[str] = None, distributions: bool = True,
+                        quantile_error: float = None, mode_capacity: int = None,
+                        sidecar: str = None) -> Dict[str, ColumnProfile]:
+    """
+    Compute the profile of every attribute of an append-only data file, reading only the bytes appended since the last
+    call
+
+    ----
+
+    The profiles of every attribute are saved in a sidecar file next to the data file, with the number of bytes and
+    rows they cover, the size and modification time of the file and a blake2b checksum of the covered bytes. On the
+    next call, if the file is the same size and modification time, or the covered bytes have the same checksum, only
+    the following bytes are profiled and merged into the saved profiles, which give the same result as
+    ``profile.profile`` except for float rounding of sums, means and variances, see ``ColumnProfile.merge``. If the
+    data file was shortened or its covered bytes modified, or the saved profiles lack what is asked for, ex:
+    distributions, they are computed again from the start of the file
+
+    |  The covered bytes are read again to check them unless the size and modification time are unchanged, hashing raw
+    bytes cost far less than parsing them, so a call is still mostly the cost of profiling the appended rows. The
+    checksum of the new covered region continue the one of the old region, so the bytes are only read once
+
+    |  With distributions, the sidecar hold every NUMERIC value unless quantile_error is given, in which case it hold
+    a sketch of a few KB per attribute, and every distinct value unless mode_capacity is given, so without them it
+    grow about as big as the data file. A sidecar with a sketch answer the later calls asking for the same or a
+    bigger quantile_error
+
+    |  Only whole records are covered, a last record without its newline is profiled on every call until it is
+    completed
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param columns: names of the attributes to return, if not specified, all attributes will be returned, every
+                    attribute is profiled anyway so the sidecar can serve any later call
+    :param distributions: whether to keep what median and mode need
+    :param quantile_error: if specified, quantiles are approximated with this normalized rank error
+    :param mode_capacity: if specified, modes are approximated by counting at most this many distinct values
+    :param sidecar: name of the sidecar file, if not specified, the data file's name followed by ``SIDECAR_SUFFIX``
+    :return: a dictionary which hold key-value pair, in the order of the file's fieldnames:
+                key: name of the attribute
+                value: profile of this attribute
+    :raise: AttributeError if one of the given columns is not an attribute of the file
+    """
+    sidecar = sidecar or sidecar_name(file)
+    status = os.stat(file)
+    size = status.st_size
+    saved = _load(sidecar)
+    options = [distributions, quantile_error, mode_capacity]
+    fieldnames = None
+    offset = 0
+    row_offset = 0
+    profiles = {}
+    digest = hashlib.blake2b(digest_size=16)
+    hashed = 0
+    if saved is not None and saved['delimiter'] == delimiter and saved['offset'] <= size \
+            and _answers(saved['options'], options):
+        unchanged = [saved['size'], saved['mtime']] == [size, status.st_mtime_ns]
+        if not unchanged:
+            _hash(digest, file, 0, saved['offset'])
+            hashed = saved['offset']
+        if unchanged or digest.hexdigest() == saved['checksum']:
+            options = saved['options']
+            fieldnames = saved['fieldnames']
+            offset = saved['offset']
+            row_offset = saved['rows']
+            profiles = {name: ColumnProfile.from_dict(data) for name, data in saved['profiles'].items()}
+    boundary = _last_boundary(file, offset, delimiter)
+    if fieldnames is None and boundary == 0:
+        return profile(file, delimiter, columns, distributions, quantile_error, mode_capacity)
+    if boundary > offset:
+        fieldnames, rows, partial = _profile_range(file, offset, boundary, delimiter, fieldnames, options)
+        if offset:
+            for name, column in profiles.items():
+                column.merge(partial[name], row_offset)
+        else:
+            profiles = partial
+        row_offset += rows
+        if hashed != offset:
+            digest = hashlib.blake2b(digest_size=16)
+            _hash(digest, file, 0, offset)
+        _hash(digest, file, offset, boundary)
+        _store(sidecar, {'version': _VERSION, 'delimiter': delimiter, 'options': options, 'fieldnames': fieldnames,
+                         'offset': boundary, 'rows': row_offset, 'size': size, 'mtime': status.st_mtime_ns,
+                         'checksum': digest.hexdigest(),
+                         'profiles': {name: column.to_dict() for name, column in profiles.items()}})
+    if size > boundary:
+        _, _, partial = _profile_range(file, boundary, size, delimiter, fieldnames, options)
+        for name, column in profiles.items():
+            column.merge(partial[name], row_offset)
+    names = list(fieldnames) if columns is None else list(columns)
+    for name in names:
+        if name not in fieldnames:
+            raise AttributeError(f"No such attribute: {name}")
+    return {name: column for name, column in profiles.items() if name in names}
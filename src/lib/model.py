@@ -0,0 +1,90 @@
+import json
+from typing import Any, Dict, List
+
+
+class PreprocessingModel:
+    """
+    Preprocessing parameters fitted on a data file, to be applied as they are to other data files
+
+    ----
+
+    Hold for each attribute of the fitted file its data type, the value its missing cells are filled with, if any, and
+    the parameters of its normalization, if any: min and max for min-max, mean and standard deviation for z-score
+
+    |  The model is made of plain values only, so it can be saved as JSON and loaded back, ex: fit on a reference batch
+    once, then transform every following batch with the same parameters
+    """
+
+    def __init__(self, fieldnames: List[str], types: Dict[str, str], fill_values: Dict[str, Any] = None,
+                 normalizations: Dict[str, Dict[str, Any]] = None) -> None:
+        """
+        Class constructor
+
+        :param fieldnames: names of the attributes of the fitted file, in order
+        :param types: name of the DataType of each attribute, ex: 'NUMERIC'
+        :param fill_values: value to fill the missing cells of each attribute with
+        :param normalizations: parameters of the normalization of each attribute, ex:
+                               {'type': 'MIN_MAX', 'min': 0.0, 'max': 10.0} or
+                               {'type': 'Z_SCORE', 'mean': 5.0, 'standard_deviation': 2.0}
+        """
+        self.fieldnames = list(fieldnames)
+        self.types = dict(types)
+        self.fill_values = dict(fill_values or {})
+        self.normalizations = dict(normalizations or {})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Turn the model into a JSON-serializable dictionary
+
+        :return: a dictionary with the fieldnames and, for each attribute, its type, fill value and normalization
+        """
+        columns = {}
+        for name in self.fieldnames:
+            column = {'type': self.types.get(name)}
+            if name in self.fill_values:
+                column['fill'] = self.fill_values[name]
+            if name in self.normalizations:
+                column['normalization'] = self.normalizations[name]
+            columns[name] = column
+        return {'fieldnames': self.fieldnames, 'columns': columns}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PreprocessingModel':
+        """
+        Create a model from a dictionary returned by ``to_dict``
+
+        :param data: dictionary of the model
+        :return: the model
+        :raise: ValueError if the dictionary is not a preprocessing model
+        """
+        try:
+            fieldnames = data['fieldnames']
+            columns = data['columns']
+        except (KeyError, TypeError) as e:
+            raise ValueError("Not a preprocessing model") from e
+        types = {name: column.get('type') for name, column in columns.items()}
+        fill_values = {name: column['fill'] for name, column in columns.items() if 'fill' in column}
+        normalizations = {name: column['normalization'] for name, column in columns.items()
+                          if 'normalization' in column}
+        return cls(fieldnames, types, fill_values, normalizations)
+
+    def save(self, file: str) -> None:
+        """
+        Save the model as a JSON file
+
+        :param file: name of the file to write
+        """
+        with open(file, 'w', encoding='utf-8') as json_file:
+            json.dump(self.to_dict(), json_file, indent=2)
+
+    @classmethod
+    def load(cls, file: str) -> 'PreprocessingModel':
+        """
+        Load a model saved by ``save``
+
+        :param file: name of the JSON file
+        :return: the model
+        :raise: ValueError if the file is not a preprocessing model
+        """
+        with open(file, 'r', encoding='utf-8') as json_file:
+            return cls.from_dict(json.load(json_file))
@@ -0,0 +1,266 @@
+import os
+import io
+import csv
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Iterable, Iterator, Set, Any
+from .profile import ColumnProfile
+from .dedup import DigestSet, row_digest
+from .records import load_index
+from .projection import ends_quoted, project_range
+
+# size of the blocks read while looking for record boundaries
+_BLOCK_SIZE = 1 << 20
+
+# ranges are not made smaller than this, below it starting a worker cost more than it save
+MIN_RANGE_SIZE = 1 << 20
+
+# number of ranges given to each worker, more ranges than workers balance uneven ranges
+_RANGES_PER_WORKER = 4
+
+
+def record_boundaries(file: str, targets: Iterable[int], delimiter: str = ',') -> List[int]:
+    """
+    Find the first record boundary at or after each of the given byte offsets
+
+    ----
+
+    A record boundary is the offset following a newline which is not inside a quoted value, the file is read once by
+    blocks cut after their last newline. In a block without quotes outside of a quoted value, every newline end a
+    record, so the boundaries are found with ``bytes.find``, other blocks are read line by line and quotes are read as
+    ``csv.reader`` does, see ``projection.ends_quoted``
+
+    :param file: name of the data file
+    :param targets: byte offsets, in increasing order
+    :param delimiter: delimiter of each value in the file
+    :return: offset of the boundary found for each target, the size of the file if there is none after it
+    """
+    separator = delimiter.encode('utf-8')
+    targets = list(targets)
+    boundaries = []
+    position = 0
+    quoted = False
+    rest = b''
+    with open(file, 'rb') as data_file:
+        while len(boundaries) < len(targets):
+            block = data_file.read(_BLOCK_SIZE)
+            data = rest + block
+            cut = data.rfind(b'\n') + 1 if block else len(data)
+            rest = data[cut:]
+            if not quoted and data.find(b'"', 0, cut) == -1:
+                while len(boundaries) < len(targets):
+                    target = targets[len(boundaries)]
+                    if target <= position:
+                        boundaries.append(position)
+                        continue
+                    newline = data.find(b'\n', target - position - 1, cut)
+                    if newline == -1:
+                        break
+                    boundaries.append(position + newline + 1)
+            else:
+                start = 0
+                for line in data[:cut].split(b'\n')[:-1]:
+                    if not quoted:
+                        while len(boundaries) < len(targets) and targets[len(boundaries)] <= position + start:
+                            boundaries.append(position + start)
+                    if quoted or b'"' in line:
+                        quoted = ends_quoted(line, separator, quoted)
+                    start += len(line) + 1
+            position += cut
+            if not block:
+                break
+    size = os.path.getsize(file)
+    return boundaries + [size] * (len(targets) - len(boundaries))
+
+
+def split_ranges(file: str, parts: int, delimiter: str = ',') -> List[Tuple[int, int]]:
+    """
+    Split the rows of a data file into byte ranges aligned on record boundaries
+
+    |  If the data file has an up to date row index, see ``records.record_index``, the ranges are taken from it and
+    hold the same number of rows, otherwise record boundaries are searched near evenly spaced byte offsets
+
+    :param file: name of the data file
+    :param parts: number of ranges wanted, fewer are returned if some of them would be empty
+    :param delimiter: delimiter of each value in the file
+    :return: list of (start, end) byte offsets, the fieldnames row is excluded
+    """
+    offsets = load_index(file, delimiter=delimiter)
+    if offsets is not None and len(offsets) > 1:
+        rows = len(offsets) - 1
+        boundaries = [offsets[rows * part // max(parts, 1)] for part in range(max(parts, 1))] + [offsets[-1]]
+        return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+    size = os.path.getsize(file)
+    header_end = record_boundaries(file, [1], delimiter)[0]
+    step = (size - header_end) / max(parts, 1)
+    targets = [header_end] + [math.ceil(header_end + step * part) for part in range(1, parts)]
+    boundaries = record_boundaries(file, targets, delimiter) + [size]
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def read_range(file: str, start: int, end: int, delimiter: str = ',') -> Iterator[List[str]]:
+    """
+    Parse the rows of a byte range of a data file
+
+    :param file: name of the data file
+    :param start: offset of the first byte of the range, a record boundary
+    :param end: offset following the last byte of the range, a record boundary
+    :param delimiter: delimiter of each value in the file
+    :return: generator of the rows of the range, as lists of values
+    """
+    with open(file, 'rb') as data_file:
+        data_file.seek(start)
+        data = data_file.read(end - start)
+    return csv.reader(io.StringIO(data.decode('utf-8'), newline=''), delimiter=delimiter)
+
+
+def _profile_range(task: Tuple) -> Tuple[int, Dict[str, ColumnProfile]]:
+    """
+    Profile the rows of one byte range, run by the workers of the process pool
+
+    |  If only some attributes are profiled, only their fields are parsed, see ``projection.project_lines``
+
+    :param task: file, start, end, delimiter, fieldnames, names of the attributes to profile, distributions,
+                 quantile_error and mode_capacity
+    :return: number of rows of the range and the profiles of its attributes, row numbers starting at 0
+    """
+    file, start, end, delimiter, fieldnames, names, distributions, quantile_error, mode_capacity = task
+    profiles = {name: ColumnProfile(name, distributions, quantile_error, mode_capacity) for name in names}
+    targets = [(fieldnames.index(name), column) for name, column in profiles.items()]
+    if len(targets) < len(fieldnames):
+        rows = project_range(file, start, end, delimiter, [index for index, _ in targets])
+        targets = list(enumerate(profiles.values()))
+    else:
+        rows = filter(None, read_range(file, start, end, delimiter))
+    row_number = 0
+    for row in rows:
+        for index, column in targets:
+            column.update(row[index] if index < len(row) else None, row_number)
+        row_number += 1
+    return row_number, profiles
+
+
+def _digest_range(task: Tuple) -> Tuple[int, List[Tuple[bytes, int]], List[int]]:
+    """
+    Fingerprint the rows of one byte range, run by the workers of the process pool
+
+    :param task: file, start, end and delimiter
+    :return: number of rows of the range, (digest, row number) of the first occurrence of each row inside the range and
+             row numbers of the other occurrences, row numbers starting at 0 and excluding blank rows
+    """
+    file, start, end, delimiter = task
+    digests = DigestSet()
+    firsts = []
+    duplicates = []
+    row_number = 0
+    for row_number, row in enumerate(filter(None, read_range(file, start, end, delimiter)), start=1):
+        digest = row_digest(row)
+        if digests.add(digest):
+            firsts.append((digest, row_number - 1))
+        else:
+            duplicates.append(row_number - 1)
+    return row_number, firsts, duplicates
+
+
+def _map_ranges(function: Any, tasks: List[Tuple], workers: int) -> Iterator:
+    """
+    Run a function on every task in a process pool, results are yielded in the order of the tasks
+
+    ----
+
+    A single task, ex: for a file smaller than ``MIN_RANGE_SIZE``, or a single worker, is run in this process, so no
+    pool is started for nothing
+
+    :param function: module level function to run
+    :param tasks: arguments of each call
+    :param workers: number of processes
+    :return: generator of the results
+    """
+    if len(tasks) <= 1 or workers <= 1:
+        yield from map(function, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(function, tasks)
+
+
+def _parts(file: str, workers: int) -> int:
+    """
+    Number of ranges to split a data file into for the given number of workers
+
+    :param file: name of the data file
+    :param workers: number of processes
+    :return: number of ranges
+    """
+    return max(1, min(workers * _RANGES_PER_WORKER, os.path.getsize(file) // MIN_RANGE_SIZE))
+
+
+def parallel_profile(file: str, delimiter: str = ',', columns: Iterable[str] = None, workers: int = 2,
+                     distributions: bool = True, quantile_error: float = None,
+                     mode_capacity: int = None) -> Dict[str, ColumnProfile]:
+    """
+    Compute the profile of every attribute of a data file with a pool of processes
+
+    ----
+
+    The rows of the file are split into byte ranges aligned on record boundaries, each range is profiled by a worker
+    process, then the partial profiles are merged in the order of the ranges, which give the same result as
+    ``profile.profile`` except for float rounding: counts, missing rows, min, max, modes and exact medians are the
+    same, but the sums, means and variances of the ranges are combined, see ``ColumnProfile.merge``, so they may
+    differ from the ones of a sequential read in their last digits
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param columns: names of the attributes to profile, if not specified, all attributes will be profiled
+    :param workers: number of processes
+    :param distributions: whether to keep what median and mode need
+    :param quantile_error: if specified, quantiles are approximated with this normalized rank error
+    :param mode_capacity: if specified, modes are approximated by counting at most this many distinct values
+    :return: a dictionary which hold key-value pair, in the order of the file's fieldnames:
+                key: name of the attribute
+                value: profile of this attribute
+    :raise: AttributeError if one of the given columns is not an attribute of the file
+    """
+    with open(file, 'r') as csv_file:
+        fieldnames = next(csv.reader(csv_file, delimiter=delimiter), [])
+    names = list(fieldnames) if columns is None else list(columns)
+    for name in names:
+        if name not in fieldnames:
+            raise AttributeError(f"No such attribute: {name}")
+    names = [name for name in fieldnames if name in names]
+    profiles = {name: ColumnProfile(name, distributions, quantile_error, mode_capacity) for name in names}
+    tasks = [(file, start, end, delimiter, fieldnames, names, distributions, quantile_error, mode_capacity)
+             for start, end in split_ranges(file, _parts(file, workers), delimiter)]
+    row_offset = 0
+    for rows, partial in _map_ranges(_profile_range, tasks, workers):
+        for name, column in profiles.items():
+            column.merge(partial[name], row_offset)
+        row_offset += rows
+    return profiles
+
+
+def parallel_duplicate_rows(file: str, delimiter: str = ',', workers: int = 2) -> Set[int]:
+    """
+    Find the duplicated rows of a data file with a pool of processes
+
+    ----
+
+    Each byte range is fingerprinted by a worker, which already drop the duplicates inside its range, the first
+    occurrences of every range are then checked against the digests of the previous ranges in order, so the first
+    occurrence of each row in the whole file is the one kept
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param workers: number of processes
+    :return: set of the row numbers to delete, row numbers start at 0 and exclude fieldnames row and blank rows
+    """
+    tasks = [(file, start, end, delimiter) for start, end in split_ranges(file, _parts(file, workers), delimiter)]
+    digests = DigestSet()
+    duplicates = set()
+    row_offset = 0
+    for rows, firsts, partial_duplicates in _map_ranges(_digest_range, tasks, workers):
+        duplicates.update(row_number + row_offset for row_number in partial_duplicates)
+        for digest, row_number in firsts:
+            if not digests.add(digest):
+                duplicates.add(row_number + row_offset)
+        row_offset += rows
+    return duplicates
@@ -0,0 +1,498 @@
+from typing import Dict, List, Optional, Set, Iterable, Iterator, Union, TYPE_CHECKING
+from .profile import ColumnProfile
+from .dedup import DigestSet, row_digest
+from .expression import parse_formulas, plan_formulas, compile_program
+
+if TYPE_CHECKING:
+    from .preprocessor import DataPreprocessor, FillType, NormalizationType
+
+# stands for "every attribute" in the reads/writes of a step
+ALL = None
+
+
+def _overlap(first: Optional[Set[str]], second: Optional[Set[str]]) -> bool:
+    """
+    Determine whether two sets of attributes share an attribute, ALL sharing everything with a non-empty set
+
+    :param first: set of attribute names or ALL
+    :param second: set of attribute names or ALL
+    :return: whether the sets overlap
+    """
+    if first is ALL:
+        return second is ALL or bool(second)
+    if second is ALL:
+        return bool(first)
+    return bool(first & second)
+
+
+def _union(first: Optional[Set[str]], second: Optional[Set[str]]) -> Optional[Set[str]]:
+    """
+    Union of two sets of attributes, ALL absorbing everything
+
+    :param first: set of attribute names or ALL
+    :param second: set of attribute names or ALL
+    :return: union of the sets
+    """
+    if first is ALL or second is ALL:
+        return ALL
+    return first | second
+
+
+class _Step:
+    """
+    Plan node of a pipeline, a single preprocessing operation
+
+    ----
+
+    Each step describe how it transform a row, which attributes it need statistics on (stats), which attributes it may
+    change (writes), whether it delete rows (filters) and which attributes its changes or deletions depend on (reads),
+    so the pipeline can tell which steps can share a scan of the data file
+
+    |  Rows are lists of values, each step resolve the attributes it use to their positions in its input once, when it
+    is bound to the fieldnames of a read
+    """
+    stats: Optional[Set[str]] = set()
+    reads: Optional[Set[str]] = set()
+    writes: Optional[Set[str]] = set()
+    filters = False
+    distributions = False
+    quantile_error = None
+    mode_capacity = None
+
+    def __init__(self) -> None:
+        """ Class constructor """
+        self.fitted = not self.needs_stats
+
+    @property
+    def needs_stats(self) -> bool:
+        """
+        Whether the step need statistics of the data before transforming rows
+
+        :return: True if the step must be fitted by a scan
+        """
+        return self.stats is ALL or bool(self.stats)
+
+    def fit(self, profiles: Dict[str, ColumnProfile]) -> None:
+        """
+        Compute the parameters of the step from the profiles of its input
+
+        :param profiles: profiles of the attributes this step need statistics on
+        """
+        self.fitted = True
+
+    def bind(self, fieldnames: List[str]) -> List[str]:
+        """
+        Prepare the step for a read of the data file, resetting the state it keep across rows and resolving the
+        positions of the attributes it use, a fitted step is always bound again before its first row
+
+        :param fieldnames: fieldnames of the rows input to this step
+        :return: fieldnames of the rows output by this step
+        """
+        return fieldnames
+
+    def apply(self, row: List[str]) -> Optional[List[str]]:
+        """
+        Transform one row
+
+        :param row: values of the row to transform, in the order of the bound fieldnames, may be modified in place
+        :return: transformed row, None if the row is deleted
+        """
+        return row
+
+
+class _FillNanStep(_Step):
+    """ Plan node of ``DataPreprocessor.fill_nan`` """
+    stats = ALL
+    reads = ALL
+    writes = ALL
+    distributions = True
+
+    def __init__(self, processor: 'DataPreprocessor', numeric_fill: 'FillType', fall_back: str,
+                 quantile_error: float, mode_capacity: int) -> None:
+        super().__init__()
+        self._processor = processor
+        self._numeric_fill = numeric_fill
+        self._fall_back = fall_back
+        self.quantile_error = quantile_error
+        self.mode_capacity = mode_capacity
+        self._fill_values = {}
+        self._positions = []
+
+    def __str__(self) -> str:
+        return f"fill_nan({self._numeric_fill.name})"
+
+    def fit(self, profiles: Dict[str, ColumnProfile]) -> None:
+        self._fill_values = self._processor._fill_values(profiles, self._numeric_fill, self._fall_back)
+        super().fit(profiles)
+
+    def bind(self, fieldnames: List[str]) -> List[str]:
+        self._positions = [(fieldnames.index(attribute), value) for attribute, value in self._fill_values.items()
+                           if attribute in fieldnames]
+        return fieldnames
+
+    def apply(self, row: List[str]) -> Optional[List[str]]:
+        for index, value in self._positions:
+            if row[index] == '' or row[index] is None:
+                row[index] = value
+        return row
+
+
+class _DeleteMissingRowStep(_Step):
+    """ Plan node of ``DataPreprocessor.delete_missing_row`` """
+    reads = ALL
+    filters = True
+
+    def __init__(self, threshold: int, threshold_pct: float) -> None:
+        super().__init__()
+        self._threshold = threshold
+        self._threshold_pct = threshold_pct
+        self._current = threshold
+
+    def __str__(self) -> str:
+        if self._threshold_pct:
+            return f"delete_missing_row(threshold_pct={self._threshold_pct})"
+        return f"delete_missing_row(threshold={self._threshold})"
+
+    def bind(self, fieldnames: List[str]) -> List[str]:
+        if self._threshold_pct:
+            self._current = int(len(fieldnames) * self._threshold_pct)
+        return fieldnames
+
+    def apply(self, row: List[str]) -> Optional[List[str]]:
+        missing = sum(1 for value in row if value == '' or value is None)
+        if missing and missing >= self._current:
+            return None
+        return row
+
+
+class _DeleteMissingColumnStep(_Step):
+    """ Plan node of ``DataPreprocessor.delete_missing_column`` """
+    stats = ALL
+    reads = ALL
+    writes = ALL
+
+    def __init__(self, threshold: int, threshold_pct: float) -> None:
+        super().__init__()
+        self._threshold = threshold
+        self._threshold_pct = threshold_pct
+        self._deleted = set()
+        self._kept = []
+
+    def __str__(self) -> str:
+        if self._threshold_pct:
+            return f"delete_missing_column(threshold_pct={self._threshold_pct})"
+        return f"delete_missing_column(threshold={self._threshold})"
+
+    def fit(self, profiles: Dict[str, ColumnProfile]) -> None:
+        threshold = self._threshold
+        if self._threshold_pct:
+            threshold = int(max((column.rows for column in profiles.values()), default=0) * self._threshold_pct)
+        self._deleted = {name for name, column in profiles.items() if column.missing and column.missing >= threshold}
+        super().fit(profiles)
+
+    def bind(self, fieldnames: List[str]) -> List[str]:
+        self._kept = [index for index, name in enumerate(fieldnames) if name not in self._deleted]
+        return [fieldnames[index] for index in self._kept]
+
+    def apply(self, row: List[str]) -> Optional[List[str]]:
+        return [row[index] for index in self._kept]
+
+
+class _NormalizationStep(_Step):
+    """ Plan node of ``DataPreprocessor.normalization`` """
+
+    def __init__(self, processor: 'DataPreprocessor',
+                 attribute: Union[str, Iterable[str], Dict[str, 'NormalizationType'], None],
+                 normalization_type: Optional['NormalizationType']) -> None:
+        if attribute is None:
+            names = ALL
+        elif isinstance(attribute, str):
+            names = {attribute}
+        else:
+            attribute = attribute if isinstance(attribute, dict) else list(attribute)
+            names = set(attribute)
+        if normalization_type is None and not isinstance(attribute, dict):
+            raise ValueError("Normalization type must be specified")
+        self.stats = names
+        self.reads = names
+        self.writes = names
+        super().__init__()
+        self._processor = processor
+        self._attribute = attribute
+        self._normalization_type = normalization_type
+        self._rescales = []
+        self._positions = []
+
+    def __str__(self) -> str:
+        if self._attribute is None:
+            return f"normalization(NUMERIC, {self._normalization_type.name})"
+        if isinstance(self._attribute, str):
+            return f"normalization({self._attribute}, {self._normalization_type.name})"
+        types = self._processor._normalization_types(self._attribute, self._normalization_type, {})
+        return f"normalization({', '.join(f'{name}: {value.name}' for name, value in types.items())})"
+
+    def fit(self, profiles: Dict[str, ColumnProfile]) -> None:
+        types = self._processor._normalization_types(self._attribute, self._normalization_type, profiles)
+        self._rescales = [(name, self._processor._rescale_function(profiles[name], attribute_type))
+                          for name, attribute_type in types.items()]
+        super().fit(profiles)
+
+    def bind(self, fieldnames: List[str]) -> List[str]:
+        self._positions = [(fieldnames.index(name), rescale) for name, rescale in self._rescales
+                           if name in fieldnames]
+        return fieldnames
+
+    def apply(self, row: List[str]) -> Optional[List[str]]:
+        for index, rescale in self._positions:
+            row[index] = rescale(row[index])
+        return row
+
+
+class _AttributesCalculationStep(_Step):
+    """ Plan node of ``DataPreprocessor.attributes_calculation`` """
+
+    def __init__(self, calc_str: Union[str, Dict[str, str]], col_name: str) -> None:
+        super().__init__()
+        self._formulas = parse_formulas(calc_str, col_name)
+        self.reads = set(plan_formulas(self._formulas).loads.values())
+        self.writes = set(self._formulas)
+
+    def __str__(self) -> str:
+        return f"attributes_calculation({', '.join(self._formulas)})"
+
+    def bind(self, fieldnames: List[str]) -> List[str]:
+        keys = {name: index for index, name in enumerate(fieldnames)}
+        self._evaluate = compile_program(plan_formulas(self._formulas, keys), keys)
+        self._width = len(fieldnames)
+        return fieldnames + list(self._formulas)
+
+    def apply(self, row: List[str]) -> Optional[List[str]]:
+        row[self._width:] = [calc_result if calc_result is not None else '' for calc_result in self._evaluate(row)]
+        return row
+
+
+class _DeleteDuplicateRowStep(_Step):
+    """ Plan node of ``DataPreprocessor.delete_duplicate_row`` """
+    reads = ALL
+    filters = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._digests = DigestSet()
+
+    def __str__(self) -> str:
+        return "delete_duplicate_row()"
+
+    def bind(self, fieldnames: List[str]) -> List[str]:
+        self._digests = DigestSet()
+        return fieldnames
+
+    def apply(self, row: List[str]) -> Optional[List[str]]:
+        if self._digests.add(row_digest(row)):
+            return row
+        return None
+
+
+class Pipeline:
+    """
+    Lazy chain of preprocessing operations on a data file
+
+    ----
+
+    Operations are only recorded as plan nodes when called, and executed together by ``execute``: statistics needed by
+    the operations are gathered by shared scans of the data file, then every operation is applied to each row in a
+    single streaming pass which write the output file, so no intermediate file is ever written
+
+    |  An operation needing statistics can share a scan with the ones before it unless one of them may change the
+    attributes its statistics depend on, ex: fill_nan then normalization need two scans since the normalization's
+    statistics must be computed on filled data, ``explain`` show how many passes the plan will make
+    """
+
+    def __init__(self, processor: 'DataPreprocessor') -> None:
+        """
+        Class constructor
+
+        :param processor: processor of the data file the operations are applied to
+        """
+        self._processor = processor
+        self._steps = []
+
+    def fill_nan(self, numeric_fill: 'FillType', fall_back: str = '0', quantile_error: float = None,
+                 mode_capacity: int = None) -> 'Pipeline':
+        """
+        Record a data fill with the specified FillType, see ``DataPreprocessor.fill_nan``
+
+        :return: this pipeline, to chain operations
+        """
+        self._steps.append(_FillNanStep(self._processor, numeric_fill, fall_back, quantile_error, mode_capacity))
+        return self
+
+    def delete_missing_row(self, threshold: int = 1, threshold_pct: float = None) -> 'Pipeline':
+        """
+        Record a deletion of rows with missing values, see ``DataPreprocessor.delete_missing_row``
+
+        :return: this pipeline, to chain operations
+        :raise: ValueError if threshold_pct is not between 0-1
+        """
+        if threshold_pct and (threshold_pct < 0 or threshold_pct > 1):
+            raise ValueError("Threshold_pct value must be between 0-1")
+        self._steps.append(_DeleteMissingRowStep(threshold, threshold_pct))
+        return self
+
+    def delete_missing_column(self, threshold: int = 1, threshold_pct: float = None) -> 'Pipeline':
+        """
+        Record a deletion of attributes with missing values, see ``DataPreprocessor.delete_missing_column``
+
+        :return: this pipeline, to chain operations
+        :raise: ValueError if threshold_pct is not between 0-1
+        """
+        if threshold_pct and (threshold_pct < 0 or threshold_pct > 1):
+            raise ValueError("Threshold_pct value must be between 0-1")
+        self._steps.append(_DeleteMissingColumnStep(threshold, threshold_pct))
+        return self
+
+    def normalization(self, attribute: Union[str, Iterable[str], Dict[str, 'NormalizationType']] = None,
+                      normalization_type: 'NormalizationType' = None) -> 'Pipeline':
+        """
+        Record a normalization of NUMERIC attributes, see ``DataPreprocessor.normalization``
+
+        :return: this pipeline, to chain operations
+        """
+        self._steps.append(_NormalizationStep(self._processor, attribute, normalization_type))
+        return self
+
+    def attributes_calculation(self, calc_str: Union[str, Dict[str, str]], col_name: str = None) -> 'Pipeline':
+        """
+        Record an attribute calculation, see ``DataPreprocessor.attributes_calculation``
+
+        :return: this pipeline, to chain operations
+        """
+        self._steps.append(_AttributesCalculationStep(calc_str, col_name))
+        return self
+
+    def delete_duplicate_row(self) -> 'Pipeline':
+        """
+        Record a deletion of duplicated rows, see ``DataPreprocessor.delete_duplicate_row``
+
+        :return: this pipeline, to chain operations
+        """
+        self._steps.append(_DeleteDuplicateRowStep())
+        return self
+
+    def _plan(self) -> List[List[int]]:
+        """
+        Assign every operation needing statistics to a scan of the data file
+
+        ----
+
+        Walking back from an operation, the set of attributes its statistics depend on is grown with the attributes
+        read by the operations before it which delete rows, or which write one of those attributes. The operation must
+        be scanned after every earlier operation needing statistics which may write one of those attributes, and is put
+        in the first scan satisfying that
+
+        :return: list of scans, each being the list of indexes of the operations it gather statistics for
+        """
+        scan_of = {}
+        for index, step in enumerate(self._steps):
+            if not step.needs_stats:
+                continue
+            needed = step.stats
+            scan = 0
+            for previous in range(index - 1, -1, -1):
+                earlier = self._steps[previous]
+                if earlier.needs_stats and _overlap(earlier.writes, needed):
+                    scan = max(scan, scan_of[previous] + 1)
+                if earlier.filters or _overlap(earlier.writes, needed):
+                    needed = _union(needed, earlier.reads)
+            scan_of[index] = scan
+        scans = [[] for _ in range(max(scan_of.values(), default=-1) + 1)]
+        for index, scan in scan_of.items():
+            scans[scan].append(index)
+        return scans
+
+    def explain(self) -> str:
+        """
+        Describe how the recorded operations will be executed
+
+        :return: text listing the scans of the data file and the operations each of them serve, then the final pass
+        """
+        scans = self._plan()
+        lines = [f"{len(scans) + 1} pass(es) over '{self._processor._file}': "
+                 f"{len(scans)} statistics scan(s) + 1 streaming write"]
+        for number, scan in enumerate(scans, start=1):
+            lines.append(f"  scan {number}: " + ', '.join(str(self._steps[index]) for index in scan))
+        lines.append("  write: " + (' -> '.join(str(step) for step in self._steps) or 'copy'))
+        return '\n'.join(lines)
+
+    def _rows(self, targets: Dict[int, Dict[str, ColumnProfile]] = None) -> Iterator[List[str]]:
+        """
+        Read the data file and push every row through the operations
+
+        ----
+
+        Operations not fitted yet let rows through unchanged, the plan guarantee they can't affect the statistics
+        gathered by this read
+
+        :param targets: profiles to feed, keyed by the index of the operation whose input they describe
+        :return: generator of rows output by the last operation
+        """
+        targets = targets or {}
+        fieldnames = self._processor._fieldnames()
+        width = len(fieldnames)
+        positions = {}
+        for index, step in enumerate(self._steps):
+            if index in targets:
+                positions[index] = [(fieldnames.index(name), column) for name, column in targets[index].items()]
+            fieldnames = step.bind(fieldnames)
+        counters = {index: 0 for index in targets}
+        for row in self._processor._rows(width):
+            for index, step in enumerate(self._steps):
+                if index in positions:
+                    for position, column in positions[index]:
+                        column.update(row[position], counters[index])
+                    counters[index] += 1
+                if step.fitted:
+                    row = step.apply(row)
+                    if row is None:
+                        break
+            else:
+                yield row
+
+    def execute(self, file_name: str = None, buffer_size: int = 1000) -> None:
+        """
+        Execute the recorded operations
+
+        ----
+
+        Gather the statistics of the operations scan by scan as planned, then apply every operation to each row while
+        writing it out
+
+        |  If file name is not specified, the data will be saved on the old file
+
+        :param file_name: name of the file to save this data
+        :param buffer_size: maximum number of rows to buffer before writing them
+        :raise: AttributeError if an operation use an attribute which is not in its input
+        :raise: TypeError if a normalized attribute is not NUMERIC
+        """
+        for scan in self._plan():
+            targets = {}
+            for index in scan:
+                step = self._steps[index]
+                names = self._processor._fieldnames()
+                for previous in self._steps[:index]:
+                    names = previous.bind(names)
+                if step.stats is not ALL:
+                    for name in step.stats:
+                        if name not in names:
+                            raise AttributeError(f"No such attribute: {name}")
+                    names = [name for name in names if name in step.stats]
+                targets[index] = {name: ColumnProfile(name, step.distributions, step.quantile_error,
+                                                      step.mode_capacity) for name in names}
+            for _ in self._rows(targets):
+                pass
+            for index in scan:
+                self._steps[index].fit(targets[index])
+        fieldnames = self._processor._fieldnames()
+        for step in self._steps:
+            fieldnames = step.bind(fieldnames)
+        self._processor._save(self._rows(), fieldnames, file_name, buffer_size)
@@ -1,9 +1,27 @@
-import math
 import os
 import csv
+import math
+import tempfile
+import warnings
+from contextlib import contextmanager
+from itertools import islice
 from enum import Enum
-from typing import Dict, List, AnyStr, Optional, Any, Tuple
-from .xfix import EquationType, infix_to_postfix, type_of
+from typing import Dict, List, AnyStr, Optional, Any, Iterable, Iterator, Callable, Sequence, Tuple, Union
+from .xfix import EquationType, type_of
+from .profile import DataType, ColumnProfile, profile, transpose_missing
+from .expression import parse_formulas, plan_formulas, compile_program
+from .model import PreprocessingModel
+from .pipeline import Pipeline
+from .parallel import parallel_profile, parallel_duplicate_rows
+from .incremental import incremental_profile
+from .cache import ProfileCache
+from .columnar import ColumnarStore, compile_columnar, profile as columnar_profile
+from .records import RecordReader, index_name
+from .bitmap import union, at_least
+from .projection import read_rows
+from .vectorized import HAS_NUMPY, read_blocks, column_values, missing_mask, to_array, from_array, z_score, \
+    min_max, evaluate_program, profile as array_profile
+from .dedup import DigestSet, row_digest, estimate_rows, partitioned_unique_rows, DIGEST_MEMORY
 
 
 class FillType(Enum):
@@ -32,29 +50,14 @@ class NormalizationType(Enum):
     Z_SCORE = 1
 
 
-class DataType(Enum):
-    """
-    Enum class define data type of each attribute
-
-    ----
-
-    Each attributes may belong to a specific type as defined here, those are:
-        - NUMERIC for float value and such, can be used in mathematics expression
-        - CATEGORICAL for named value, can't be calculated on
-        - UNKNOWN for data type does not belong to above type
-    """
-    NUMERIC = 0
-    CATEGORICAL = 1
-    UNKNOWN = 2
-
-
 class DataPreprocessor:
     """
     Main class to operate many data preprocessing method on a data file
 
     """
 
-    def __init__(self, file: str, delimiter: str = ',') -> None:
+    def __init__(self, file: str, delimiter: str = ',', workers: int = 1, vectorized: bool = False,
+                 incremental: bool = False, cache: ProfileCache = None, quote_free: bool = None) -> None:
         """
         Class constructor
 
@@ -63,41 +66,233 @@ class DataPreprocessor:
         Input file name will be checked to see if such file truly exist, error will then be raise accordingly, the
         delimiter will be used in opening data file
 
+        |  If workers is bigger than 1, scans of the data file (profiling, missing values, statistics, deduplication)
+        are split into byte ranges processed by that many processes in parallel
+
+        |  If vectorized is set and NumPy is installed, NUMERIC values are read by blocks into float64 arrays, and
+        statistics, normalization and attributes calculation run as whole-array operations, otherwise the pure-Python
+        implementation is used. NumPy is an optional dependency, a RuntimeWarning is issued if vectorized is set
+        without it
+
+        |  If incremental is set, the profiles of the attributes are saved in a sidecar file next to the data file, and
+        following profiling only read the bytes appended to the data file since then, which suit append-only files
+
+        |  If a cache is given, profiles are looked up in it before reading the data file, and saved in it after, so
+        the statistics of an unchanged file are only computed once across runs
+
+        |  Within the instance, every profile computed is kept and reused by the following methods, until the data file
+        is overwritten by the instance or modified
+
+        |  Data files without quotes are read by big blocks split with ``str.split`` instead of the ``csv`` module,
+        whether the file hold quotes is guessed from a sample of it unless quote_free is given, in any case the
+        ``csv`` module take over from the first quote found, see ``projection.read_rows``
+
         :param file: name of the data file
         :param delimiter: delimiter of each value in the file
+        :param workers: number of processes used to scan the data file
+        :param vectorized: whether to use NumPy for NUMERIC attributes when it is installed
+        :param incremental: whether to keep the profiles in a sidecar file and only profile appended rows
+        :param cache: persistent cache of the profiles, if not specified, profiles are not cached
+        :param quote_free: whether the data file hold no quote, False to always use the ``csv`` module
         :raise: FileNotFoundError if the specified file is not available
         """
         if os.path.isfile(file):
             self._file = file
             self._delimiter = delimiter
+            self._workers = workers
+            self._vectorized = vectorized and HAS_NUMPY
+            if vectorized and not HAS_NUMPY:
+                warnings.warn("NumPy is not installed, the pure-Python implementation is used instead", RuntimeWarning,
+                              stacklevel=2)
+            self._incremental = incremental
+            self._cache = cache
+            self._quote_free = quote_free
+            self._statistics = {}
+            self._signature = None
         else:
             raise FileNotFoundError(f"The file '{file}' can't be found, please try again")
 
-    def missing_cols(self) -> Dict[str, list]:
+    def _fieldnames(self) -> List[AnyStr]:
+        """
+        Getter to get the fieldnames of the data file
+
+        :return: list of the attributes' names, in the order of the file
+        """
+        with open(self._file, 'r') as csv_file:
+            return next(csv.reader(csv_file, delimiter=self._delimiter), [])
+
+    def _rows(self, width: int) -> Iterator[List[str]]:
+        """
+        Read the rows of the data file as lists of values, the fieldnames row and blank lines excluded
+
+        ----
+
+        Rows are lists of values in the order of the fieldnames, so the methods transforming them look the position of
+        each attribute up once and index the rows with it, instead of building a dictionary for every row
+
+        :param width: number of fieldnames, rows with less values are padded with empty values
+        :return: generator of the rows
+        """
+        for row in read_rows(self._file, self._delimiter, quote_free=self._quote_free):
+            if len(row) < width:
+                row.extend([''] * (width - len(row)))
+            yield row
+
+    def _profile(self, columns: Iterable[str] = None, distributions: bool = True, quantile_error: float = None,
+                 mode_capacity: int = None) -> Dict[str, ColumnProfile]:
+        """
+        Compute the profile of the data file's attributes in a single read, split between the workers processes if
+        there are more than one, or only of the rows appended since the last profiling if incremental is set
+
+        |  If the instance has a cache, the profiles are read from it when the data file has not changed since they were
+        cached
+
+        :param columns: names of the attributes to profile, if not specified, all attributes will be profiled
+        :param distributions: whether to keep what median and mode need
+        :param quantile_error: if specified, quantiles are approximated with this normalized rank error
+        :param mode_capacity: if specified, modes are approximated by counting at most this many distinct values
+        :return: a dictionary which hold key-value pair:
+                key: name of the attribute
+                value: profile of this attribute
+        :raise: AttributeError if one of the given columns is not an attribute of the file
+        """
+        columns = None if columns is None else list(columns)
+        profiles = self._memoized(columns, distributions, quantile_error, mode_capacity)
+        if profiles is not None:
+            return profiles
+        if self._cache is not None:
+            key = self._cache.key(self._file, self._delimiter, columns, [distributions, quantile_error, mode_capacity])
+            profiles = self._cache.get(key)
+            if profiles is None:
+                profiles = self._scan(columns, distributions, quantile_error, mode_capacity)
+                self._cache.put(key, profiles)
+        else:
+            profiles = self._scan(columns, distributions, quantile_error, mode_capacity)
+        self._statistics[(None if columns is None else tuple(columns), distributions, quantile_error,
+                          mode_capacity)] = profiles
+        return profiles
+
+    def _memoized(self, columns: Optional[List[str]], distributions: bool, quantile_error: Optional[float],
+                  mode_capacity: Optional[int]) -> Optional[Dict[str, ColumnProfile]]:
+        """
+        Look for profiles already computed by this instance which can answer a profiling request
+
+        ----
+
+        Profiles of all attributes answer requests on any of them, and profiles keeping distributions answer requests
+        which don't need them, as long as they were computed with the same quantile_error and mode_capacity
+
+        |  Every kept profile is forgotten if the size or modification time of the data file changed since they were
+        computed
+
+        :param columns: names of the attributes requested, None for all attributes
+        :param distributions: whether median and mode are needed
+        :param quantile_error: normalized rank error of the quantiles requested
+        :param mode_capacity: number of distinct values counted for the modes requested
+        :return: profiles of the requested attributes, None if none of the kept profiles can answer the request
+        """
+        status = os.stat(self._file)
+        signature = (status.st_size, status.st_mtime_ns)
+        if signature != self._signature:
+            self._statistics = {}
+            self._signature = signature
+        for (names, kept_distributions, kept_error, kept_capacity), profiles in self._statistics.items():
+            if kept_error != quantile_error or kept_capacity != mode_capacity:
+                continue
+            if distributions and not kept_distributions:
+                continue
+            if columns is None:
+                if names is None:
+                    return profiles
+            elif all(name in profiles for name in columns):
+                return {name: column for name, column in profiles.items() if name in columns}
+        return None
+
+    def _scan(self, columns: Iterable[str] = None, distributions: bool = True, quantile_error: float = None,
+              mode_capacity: int = None) -> Dict[str, ColumnProfile]:
+        """
+        Read the data file to compute the profile of its attributes, with the reader chosen for this instance
+
+        ----
+
+        If the data file has an up to date columnar file, see ``compile``, the profiles are computed from it instead,
+        reading only the requested attributes
+
+        :param columns: names of the attributes to profile, if not specified, all attributes will be profiled
+        :param distributions: whether to keep what median and mode need
+        :param quantile_error: if specified, quantiles are approximated with this normalized rank error
+        :param mode_capacity: if specified, modes are approximated by counting at most this many distinct values
+        :return: a dictionary which hold key-value pair:
+                key: name of the attribute
+                value: profile of this attribute
+        :raise: AttributeError if one of the given columns is not an attribute of the file
+        """
+        store = ColumnarStore.open_fresh(self._file, self._delimiter)
+        if store is not None:
+            with store:
+                return columnar_profile(store, columns, distributions, quantile_error, mode_capacity)
+        if self._incremental:
+            return incremental_profile(self._file, self._delimiter, columns, distributions, quantile_error,
+                                       mode_capacity)
+        if self._workers > 1:
+            return parallel_profile(self._file, self._delimiter, columns, self._workers, distributions, quantile_error,
+                                    mode_capacity)
+        if self._vectorized:
+            return array_profile(self._file, self._delimiter, columns, distributions, quantile_error, mode_capacity,
+                                 self._quote_free)
+        return profile(self._file, self._delimiter, columns, distributions, quantile_error, mode_capacity,
+                       self._quote_free)
+
+    def compile(self) -> str:
+        """
+        Function to convert the data file into a binary columnar file next to it
+
+        ----
+
+        NUMERIC attributes are stored as float64 arrays with a validity bitmap, and every attribute as dictionary
+        codes with a table of its distinct values, see ``columnar.compile_columnar``
+
+        |  While the data file is unchanged, the statistics of following instances are computed from the columnar file
+        through a memory map instead of parsing the text, and only the bytes of the attributes needed are read. Once the
+        data file is modified, the columnar file is ignored until it is compiled again
+
+        :return: name of the columnar file
+        """
+        return compile_columnar(self._file, self._delimiter)
+
+    def pipeline(self) -> Pipeline:
+        """
+        Start a lazy chain of preprocessing operations on the data file
+
+        ----
+
+        Operations called on the returned pipeline are only recorded, then executed together by its ``execute``
+        method, which share statistics scans between them and apply all of them in a single streaming write, ex:
+
+            processor.pipeline().fill_nan(FillType.MEAN).delete_duplicate_row().execute('out.csv')
+
+        :return: an empty pipeline on the data file
+        """
+        return Pipeline(self)
+
+    def missing_cols(self) -> Dict[str, List[int]]:
         """
         Function to determine attributes with missing values
 
         ----
 
-        Open data file and loop through each rows, each cols to count and store information about missing columns,
-        if a value is missing, attribute name of that value and list of missing rows numbers will be recorded
+        Profile the data file to gather information about missing columns, if a value is missing, attribute name of
+        that value and list of missing rows numbers will be recorded
+
+        |  Missing rows are kept as a bitmap per attribute, see ``bitmap.RowBitmap``, each one is turned into a plain
+        list here so the result can be modified or serialized, ex: with ``json.dumps``, as before
 
         :return: a dictionary which hold key-value pair:
                 key: name of the attribute has missing value
-                value: list of rows which has missing value of each attribute
+                value: list of the rows which has missing value of this attribute, in increasing order
         """
-        missing_attribute = {}
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            for row_number, csv_row in enumerate(csv_reader):
-                row = dict(csv_row)
-                for attribute in row.keys():
-                    if row[attribute] == '':
-                        if attribute in missing_attribute:
-                            missing_attribute[attribute].append(row_number)
-                        else:
-                            missing_attribute[attribute] = [row_number]
-        return missing_attribute
+        return {name: column.missing_rows.tolist() for name, column in self._profile(distributions=False).items()
+                if column.missing}
 
     def missing_rows(self) -> Dict[int, list]:
         """
@@ -105,26 +300,16 @@ class DataPreprocessor:
 
         ----
 
-        Open data file and loop through each rows, each cols to count and store information about missing rows
+        Profile the data file to gather information about missing rows
 
-        |  If a value appear to be missing, the rows index and list of missing attribute will be recorded
+        |  If a value appear to be missing, the rows index and list of missing attribute will be recorded, this view is
+        built from the missing bitmaps of the attributes when it is asked for
 
          :return: a dictionary which hold key-value pair:
                 key: row index of rows which has missing value, row index start at 0 and exclude fieldnames row
                 value: list of attributes which is missing from this row
         """
-        missing_rows = {}
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            for row_number, csv_row in enumerate(csv_reader):
-                row = dict(csv_row)
-                for attribute in row.keys():
-                    if row[attribute] == '':
-                        if row_number in missing_rows:
-                            missing_rows[row_number].append(attribute)
-                        else:
-                            missing_rows[row_number] = [attribute]
-        return missing_rows
+        return transpose_missing(self._profile(distributions=False))
 
     def missing_attributes(self) -> List[AnyStr]:
         """
@@ -138,9 +323,13 @@ class DataPreprocessor:
         """
         Getter to count the missing rows
 
+        ----
+
+        The missing bitmaps of every attribute are OR-ed together and the set bits counted, no row number is produced
+
         :return: the number of rows with missing value
         """
-        return len(self.missing_rows().keys())
+        return len(union(column.missing_rows for column in self._profile(distributions=False).values()))
 
     def _deter_data_type(self, attribute: str) -> DataType:
         """
@@ -148,8 +337,9 @@ class DataPreprocessor:
 
         ----
 
-        Loop through each attributes to deter it's type, utilize python value parse to see if that value can be parse
-        into number or not.
+        The type is the one of the attribute's profile, decided by its first non-empty value: NUMERIC if python can
+        parse it into a number, CATEGORICAL if not, the profile is kept by the instance so following calls on the same
+        file don't read it again
 
         |  Though this only operate on attributes that has at least one value, attributes with no data
         will be determined as UnknownType
@@ -158,20 +348,7 @@ class DataPreprocessor:
         :return: data type of this attribute
         :raise: Attribute error if there's no attribute with the given name
         """
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                try:
-                    if row[attribute]:
-                        try:
-                            float(row[attribute])
-                            return DataType.NUMERIC
-                        except ValueError:
-                            return DataType.CATEGORICAL
-                except KeyError as e:
-                    raise AttributeError(f"No such attribute: {attribute}") from e
-        return DataType.UNKNOWN
+        return self._profile([attribute], distributions=False)[attribute].data_type
 
     def _standard_deviation(self, attribute: str) -> Optional[float]:
         """
@@ -181,31 +358,14 @@ class DataPreprocessor:
 
         Only operate on NUMERIC data type, return None if data type is not of this type
 
-        |  Open the file and gather all value of given attribute to calculate standard deviation
+        |  Accumulate the given attribute in a single read to calculate standard deviation
 
         :param attribute: name of the NUMERIC attribute
         :return:
             float: standard deviation value of this attribute,
             None: if data type is not NUMERIC
         """
-
-        if self._deter_data_type(attribute) != DataType.NUMERIC:
-            return None
-
-        mean = self._mean(attribute)
-        total = 0.0
-        has_value = 0
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                if row[attribute]:
-                    has_value += 1
-                    total += math.pow(float(row[attribute]) - mean, 2)
-
-        if has_value < 2:
-            return 0
-        return math.sqrt(total / (has_value - 1))
+        return self._profile([attribute], distributions=False)[attribute].standard_deviation
 
     def _mean(self, attribute: str) -> Optional[float]:
         """
@@ -215,27 +375,16 @@ class DataPreprocessor:
 
         Only operate on NUMERIC data type, return None if data type is not of this type
 
-        |  Open the file and gather all value of given attribute to calculate mean
+        |  Accumulate the given attribute in a single read to calculate mean
 
         :param attribute: name of the attribute
         :return:
                 float: mean of the NUMERIC numeric attribute,
                 None: if the attribute is not numeric
         """
-        if self._deter_data_type(attribute) != DataType.NUMERIC:
-            return None
-        total = 0
-        has_value = 0
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                if row[attribute]:
-                    has_value += 1
-                    total += float(row[attribute])
-        return total / has_value
+        return self._profile([attribute], distributions=False)[attribute].mean
 
-    def _median(self, attribute: str) -> Optional[float]:
+    def _median(self, attribute: str, quantile_error: float = None) -> Optional[float]:
         """
         Function to calculate median of a given attribute, this will skip missing value
 
@@ -243,26 +392,40 @@ class DataPreprocessor:
 
         Only operate on NUMERIC data type, return None if data type is not of this type
 
-        |  Open the file and gather all value of given attribute to calculate median
+        |  Profile the given attribute in a single read, its values are kept in a compact array from which the median
+        is selected in linear time
+
+        |  If quantile_error is specified, the median is approximated from a sketch of bounded memory instead
 
         :param attribute: name of the NUMERIC attribute
+        :param quantile_error: if specified, normalized rank error allowed for the median, ex: 0.01
         :return:
                 float: value of the median of this attribute,
                 None: if this attribute is not NUMERIC
         """
-        if self._deter_data_type(attribute) != DataType.NUMERIC:
-            return None
-        values = []
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                if row[attribute]:
-                    values.append(row[attribute])
-        middle_index = len(values) // 2
-        return values[middle_index]
+        return self._profile([attribute], quantile_error=quantile_error)[attribute].median
 
-    def _mode(self, attribute: str) -> Optional[AnyStr]:
+    def _quantiles(self, attribute: str, qs: Sequence[float], quantile_error: float = None) -> List[Optional[float]]:
+        """
+        Function to calculate several quantiles of a given attribute at once, this will skip missing value
+
+        ----
+
+        Only operate on NUMERIC data type, return None for each quantile if data type is not of this type
+
+        |  Profile the given attribute in a single read, then select every quantile in the same linear-time pass
+
+        |  If quantile_error is specified, quantiles are approximated from a sketch of bounded memory instead
+
+        :param attribute: name of the NUMERIC attribute
+        :param qs: quantiles to compute, each between 0-1, ex: [0.01, 0.25, 0.75, 0.99]
+        :param quantile_error: if specified, normalized rank error allowed for the quantiles, ex: 0.01
+        :return: value of each quantile, in the order of qs
+        :raise: ValueError if a quantile is not between 0-1
+        """
+        return self._profile([attribute], quantile_error=quantile_error)[attribute].quantiles(qs)
+
+    def _mode(self, attribute: str, mode_capacity: int = None) -> Optional[AnyStr]:
         """
         Function to calculate mode of a given attribute
 
@@ -270,180 +433,315 @@ class DataPreprocessor:
 
         Only operate on data type different than UNKNOWN, return None if not this type
 
-        |  Open the file and gather all value of given attribute to calculate mode
+        |  Profile the given attribute in a single read to calculate mode, the most frequent value is tracked without
+        sorting the frequency table
+
+        |  If mode_capacity is specified, only that many distinct values are counted, which bound memory on attributes
+        with a lot of distinct values
 
         :param attribute: name of the attribute
+        :param mode_capacity: if specified, maximum number of distinct values counted, ex: 1000
         :return:
                 str: value of the mode of this attribute,
                 None: if the attribute has all empty rows
         """
-        if self._deter_data_type(attribute) == DataType.UNKNOWN:
-            return None
-        values = {}
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                if row[attribute]:
-                    if row[attribute] not in values:
-                        values[row[attribute]] = 1
-                    else:
-                        values[row[attribute]] += 1
-        values = sorted(values.items(), key=lambda item: item[1], reverse=True)
-        return values[0][0]
-
-    def _create_attribute_info(self, attribute: str, fall_back: str = '') -> Dict[AnyStr, Any]:
+        return self._profile([attribute], mode_capacity=mode_capacity)[attribute].mode
+
+    def _top_values(self, attribute: str, k: int = 10, mode_capacity: int = None) -> List[Tuple[AnyStr, int, int]]:
+        """
+        Function to find the most frequent values of a given attribute
+
+        :param attribute: name of the attribute
+        :param k: number of values to return
+        :param mode_capacity: if specified, maximum number of distinct values counted, ex: 1000
+        :return: list of (value, count, error) tuples sorted by count, most frequent first, the true count of each
+                 value is between count - error and count
+        """
+        return self._profile([attribute], mode_capacity=mode_capacity)[attribute].top(k)
+
+    @staticmethod
+    def _create_attribute_info(column: ColumnProfile, fall_back: str = '') -> Dict[AnyStr, Any]:
         """
         Function to generate a part of a lookup-table which hold value of missing attribute to avoid re-calculation
 
         ----
 
-        Construct a lookup table for fill_nan function
+        Construct a lookup table for fill_nan function from the already computed profile of the attribute
 
         |  This lookup table will store value of mean, median, mode for NUMERIC value and mode for CATEGORICAL value
 
-        :param attribute: name of this attribute
+        :param column: profile of this attribute
         :param fall_back: default value to fill if this attribute can't be calculated with: mean, mode, median
         :return:
                 mean, mode, median for attribute of type NUMERIC,
                 mode for attribute of type CATEGORICAL
         """
-        attr_type = self._deter_data_type(attribute)
+        attr_type = column.data_type
         info = {'type': attr_type}
         if attr_type == DataType.NUMERIC:
-            mean = self._mean(attribute)
-            median = self._median(attribute)
-            mode = self._mode(attribute)
-            info.update({'mean': mean if mean else fall_back,
-                         'median': median if median else fall_back,
-                         'mode': mode if mode else fall_back})
+            mean = column.mean
+            median = column.median
+            mode = column.mode
+            info.update({'mean': mean if mean is not None else fall_back,
+                         'median': median if median is not None else fall_back,
+                         'mode': mode if mode is not None else fall_back})
         elif attr_type == DataType.CATEGORICAL:
-            mode = self._mode(attribute)
-            info.update({'mode': mode if mode else fall_back})
-        return {attribute: info}
+            mode = column.mode
+            info.update({'mode': mode if mode is not None else fall_back})
+        return {column.name: info}
 
-    def _z_score(self, attribute: str) -> Tuple[List[Dict], List]:
+    @staticmethod
+    def _z_score(mean: float, standard_deviation: float) -> Callable[[str], Any]:
         """
-        Function to calculate value of z-score normalization on a given NUMERIC attribute
+        Function to build the z-score normalization of a given NUMERIC attribute
 
         ----
 
-        Open the file to gather all data in it and add that data to a new data set
+        The mean and standard deviation are taken from the accumulators of the attribute's profile, or from a fitted
+        model, so the returned function re-scale each value without any further read of the file
 
-        |  This new data set will then be re-scaled with calculated mean and standard deviation
+        |  If the standard deviation is 0, every value is re-scaled to 0
 
-        :param attribute: name of the attribute
-        :return:
-                list: of a new data after calculation,
-                list: fieldnames of this new data
+        :param mean: mean of the attribute
+        :param standard_deviation: standard deviation of the attribute
+        :return: function which re-scale a value of this attribute, empty values are left empty
         """
-        new_data = []
-        fieldnames = []
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            fieldnames.extend(csv_reader.fieldnames)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                new_data.append(row)
-        mean = self._mean(attribute)
-        standard_deviation = self._standard_deviation(attribute)
-        for row in new_data:
-            if row[attribute]:
-                row[attribute] = (float(row[attribute]) - mean) / standard_deviation
-        return new_data, fieldnames
-
-    def _min_max(self, attribute: str) -> Tuple[List[Dict], List]:
-        """
-        Function to calculate value of min-max normalization on a given NUMERIC attribute
+
+        def rescale(value: str) -> Any:
+            if value == '' or value is None:
+                return value
+            if not standard_deviation:
+                return 0
+            return (float(value) - mean) / standard_deviation
+
+        return rescale
+
+    @staticmethod
+    def _min_max(_min: float, _max: float) -> Callable[[str], Any]:
+        """
+        Function to build the min-max normalization of a given NUMERIC attribute
 
         ----
 
-        Open the file to gather all data in it and add that data to a new data set
+        The min and max are taken from the attribute's profile, or from a fitted model, so the returned function
+        re-scale each value without any further read of the file
 
-        |  This new data set will then be re-scaled with  mean-max normalization method
+        |  If every value of the attribute is the same, they are all re-scaled to 0
 
-        :param attribute: name of the attribute
-        :return:
-                list: of a new data after calculation
-                list: fieldnames of this new data
+        :param _min: min of the attribute
+        :param _max: max of the attribute
+        :return: function which re-scale a value of this attribute, empty values are left empty
         """
-        values = []
-        same_values = False
-        new_data = []
-        fieldnames = []
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            fieldnames.extend(csv_reader.fieldnames)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                new_data.append(row)
-                if row[attribute]:
-                    values.append(float(row[attribute]))
-        _min = min(values)
-        _max = max(values)
-        if _max == _min:
-            same_values = True
-
-        for row in new_data:
-            if row[attribute]:
-                if same_values:
-                    row[attribute] = 0
-                else:
-                    row[attribute] = (float(row[attribute]) - _min) / (_max - _min)
-        return new_data, fieldnames
 
-    def fill_nan(self, numeric_fill: FillType, fall_back: str = '0', file_name: str = None) -> None:
+        def rescale(value: str) -> Any:
+            if value == '' or value is None:
+                return value
+            if _max == _min:
+                return 0
+            return (float(value) - _min) / (_max - _min)
+
+        return rescale
+
+    @staticmethod
+    def _normalization_parameters(column: ColumnProfile, normalization_type: NormalizationType) -> Dict[str, Any]:
+        """
+        Function to gather the parameters of the normalization of a given attribute from its profile
+
+        :param column: profile of the attribute
+        :param normalization_type: may be of type z-score or min-max
+        :return: type of the normalization, with min and max for min-max or mean and standard deviation for z-score
+        :raise: TypeError if data type of given attribute is not NUMERIC
+        """
+        if column.data_type != DataType.NUMERIC:
+            raise TypeError(f"Attribute is not of type {DataType.NUMERIC.name}")
+        if normalization_type == NormalizationType.MIN_MAX:
+            return {'type': normalization_type.name, 'min': column.min, 'max': column.max}
+        return {'type': normalization_type.name, 'mean': column.mean, 'standard_deviation': column.standard_deviation}
+
+    def _parameters_rescale_function(self, parameters: Dict[str, Any]) -> Callable[[str], Any]:
+        """
+        Function to build a normalization from its parameters
+
+        :param parameters: parameters of the normalization, as returned by ``_normalization_parameters``
+        :return: function which re-scale a value of this attribute, empty values are left empty
+        """
+        if parameters['type'] == NormalizationType.MIN_MAX.name:
+            return self._min_max(parameters['min'], parameters['max'])
+        return self._z_score(parameters['mean'], parameters['standard_deviation'])
+
+    def _rescale_function(self, column: ColumnProfile, normalization_type: NormalizationType) -> Callable[[str], Any]:
+        """
+        Function to build the normalization of a given attribute with the specified NormalizationType
+
+        :param column: profile of the attribute
+        :param normalization_type: may be of type z-score or min-max
+        :return: function which re-scale a value of this attribute, empty values are left empty
+        :raise: TypeError if data type of given attribute is not NUMERIC
+        """
+        return self._parameters_rescale_function(self._normalization_parameters(column, normalization_type))
+
+    @staticmethod
+    def _array_rescale_function(column: ColumnProfile, normalization_type: NormalizationType) -> Callable[[Any], Any]:
+        """
+        Function to build the normalization of a given attribute as a whole-array operation, for the NumPy backend
+
+        :param column: profile of the attribute
+        :param normalization_type: may be of type z-score or min-max
+        :return: function which re-scale a float64 array of this attribute's values, NaN are left NaN
+        :raise: TypeError if data type of given attribute is not NUMERIC
+        """
+        if column.data_type != DataType.NUMERIC:
+            raise TypeError(f"Attribute is not of type {DataType.NUMERIC.name}")
+        if normalization_type == NormalizationType.MIN_MAX:
+            return lambda numbers: min_max(numbers, column.min, column.max)
+        mean = column.mean
+        standard_deviation = column.standard_deviation
+        return lambda numbers: z_score(numbers, mean, standard_deviation)
+
+    def _fill_values(self, profiles: Dict[str, ColumnProfile], numeric_fill: FillType,
+                     fall_back: str = '0', only_missing: bool = True) -> Dict[AnyStr, Any]:
+        """
+        Function to compute the value used to fill each attribute with missing values
+
+        ----
+
+        Construct the look-up table of every attribute's fill value from their profiles, unless only_missing is unset,
+        only attributes which have at least one missing value are included
+
+        :param profiles: profiles of the attributes
+        :param numeric_fill: option to fill NUMERIC data, this may be mode, mean, and median,
+                             categorical data will always fill by mode
+        :param fall_back: default data to put into cell if this fill operation failed
+        :param only_missing: whether to leave out attributes without missing value
+        :return: a dictionary which hold key-value pair:
+                key: name of the attribute has missing value
+                value: value to fill the missing cells of this attribute with
+        """
+        fill_values = {}
+        for attribute, column in profiles.items():
+            if only_missing and not column.missing:
+                continue
+            info = self._create_attribute_info(column, fall_back)[attribute]
+            if info['type'] == DataType.NUMERIC:
+                if numeric_fill == FillType.MEAN:
+                    fill_values[attribute] = info['mean']
+                elif numeric_fill == FillType.MEDIAN:
+                    fill_values[attribute] = info['median']
+                elif numeric_fill == FillType.MODE:
+                    fill_values[attribute] = info['mode']
+            elif info['type'] == DataType.CATEGORICAL:
+                fill_values[attribute] = info['mode']
+            else:
+                fill_values[attribute] = fall_back
+        return fill_values
+
+    @contextmanager
+    def _output(self, file_name: str = None) -> Iterator[str]:
+        """
+        Context of the writing of a data file
+
+        ----
+
+        If file name is not specified, or is the data file itself, the context give a temporary file next to it which
+        replace the data file once the context exit without error, so the data file can still be read while the new one
+        is written, the profiles kept by the instance are then forgotten, and its row index removed as it no longer
+        match it, see ``records.record_index``
+
+        |  If the context exit with an error, the partly written file is removed
+
+        :param file_name: name of the file to save the data
+        :return: name of the file to write in the context
+        """
+        if not file_name:
+            file_name = self._file
+        overwrite = os.path.abspath(file_name) == os.path.abspath(self._file)
+        if overwrite:
+            fd, out_name = tempfile.mkstemp(suffix='.csv', dir=os.path.dirname(os.path.abspath(file_name)))
+            os.close(fd)
+        else:
+            out_name = file_name
+        try:
+            yield out_name
+            if overwrite:
+                os.replace(out_name, file_name)
+                self._statistics = {}
+                if os.path.exists(index_name(file_name)):
+                    os.remove(index_name(file_name))
+        except BaseException:
+            if os.path.exists(out_name):
+                os.remove(out_name)
+            raise
+
+    def _save(self, rows: Iterable, fieldnames: List, file_name: str = None, buffer_size: int = 1000) -> None:
+        """
+        Function to write rows to a data file while they are being produced
+
+        ----
+
+        Rows are consumed from the given iterable and written out by batches of at most buffer_size rows, so the whole
+        data set is never held in memory
+
+        |  If file name is not specified, or is the data file itself, rows are written to a temporary file next to it
+        which then replaces the data file, see ``_output``
+
+        :param rows: rows to write, as lists of values in the order of fieldnames
+        :param fieldnames: fieldnames of the rows
+        :param file_name: name of the file to save this data
+        :param buffer_size: maximum number of rows to buffer before writing them
+        """
+        with self._output(file_name) as out_name:
+            with open(out_name, 'w', newline='', encoding='utf-8') as csv_file:
+                csv_writer = csv.writer(csv_file)
+                csv_writer.writerow(fieldnames)
+                rows = iter(rows)
+                buffer = list(islice(rows, buffer_size))
+                while buffer:
+                    csv_writer.writerows(buffer)
+                    buffer = list(islice(rows, buffer_size))
+
+    def fill_nan(self, numeric_fill: FillType, fall_back: str = '0', file_name: str = None,
+                 buffer_size: int = 1000, quantile_error: float = None, mode_capacity: int = None) -> None:
         """
         Function to perform data fill with the specified FillType
 
         ----
 
-        Open the file to gather it's data and treat missing data with specified FillType
+        Operate in two passes: the first one profile every attribute to construct a look-up table of fill values, so
+        nothing has to be re-calculated each time a missing value is encountered, the second one read the rows one by
+        one, fill their missing data with specified FillType and write them out immediately
 
-        | To avoid repeated re-calculation each time a missing value is encountered, a look-up table will be constructed
+        |  Filled data will be saved with specified file name, if not specified, this new data will overwritten old
+        data in old data file
 
-        |  Filled data will be stored in a new data set and get saved with specified file name, if not specified, this
-        new data will overwritten old data in old data file
+        |  Only buffer_size rows are held in memory at any time, whatever the size of the data file
+
+        |  Exact median need every NUMERIC value in memory, for files bigger than that, quantile_error can be specified
+        to approximate medians with a sketch of a few KB per attribute
+
+        |  Likewise exact mode count every distinct value, mode_capacity can be specified to only count that many
+        distinct values of each attribute, which bound memory on CATEGORICAL attributes with a lot of distinct values
 
         :param numeric_fill: option to fill NUMERIC data, this may be mode, mean, and median,
                              categorical data will always fill by mode
         :param fall_back: default data to put into cell if this fill operation failed
         :param file_name: name of the file to save this data
+        :param buffer_size: maximum number of filled rows to buffer before writing them
+        :param quantile_error: if specified, normalized rank error allowed for medians, ex: 0.01
+        :param mode_capacity: if specified, maximum number of distinct values counted for modes, ex: 1000
         """
-        attribute_fill = {}
-        filled_data = []
-        fieldnames = []
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            fieldnames.extend(csv_reader.fieldnames)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                data = {}
-                for attribute in row.keys():
-                    if row[attribute]:
-                        data.update({attribute: row[attribute]})
-                    else:
-                        if attribute not in attribute_fill:
-                            attribute_fill.update(self._create_attribute_info(attribute))
-                        if attribute_fill[attribute]['type'] == DataType.NUMERIC:
-                            if numeric_fill == FillType.MEAN:
-                                data.update({attribute: attribute_fill[attribute]['mean']})
-                            elif numeric_fill == FillType.MEDIAN:
-                                data.update({attribute: attribute_fill[attribute]['median']})
-                            elif numeric_fill == FillType.MODE:
-                                data.update({attribute: attribute_fill[attribute]['mode']})
-                        elif attribute_fill[attribute]['type'] == DataType.CATEGORICAL:
-                            data.update({attribute: attribute_fill[attribute]['mode']})
-                        else:
-                            data.update({attribute: fall_back})
-                filled_data.append(data)
+        profiles = self._profile(quantile_error=quantile_error, mode_capacity=mode_capacity)
+        fieldnames = list(profiles)
+        fill_values = [(fieldnames.index(attribute), value)
+                       for attribute, value in self._fill_values(profiles, numeric_fill, fall_back).items()]
 
-        if not file_name:
-            file_name = self._file
-        with open(file_name, 'w', newline='', encoding='utf-8') as csv_file:
-            csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-            csv_writer.writeheader()
-            csv_writer.writerows(filled_data)
+        def filled_rows():
+            for row in self._rows(len(fieldnames)):
+                for index, value in fill_values:
+                    if not row[index]:
+                        row[index] = value
+                yield row
+
+        self._save(filled_rows(), fieldnames, file_name, buffer_size)
 
     def delete_missing_row(self, threshold: int = 1, threshold_pct: float = None, file_name: str = None) -> None:
         """
@@ -451,7 +749,13 @@ class DataPreprocessor:
 
         ----
 
-        Open the file to gather it's data and leave out rows that are not meet threshold condition
+        Find the rows to delete by counting the missing attributes of every row at once from the missing bitmaps of
+        the profile, see ``bitmap.at_least``, then parse only the kept rows, by runs of consecutive rows, from a memory
+        map of the data file and its row index, see ``records.RecordReader``, and write them out immediately
+
+        |  If the row index does not number as many rows as the profile, the rows are read one by one instead, so a
+        kept row is never taken for a deleted one. The data file is unmapped before it is replaced, and its row index is
+        only saved if the data file is kept
 
         |  If the number of missing attribute of current row bigger than this value, it will be deleted
 
@@ -464,33 +768,33 @@ class DataPreprocessor:
         :param threshold_pct: specifies the percentage base on number of attribute this file has
         :param file_name: name of the file to save this data
         """
-        missing_rows = self.missing_rows()
-        new_data = []
-        fieldnames = []
-
-        if not file_name:
-            file_name = self._file
-
         if threshold_pct:
             if threshold_pct < 0 or threshold_pct > 1:
                 raise ValueError("Threshold_pct value must be between 0-1")
             else:
-                with open(self._file, 'r') as csv_file:
-                    csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-                    threshold = int(len(csv_reader.fieldnames) * threshold_pct)
-
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            fieldnames.extend(csv_reader.fieldnames)
-            for row_number, csv_row in enumerate(csv_reader):
-                if row_number in missing_rows and len(missing_rows[row_number]) >= threshold:
-                    continue
-                new_data.append(csv_row)
-
-        with open(file_name, 'w', newline='', encoding='utf-8') as csv_file:
-            csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-            csv_writer.writeheader()
-            csv_writer.writerows(new_data)
+                threshold = int(len(self._fieldnames()) * threshold_pct)
+        profiles = self._profile(distributions=False)
+        fieldnames = list(profiles)
+        row_count = max((column.rows for column in profiles.values()), default=0)
+        deleted = at_least((column.missing_rows for column in profiles.values()), max(threshold, 1))
+
+        def kept_rows():
+            with RecordReader(self._file, self._delimiter, save_index=not overwrite) as reader:
+                if len(reader) == row_count:
+                    start = 0
+                    for row_number in deleted.tolist() + [len(reader)]:
+                        for row in reader.rows(start, row_number):
+                            if len(row) < len(fieldnames):
+                                row.extend([''] * (len(fieldnames) - len(row)))
+                            yield row
+                        start = row_number + 1
+                    return
+            for row_number, row in enumerate(self._rows(len(fieldnames))):
+                if row_number not in deleted:
+                    yield row
+
+        overwrite = not file_name or os.path.abspath(file_name) == os.path.abspath(self._file)
+        self._save(kept_rows(), fieldnames, file_name)
 
     def delete_missing_column(self, threshold: int = 1, threshold_pct: float = None, file_name: str = None) -> None:
         """
@@ -498,7 +802,8 @@ class DataPreprocessor:
 
         ----
 
-        Open the file to gather it's data and leave out attributes that are not meet threshold condition
+        Find the attributes to delete from the missing values of the profile, then read the rows one by one and write
+        out immediately the values at the positions of the kept attributes, so rows are never held in memory
 
         |   If the number of missing rows of current attribute bigger than this value, it will be deleted
 
@@ -511,98 +816,187 @@ class DataPreprocessor:
         :param threshold_pct: specifies the percentage base on number of rows this file has
         :param file_name: name of the file to save this data
         """
-        missing_cols = self.missing_cols()
-        new_data = []
-        fieldnames = []
-
-        if not file_name:
-            file_name = self._file
+        profiles = self._profile(distributions=False)
 
         if threshold_pct:
             if threshold_pct < 0 or threshold_pct > 1:
                 raise ValueError("Threshold_pct value must be between 0-1")
             else:
-                with open(self._file, 'r') as csv_file:
-                    csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-                    row_count = sum(1 for _ in csv_reader)
-                    threshold = int(row_count * threshold_pct)
+                row_count = max((column.rows for column in profiles.values()), default=0)
+                threshold = int(row_count * threshold_pct)
 
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                data = {}
-                for attribute in row:
-                    if attribute in missing_cols and len(missing_cols[attribute]) >= threshold:
-                        continue
-                    if attribute not in fieldnames:
-                        fieldnames.append(attribute)
-                    data.update({attribute: row[attribute]})
-                new_data.append(data)
-
-        with open(file_name, 'w', newline='', encoding='utf-8') as csv_file:
-            csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-            csv_writer.writeheader()
-            csv_writer.writerows(new_data)
-
-    def delete_duplicate_row(self, file_name: str = None) -> None:
+        attributes = list(profiles)
+        kept = [index for index, column in enumerate(profiles.values())
+                if not column.missing or column.missing < threshold]
+        fieldnames = [attributes[index] for index in kept]
+
+        def kept_rows():
+            for row in self._rows(len(attributes)):
+                yield [row[index] for index in kept]
+
+        self._save(kept_rows(), fieldnames, file_name)
+
+    def delete_duplicate_row(self, file_name: str = None, buffer_size: int = 1000, memory_budget: int = None,
+                             workers: int = None) -> None:
         """
         Function to delete duplicated rows
 
         ----
 
-        Open file and gather all data, perform duplication removal and store new data into new file
+        Read the file row by row, each row is fingerprinted by a 128-bit digest of its raw values, only the digests of
+        rows already seen are kept in memory, and the first occurrence of each row is written out immediately, so rows
+        keep their original order, blank lines are skipped
+
+        |  If memory_budget is specified and the digests of the whole file are not expected to fit in it, rows are
+        instead hash-partitioned into temporary files on disk, each partition is deduplicated independently, by workers
+        processes in parallel, and survivors are merged back in their original order. As workers partitions are
+        deduplicated at once, partitions are made small enough for the digests of each of them to fit in a share of
+        the budget, at most ``dedup.MAX_PARTITIONS`` partition files are written at once and bigger partitions are
+        partitioned again, see ``dedup.partitioned_unique_rows``
+
+        |  Otherwise, if there are more than one worker, rows are fingerprinted by byte ranges in parallel first, then
+        the file is read again to write every row which is not a duplicate
 
         |  If file name is not specified, the data will be saved on the old file
 
         :param file_name: name of the file to save this data
+        :param buffer_size: maximum number of rows to buffer before writing them
+        :param memory_budget: if specified, maximum number of bytes the digests may take in memory, ex: 512 * 2 ** 20
+        :param workers: number of processes fingerprinting rows in parallel, default to the processor's workers
         """
-        fieldnames = []
-        if not file_name:
-            file_name = self._file
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=self._delimiter)
-            fieldnames.extend(csv_reader.fieldnames)
-            new_data = list(map(dict, set(tuple(sorted(csv_row.items())) for csv_row in csv_reader)))
+        fieldnames = self._fieldnames()
+        workers = workers or self._workers
+
+        def unique_rows():
+            digests = DigestSet()
+            with open(self._file, 'r') as csv_file:
+                csv_reader = csv.reader(csv_file, delimiter=self._delimiter)
+                next(csv_reader, None)
+                for row in csv_reader:
+                    if row and digests.add(row_digest(row)):
+                        yield row
+
+        def kept_rows(duplicates):
+            with open(self._file, 'r') as csv_file:
+                csv_reader = csv.reader(csv_file, delimiter=self._delimiter)
+                next(csv_reader, None)
+                for row_number, row in enumerate(filter(None, csv_reader)):
+                    if row_number not in duplicates:
+                        yield row
+
+        partitions = 1
+        if memory_budget:
+            digest_memory = estimate_rows(self._file) * DIGEST_MEMORY
+            if digest_memory > memory_budget:
+                partitions = math.ceil(digest_memory * workers / memory_budget)
+        if partitions > 1:
+            max_rows = max(1, memory_budget // (workers * DIGEST_MEMORY))
+            rows = partitioned_unique_rows(self._file, self._delimiter, partitions, workers, max_rows)
+        elif workers > 1:
+            rows = kept_rows(parallel_duplicate_rows(self._file, self._delimiter, workers))
+        else:
+            rows = unique_rows()
+        self._save(rows, fieldnames, file_name, buffer_size)
 
-        with open(file_name, 'w', newline='', encoding='utf-8') as csv_file:
-            csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-            csv_writer.writeheader()
-            csv_writer.writerows(new_data)
+    @staticmethod
+    def _normalization_types(attribute: Union[str, Iterable[str], Dict[str, NormalizationType], None],
+                             normalization_type: Optional[NormalizationType],
+                             profiles: Dict[str, ColumnProfile]) -> Dict[str, NormalizationType]:
+        """
+        Function to decide which normalization is applied to each attribute
 
-    def normalization(self, attribute: str, normalization_type: NormalizationType, file_name: str = None) -> None:
+        :param attribute: name of an attribute, list of names, dictionary of name to normalization type, or None for
+                          every NUMERIC attribute
+        :param normalization_type: normalization of the attributes without their own type
+        :param profiles: profiles of the attributes, in the order of the file
+        :return: a dictionary which hold key-value pair:
+                key: name of the attribute
+                value: normalization type of this attribute
+        :raise: ValueError if an attribute has no normalization type
+        """
+        if attribute is None:
+            types = {name: normalization_type for name, column in profiles.items()
+                     if column.data_type == DataType.NUMERIC}
+        elif isinstance(attribute, str):
+            types = {attribute: normalization_type}
+        elif isinstance(attribute, dict):
+            types = {name: attribute_type or normalization_type for name, attribute_type in attribute.items()}
+        else:
+            types = {name: normalization_type for name in attribute}
+        if any(attribute_type is None for attribute_type in types.values()):
+            raise ValueError("Normalization type must be specified")
+        return types
+
+    def normalization(self, attribute: Union[str, Iterable[str], Dict[str, NormalizationType]] = None,
+                      normalization_type: NormalizationType = None, file_name: str = None,
+                      buffer_size: int = 1000) -> None:
         """
-        Function to perform normalization on a given NUMERIC attribute
+        Function to perform normalization on given NUMERIC attributes
 
         ----
 
         Only operate on NUMERIC data type and will raise error if the data type is different
 
-        |  Deter which normalization type is specified then call suitable function, the returned data will then be saved
-        to a new file
+        |  Several attributes can be normalized at once by giving a list of names, which all use normalization_type, or
+        a dictionary of name to the normalization type of each attribute, if attribute is not specified, every NUMERIC
+        attribute is normalized with normalization_type
+
+        |  Operate in two passes whatever the number of attributes: the first one accumulate the statistics of every
+        attribute, the second one read the rows one by one, re-scale each attribute with its normalization function and
+        write them out immediately
+
+        |  With the NumPy backend, each attribute is re-scaled as a whole array for each block of rows
 
         |  If the name of the new file is not specified, the data will be saved on the old file
 
-        :param attribute: name of the attribute
-        :param normalization_type: may be of type z-score or min-max
+        :param attribute: name of the attribute, list of names, dictionary of name to normalization type, or None for
+                          every NUMERIC attribute
+        :param normalization_type: may be of type z-score or min-max, used by attributes without their own type
         :param file_name: name of the file to save this data
-        :raise: TypeError if data type of given attribute is not NUMERIC
+        :param buffer_size: maximum number of re-scaled rows to buffer before writing them
+        :raise: TypeError if data type of one of the given attributes is not NUMERIC
+        :raise: ValueError if an attribute has no normalization type
         """
-        if not file_name:
-            file_name = self._file
-
-        if self._deter_data_type(attribute) != DataType.NUMERIC:
-            raise TypeError(f"Attribute is not of type {DataType.NUMERIC.name}")
-
-        if normalization_type == NormalizationType.MIN_MAX:
-            new_data, fieldnames = self._min_max(attribute)
-        else:
-            new_data, fieldnames = self._z_score(attribute)
-
-        with open(file_name, 'w', newline='', encoding='utf-8') as csv_file:
-            csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-            csv_writer.writeheader()
-            csv_writer.writerows(new_data)
+        if normalization_type is None and not isinstance(attribute, dict):
+            raise ValueError("Normalization type must be specified")
+        columns = None
+        if isinstance(attribute, str):
+            columns = [attribute]
+        elif attribute is not None:
+            columns = list(attribute)
+        profiles = self._profile(columns, distributions=False)
+        types = self._normalization_types(attribute, normalization_type, profiles)
+        fieldnames = self._fieldnames()
+
+        if self._vectorized:
+            rescale_arrays = [(fieldnames.index(name), self._array_rescale_function(profiles[name], attribute_type))
+                              for name, attribute_type in types.items()]
+
+            def rescaled_blocks():
+                for block in read_blocks(self._file, self._delimiter, quote_free=self._quote_free):
+                    for row in block:
+                        row.extend([''] * (len(fieldnames) - len(row)))
+                    for index, rescale_array in rescale_arrays:
+                        values = column_values(block, index)
+                        rescaled = from_array(rescale_array(to_array(values)), missing_mask(values), None)
+                        for row, value in zip(block, rescaled):
+                            if value is not None:
+                                row[index] = value
+                    yield from block
+
+            self._save(rescaled_blocks(), fieldnames, file_name, buffer_size)
+            return
+
+        rescales = [(fieldnames.index(name), self._rescale_function(profiles[name], attribute_type))
+                    for name, attribute_type in types.items()]
+
+        def rescaled_rows():
+            for row in self._rows(len(fieldnames)):
+                for index, rescale in rescales:
+                    row[index] = rescale(row[index])
+                yield row
+
+        self._save(rescaled_rows(), fieldnames, file_name, buffer_size)
 
     @staticmethod
     def do_calc_sub(operand_a: float, operand_b: float, name: str) -> Optional[float]:
@@ -634,72 +1028,182 @@ class DataPreprocessor:
         """
         Function to perform calculation on NUMERIC attributes that has been turned to post-fix representation
 
+        ----
+
+        Operations are interpreted on every call, to evaluate the same expression on many rows,
+        ``expression.compile_program`` should be used instead
+
         :param operations: post-fix form of the operation expression
         :param data: key-value pair of attributes and their values in specified row
         :return:
                 float: value of this calculation,
-                None: if one of values missing data
+                None: if one of values missing data or a division by zero happen
         :raise: Attribute error if no such attribute name in the data
+        :raise: TypeError if one of the values is not NUMERIC
         """
         to_cal = []
         for item in operations:
             if type_of(item) == EquationType.OPERATOR:
-                to_cal.append(item)
+                operand_b = to_cal.pop()
+                operand_a = to_cal.pop()
+                if operand_a is None or operand_b is None:
+                    to_cal.append(None)
+                else:
+                    to_cal.append(DataPreprocessor.do_calc_sub(operand_a, operand_b, item))
             else:
                 try:
-                    if data[item] == '':
+                    if data[item] == '' or data[item] is None:
                         return None
                     try:
                         to_cal.append(float(data[item]))
                     except ValueError:
-                        raise f"Data type is not {DataType.NUMERIC.name}"
+                        raise TypeError(f"Data type is not {DataType.NUMERIC.name}") from None
                 except KeyError as e:
                     raise AttributeError("No such attribute") from e
-        for index, item in enumerate(to_cal):
-            if type_of(item) == EquationType.OPERATOR:
-                to_cal[index] = DataPreprocessor.do_calc_sub(to_cal[index - 2], to_cal[index - 1], to_cal[index])
         return to_cal[-1]
 
-    def attributes_calculation(self, calc_str: str, col_name: str = None, file_name: str = None) -> None:
+    def attributes_calculation(self, calc_str: Union[str, Dict[str, str]], col_name: str = None, file_name: str = None,
+                               buffer_size: int = 1000) -> None:
         """
-        Function that do attribute calculation given an in-fix expression representation
+        Function that do attribute calculation given in-fix expression representations
 
         ----
 
-        Open file to gather data, at each row, new column will be added which hold the results of calculated expression,
-        then the new data, with an extra column will be saved to a new file
+        The expressions are compiled once into a single function with every attribute resolved to its position in the
+        rows, then the file is read row by row, a new column holding the result of each expression is appended to each
+        row, which is written out immediately
+
+        |  Several new columns can be computed in the same pass by giving a dictionary of new column's name to
+        expression, ex: {'ratio': 'a / b', 'scaled': 'ratio * c'}, an expression can use the columns defined before it,
+        and sub-expressions shared by several expressions are computed only once per row
+
+        |  A result is left empty if one of its operands is missing or if a division by zero happen
+
+        |  With the NumPy backend, the expressions are instead evaluated on whole arrays of each block of rows
 
         |  If col name is not specified, it will be set to be the calc_str value
 
         | if file name is not specified ,the data will be saved on the old file
 
-        :param calc_str: infix form of operation calculation
-        :param col_name: name of the new column to output result
+        :param calc_str: infix form of operation calculation, or a dictionary of new column's name to infix form
+        :param col_name: name of the new column to output result, ignored if calc_str is a dictionary
         :param file_name:  name of the file to save this data
+        :param buffer_size: maximum number of rows to buffer before writing them
+        :raise: AttributeError if an expression use an attribute which is not in the data nor defined before it
+        :raise: ValueError if an expression is not well-formed
+        :raise: TypeError if one of the values used is not NUMERIC
         """
-        operations = infix_to_postfix(calc_str)
-        new_data = []
-        fieldnames = []
-        if not file_name:
-            file_name = self._file
-        if not col_name:
-            calc_str = calc_str.replace(' ', '')
-            col_name = ''.join(calc_str)
+        fieldnames = self._fieldnames()
+        formulas = parse_formulas(calc_str, col_name)
+        indexes = {name: index for index, name in enumerate(fieldnames)}
+        program = plan_formulas(formulas, indexes)
+        evaluate = compile_program(program, indexes)
+
+        def calculated_blocks():
+            for block in read_blocks(self._file, self._delimiter, quote_free=self._quote_free):
+                values = {name: column_values(block, indexes[name]) for name in program.loads.values()}
+                arrays = {name: to_array(column) for name, column in values.items()}
+                masks = {name: missing_mask(column) for name, column in values.items()}
+                results = [from_array(result, mask) for result, mask in evaluate_program(program, arrays, masks,
+                                                                                          len(block))]
+                for row, calc_results in zip(block, zip(*results)):
+                    row.extend([''] * (len(fieldnames) - len(row)))
+                    row.extend(calc_results)
+                yield from block
+
+        def calculated_rows():
+            for row in self._rows(len(fieldnames)):
+                row.extend(calc_result if calc_result is not None else '' for calc_result in evaluate(row))
+                yield row
+
+        rows = calculated_blocks() if self._vectorized else calculated_rows()
+        self._save(rows, fieldnames + list(formulas), file_name, buffer_size)
+
+    def fit(self, numeric_fill: FillType = None,
+            normalization: Union[str, Iterable[str], Dict[str, NormalizationType]] = None,
+            normalization_type: NormalizationType = None, fall_back: str = '0', quantile_error: float = None,
+            mode_capacity: int = None) -> PreprocessingModel:
+        """
+        Function to compute the preprocessing parameters of the data file, to be applied later by ``transform``
 
-        with open(self._file, 'r') as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            fieldnames.extend(csv_reader.fieldnames)
-            fieldnames.append(col_name)
-            for csv_row in csv_reader:
-                row = dict(csv_row)
-                calc_result = DataPreprocessor.do_calc(operations, row)
-                if calc_result is not None:
-                    row[col_name] = calc_result
-                else:
-                    row[col_name] = ''
-                new_data.append(row)
+        ----
+
+        Profile every attribute in a single read, then gather into a model the data type of each attribute, its fill
+        value if numeric_fill is specified, and the parameters of its normalization if normalization or
+        normalization_type is specified, which follow the same rules as ``normalization``
+
+        |  Fill values are computed for every attribute, not only the ones with missing values in this file, so the
+        model can fill any later file. Normalization parameters are those of the filled data, as if ``fill_nan`` was
+        run before ``normalization``, they are derived from the profiles without reading the file again
+
+        :param numeric_fill: option to fill NUMERIC data, this may be mode, mean, and median, if not specified, the
+                             model does not fill missing values
+        :param normalization: name of the attribute to normalize, list of names, dictionary of name to normalization
+                              type, or None for every NUMERIC attribute if normalization_type is specified
+        :param normalization_type: may be of type z-score or min-max, used by attributes without their own type, if
+                                   neither this nor normalization is specified, the model does not normalize
+        :param fall_back: default data to put into cell if this fill operation failed
+        :param quantile_error: if specified, normalized rank error allowed for medians, ex: 0.01
+        :param mode_capacity: if specified, maximum number of distinct values counted for modes, ex: 1000
+        :return: the fitted model, which can be saved as JSON
+        :raise: AttributeError if a normalized attribute is not in the data
+        :raise: TypeError if data type of one of the normalized attributes is not NUMERIC
+        :raise: ValueError if a normalized attribute has no normalization type
+        """
+        normalize = normalization is not None or normalization_type is not None
+        if normalize and normalization_type is None and not isinstance(normalization, dict):
+            raise ValueError("Normalization type must be specified")
+        profiles = self._profile(distributions=numeric_fill is not None, quantile_error=quantile_error,
+                                 mode_capacity=mode_capacity)
+        fill_values = {}
+        if numeric_fill is not None:
+            fill_values = self._fill_values(profiles, numeric_fill, fall_back, only_missing=False)
+        normalizations = {}
+        if normalize:
+            for name, attribute_type in self._normalization_types(normalization, normalization_type, profiles).items():
+                if name not in profiles:
+                    raise AttributeError(f"No such attribute: {name}")
+                column = profiles[name]
+                if name in fill_values:
+                    column = column.filled(fill_values[name])
+                normalizations[name] = self._normalization_parameters(column, attribute_type)
+        types = {name: column.data_type.name for name, column in profiles.items()}
+        return PreprocessingModel(list(profiles), types, fill_values, normalizations)
+
+    def transform(self, model: PreprocessingModel, file_name: str = None, buffer_size: int = 1000) -> None:
+        """
+        Function to apply a fitted model to the data file
 
-        with open(file_name, 'w', newline='', encoding='utf-8') as csv_file:
-            csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-            csv_writer.writeheader()
-            csv_writer.writerows(new_data)
+        ----
+
+        Read the rows one by one, fill their missing values with the model's fill values, re-scale the normalized
+        attributes with the model's parameters and write them out immediately, the data file is read only once since
+        no statistics is computed on it
+
+        |  Attributes of the data file which are not in the model are left unchanged
+
+        |  If file name is not specified, the data will be saved on the old file
+
+        :param model: model returned by ``fit`` or loaded by ``PreprocessingModel.load``
+        :param file_name: name of the file to save this data
+        :param buffer_size: maximum number of rows to buffer before writing them
+        :raise: AttributeError if an attribute filled or normalized by the model is not in the data
+        """
+        fieldnames = self._fieldnames()
+        for name in list(model.fill_values) + list(model.normalizations):
+            if name not in fieldnames:
+                raise AttributeError(f"No such attribute: {name}")
+        fill_values = [(fieldnames.index(name), value) for name, value in model.fill_values.items()]
+        rescales = [(fieldnames.index(name), self._parameters_rescale_function(parameters))
+                    for name, parameters in model.normalizations.items()]
+
+        def transformed_rows():
+            for row in self._rows(len(fieldnames)):
+                for index, value in fill_values:
+                    if not row[index]:
+                        row[index] = value
+                for index, rescale in rescales:
+                    row[index] = rescale(row[index])
+                yield row
+
+        self._save(transformed_rows(), fieldnames, file_name, buffer_size)
@@ -0,0 +1,446 @@
+import csv
+import base64
+import heapq
+from array import array
+from enum import Enum
+from typing import Any, Dict, List, Optional, AnyStr, Iterable, Iterator, Sequence, Tuple
+from .accumulator import RunningStats
+from .quantile import quantiles
+from .sketch import KLLSketch, SpaceSaving
+from .projection import read_rows
+from .bitmap import RowBitmap
+
+
+class DataType(Enum):
+    """
+    Enum class define data type of each attribute
+
+    ----
+
+    Each attributes may belong to a specific type as defined here, those are:
+        - NUMERIC for float value and such, can be used in mathematics expression
+        - CATEGORICAL for named value, can't be calculated on
+        - UNKNOWN for data type does not belong to above type
+    """
+    NUMERIC = 0
+    CATEGORICAL = 1
+    UNKNOWN = 2
+
+
+class ColumnProfile:
+    """
+    Statistics of a single attribute, accumulated value by value while the data file is being read
+
+    ----
+
+    The data type of the attribute is decided by its first non-empty value, the same way
+    ``DataPreprocessor._deter_data_type`` does, every following value is then accumulated into the missing
+    information, the numeric aggregates (count, sum, min, max, mean and variance) and, unless disabled, the values and
+    frequency table used for median and mode
+
+    |  The missing rows are kept in a ``RowBitmap``, one bit per row instead of one int per missing value
+
+    |  NUMERIC values are kept in a compact array for exact quantiles, or, if a quantile error is given, summarized by a
+    ``KLLSketch`` whose memory does not grow with the data
+
+    |  Values are counted in an exact frequency table for mode, or, if a mode capacity is given, in a ``SpaceSaving``
+    summary which only count that many distinct values
+    """
+
+    def __init__(self, name: str, distributions: bool = True, quantile_error: float = None,
+                 mode_capacity: int = None) -> None:
+        """
+        Class constructor
+
+        :param name: name of the attribute this profile describe
+        :param distributions: whether to keep what median and mode need, which grow with the data
+        :param quantile_error: if specified, quantiles are approximated with this normalized rank error instead of
+                               being computed exactly
+        :param mode_capacity: if specified, mode is approximated by counting at most this many distinct values
+        """
+        self.name = name
+        self.data_type = DataType.UNKNOWN
+        self.rows = 0
+        self.missing = 0
+        self.missing_rows = RowBitmap()
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._stats = RunningStats()
+        self._distributions = distributions
+        self._values = array('d')
+        self._sketch = KLLSketch.for_error(quantile_error, seed=0) if quantile_error else None
+        self._frequency = SpaceSaving(mode_capacity) if mode_capacity else {}
+
+    def update(self, value: str, row_number: int) -> None:
+        """
+        Accumulate one value of this attribute
+
+        :param value: raw string value read from the data file
+        :param row_number: index of the row this value belong to, start at 0 and exclude fieldnames row
+        """
+        self.rows += 1
+        if value == '' or value is None:
+            self.missing += 1
+            self.missing_rows.add(row_number)
+            return
+        if self.data_type == DataType.UNKNOWN:
+            try:
+                float(value)
+                self.data_type = DataType.NUMERIC
+            except ValueError:
+                self.data_type = DataType.CATEGORICAL
+        if self._distributions:
+            if isinstance(self._frequency, SpaceSaving):
+                self._frequency.update(value)
+            elif value in self._frequency:
+                self._frequency[value] += 1
+            else:
+                self._frequency[value] = 1
+        if self.data_type == DataType.NUMERIC:
+            try:
+                number = float(value)
+            except ValueError:
+                return
+            self._stats.update(number)
+            self.total += number
+            if self._sketch is not None:
+                self._sketch.update(number)
+            elif self._distributions:
+                self._values.append(number)
+            if self.min is None or number < self.min:
+                self.min = number
+            if self.max is None or number > self.max:
+                self.max = number
+
+    def merge(self, other: 'ColumnProfile', row_offset: int = 0) -> None:
+        """
+        Merge the profile of the rows following the ones of this profile into it
+
+        ----
+
+        Missing rows of the other profile are shifted by row_offset, aggregates, accumulators and sketches are merged,
+        so merging the profiles of consecutive parts of a file give the profile of the whole file, except for float
+        rounding: totals are added and means and variances combined with Chan's formula, see ``RunningStats.merge``,
+        which may not round as accumulating every value one by one does
+
+        |  The data type stay the one of this profile if it has any value, as the first value of the file decide it
+
+        :param other: profile of the same attribute on the following rows, it is left unchanged
+        :param row_offset: number of rows before the first row of the other profile
+        """
+        self.rows += other.rows
+        self.missing += other.missing
+        self.missing_rows.merge(other.missing_rows, row_offset)
+        if self.data_type == DataType.UNKNOWN:
+            self.data_type = other.data_type
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        self._stats.merge(other._stats)
+        if self._sketch is not None:
+            self._sketch.merge(other._sketch)
+        else:
+            self._values.extend(other._values)
+        if isinstance(self._frequency, SpaceSaving):
+            self._frequency.merge(other._frequency)
+        else:
+            for value, count in other._frequency.items():
+                self._frequency[value] = self._frequency.get(value, 0) + count
+
+    def filled(self, value: Any) -> 'ColumnProfile':
+        """
+        Profile of this attribute once its missing values are replaced by a given value, without reading it again
+
+        ----
+
+        The replaced values are all the same, so they are merged into the aggregates as a single group with no variance,
+        which give the same statistics as profiling the filled attribute, except for float rounding
+
+        |  Only the missing information, aggregates and accumulators are kept, not the distributions
+
+        :param value: value the missing cells are filled with
+        :return: a new profile, this one is left unchanged
+        """
+        column = ColumnProfile(self.name, distributions=False)
+        column.data_type = self.data_type
+        column.rows = self.rows
+        column.total = self.total
+        column.min = self.min
+        column.max = self.max
+        column._stats.merge(self._stats)
+        if not self.missing or value == '' or value is None:
+            column.missing = self.missing
+            column.missing_rows = self.missing_rows.copy()
+            return column
+        if column.data_type == DataType.UNKNOWN:
+            column.data_type = DataType.NUMERIC
+            try:
+                float(value)
+            except ValueError:
+                column.data_type = DataType.CATEGORICAL
+        if column.data_type != DataType.NUMERIC:
+            return column
+        try:
+            number = float(value)
+        except ValueError:
+            return column
+        column._stats.merge(RunningStats(self.missing, number))
+        column.total += number * self.missing
+        if column.min is None or number < column.min:
+            column.min = number
+        if column.max is None or number > column.max:
+            column.max = number
+        return column
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Turn the profile into a JSON-serializable dictionary, so it can be saved and merged with later rows
+
+        ----
+
+        Every accumulator is kept, not only the statistics read from it, the exact NUMERIC values are stored as the
+        base64 of their float64 bytes, and the missing rows as the base64 of their bitmap
+
+        :return: a dictionary of the profile's aggregates, accumulators and distributions
+        """
+        data = {'name': self.name, 'type': self.data_type.name, 'rows': self.rows, 'missing': self.missing,
+                'missing_rows': base64.b64encode(self.missing_rows.to_bytes()).decode('ascii'), 'total': self.total,
+                'min': self.min, 'max': self.max,
+                'stats': [self._stats.count, self._stats.mean, self._stats.m2], 'distributions': self._distributions}
+        if self._sketch is not None:
+            data['sketch'] = self._sketch.to_dict()
+        else:
+            data['values'] = base64.b64encode(self._values.tobytes()).decode('ascii')
+        if isinstance(self._frequency, SpaceSaving):
+            data['summary'] = self._frequency.to_dict()
+        else:
+            data['frequency'] = self._frequency
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ColumnProfile':
+        """
+        Create a profile from a dictionary returned by ``to_dict``
+
+        :param data: dictionary of the profile
+        :return: the profile, which can keep being updated and merged
+        """
+        column = cls(data['name'], data['distributions'])
+        column.data_type = DataType[data['type']]
+        column.rows = data['rows']
+        column.missing = data['missing']
+        column.missing_rows = RowBitmap.from_bytes(base64.b64decode(data['missing_rows']))
+        column.total = data['total']
+        column.min = data['min']
+        column.max = data['max']
+        column._stats = RunningStats(*data['stats'])
+        if 'sketch' in data:
+            column._sketch = KLLSketch.from_dict(data['sketch'], seed=0)
+        else:
+            column._values.frombytes(base64.b64decode(data['values']))
+        if 'summary' in data:
+            column._frequency = SpaceSaving.from_dict(data['summary'])
+        else:
+            column._frequency = dict(data['frequency'])
+        return column
+
+    @property
+    def count(self) -> int:
+        """
+        Number of NUMERIC values accumulated, empty values are skipped
+
+        :return: number of values
+        """
+        return self._stats.count
+
+    @property
+    def mean(self) -> Optional[float]:
+        """
+        Mean of the NUMERIC attribute, empty values are skipped
+
+        :return:
+                float: mean of this attribute,
+                None: if the attribute is not NUMERIC
+        """
+        if self.data_type != DataType.NUMERIC or not self.count:
+            return None
+        return self._stats.mean
+
+    @property
+    def variance(self) -> Optional[float]:
+        """
+        Sample variance of the NUMERIC attribute, empty values are skipped
+
+        :return:
+                float: variance of this attribute, 0 if there are less than 2 values,
+                None: if the attribute is not NUMERIC
+        """
+        if self.data_type != DataType.NUMERIC:
+            return None
+        return self._stats.variance
+
+    @property
+    def standard_deviation(self) -> Optional[float]:
+        """
+        Sample standard deviation of the NUMERIC attribute, empty values are skipped
+
+        :return:
+                float: standard deviation of this attribute,
+                None: if the attribute is not NUMERIC
+        """
+        if self.data_type != DataType.NUMERIC:
+            return None
+        return self._stats.standard_deviation
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """
+        Quantiles of the NUMERIC attribute, empty values are skipped
+
+        ----
+
+        Every requested quantile is selected in the same linear-time pass over the parsed values, see
+        ``quantile.quantiles``, or read from the sketch if this profile approximate quantiles
+
+        :param qs: quantiles to compute, each between 0-1
+        :return: value of each quantile, in the order of qs, None if the attribute is not NUMERIC
+        :raise: ValueError if a quantile is not between 0-1
+        """
+        if self.data_type != DataType.NUMERIC:
+            return [None for _ in qs]
+        if self._sketch is not None:
+            return self._sketch.quantiles(qs)
+        return quantiles(self._values, qs)
+
+    @property
+    def median(self) -> Optional[float]:
+        """
+        Median of the NUMERIC attribute, empty values are skipped
+
+        :return:
+                float: median of this attribute, the mean of the two middle values if their number is even,
+                None: if the attribute is not NUMERIC
+        """
+        return self.quantiles([0.5])[0]
+
+    def top(self, k: int = 1) -> List[Tuple[AnyStr, int, int]]:
+        """
+        Most frequent values of the attribute
+
+        ----
+
+        Only the k biggest counts are kept while going through the frequency table, which is never sorted as a whole
+
+        :param k: number of values to return
+        :return: list of (value, count, error) tuples sorted by count, most frequent first, the true count of each
+                 value is between count - error and count, error is always 0 unless a mode capacity is given
+        """
+        if isinstance(self._frequency, SpaceSaving):
+            return self._frequency.top(k)
+        top = heapq.nlargest(k, self._frequency.items(), key=lambda item: item[1])
+        return [(value, count, 0) for value, count in top]
+
+    @property
+    def mode(self) -> Optional[AnyStr]:
+        """
+        Most frequent value of the attribute, if several values are as frequent, the first one read is chosen
+
+        :return:
+                str: value of the mode of this attribute,
+                None: if the attribute has all empty rows
+        """
+        if isinstance(self._frequency, SpaceSaving):
+            return self._frequency.mode
+        if not self._frequency:
+            return None
+        return max(self._frequency, key=self._frequency.get)
+
+
+def profile(file: str, delimiter: str = ',', columns: Iterable[str] = None, distributions: bool = True,
+            quantile_error: float = None, mode_capacity: int = None,
+            quote_free: bool = None) -> Dict[str, ColumnProfile]:
+    """
+    Compute the profile of every attribute of a data file in a single read
+
+    ----
+
+    Open the data file once and feed every value of every row into the ``ColumnProfile`` of its attribute, so the
+    type, missing information and statistics of all attributes are available without re-opening the file
+
+    |  Rows are read as lists of values, the position of each profiled attribute is looked up once from the fieldnames
+    instead of building a dictionary for every row. If only some attributes are profiled, only their fields are parsed,
+    see ``projection.project_lines``, and files without quotes are split without the ``csv`` module, see
+    ``projection.read_rows``
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param columns: names of the attributes to profile, if not specified, all attributes will be profiled
+    :param distributions: whether to keep what median and mode need, disable it when only missing information and
+                          aggregates are needed
+    :param quantile_error: if specified, quantiles are approximated with this normalized rank error, using a few KB
+                           per attribute, instead of keeping every NUMERIC value
+    :param mode_capacity: if specified, modes are approximated by counting at most this many distinct values of each
+                          attribute, instead of every distinct value
+    :param quote_free: whether the file hold no quote, if not specified, it is guessed from a sample of the file
+    :return: a dictionary which hold key-value pair, in the order of the file's fieldnames:
+                key: name of the attribute
+                value: profile of this attribute
+    :raise: AttributeError if one of the given columns is not an attribute of the file
+    """
+    with open(file, 'r') as csv_file:
+        fieldnames = next(csv.reader(csv_file, delimiter=delimiter), [])
+    if columns is None:
+        names = list(fieldnames)
+    else:
+        names = list(columns)
+        for name in names:
+            if name not in fieldnames:
+                raise AttributeError(f"No such attribute: {name}")
+    profiles = {name: ColumnProfile(name, distributions, quantile_error, mode_capacity)
+                for name in fieldnames if name in names}
+    positions = [fieldnames.index(name) for name in profiles]
+    if len(positions) < len(fieldnames):
+        targets = list(enumerate(profiles.values()))
+        rows = read_rows(file, delimiter, positions, quote_free)
+    else:
+        targets = list(zip(positions, profiles.values()))
+        rows = _padded(read_rows(file, delimiter, quote_free=quote_free), len(fieldnames))
+    for row_number, row in enumerate(rows):
+        for index, column in targets:
+            column.update(row[index], row_number)
+    return profiles
+
+
+def _padded(rows: Iterable[List[str]], width: int) -> Iterator[List[str]]:
+    """
+    Pad the short rows
+
+    :param rows: rows, as lists of values, blank rows excluded
+    :param width: number of fieldnames, rows with less values are padded with empty values
+    :return: generator of the rows
+    """
+    for row in rows:
+        if len(row) < width:
+            row.extend([''] * (width - len(row)))
+        yield row
+
+
+def transpose_missing(profiles: Dict[str, ColumnProfile]) -> Dict[int, List[str]]:
+    """
+    Turn the per-attribute missing rows of the profiles into per-row missing attributes
+
+    :param profiles: profiles of the attributes, as returned by ``profile``
+    :return: a dictionary which hold key-value pair, ordered by row index:
+                key: row index of rows which has missing value
+                value: list of attributes which is missing from this row
+    """
+    missing_rows = {}
+    for name, column in profiles.items():
+        for row_number in column.missing_rows:
+            if row_number in missing_rows:
+                missing_rows[row_number].append(name)
+            else:
+                missing_rows[row_number] = [name]
+    return dict(sorted(missing_rows.items()))
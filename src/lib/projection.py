@@ -0,0 +1,306 @@
+import io
+import os
+import csv
+from typing import AnyStr, Iterable, Iterator, List, Optional, Sequence
+
+# size of the blocks read by the quote-free fast path
+_BLOCK_SIZE = 1 << 20
+
+# number of blocks sampled across the data file to tell whether it hold quotes, and the size of each of them
+_SAMPLES = 16
+_SAMPLE_SIZE = 4096
+
+
+def ends_quoted(line: AnyStr, delimiter: AnyStr, quoted: bool = False) -> bool:
+    """
+    Tell whether a line of a data file end inside a quoted value, so its record continue on the next line
+
+    ----
+
+    Quotes are read as ``csv.reader`` does: a quote open a quoted value only at the start of a field, which is the start
+    of the record or the position following a delimiter, inside a quoted value a doubled quote is an escaped quote and
+    a single one close the value. Any other quote, ex: ``5'10"``, is a character of an unquoted value
+
+    :param line: line of the data file, str or bytes
+    :param delimiter: delimiter of each value in the file, of the same type as line
+    :param quoted: whether the line start inside a quoted value, if not, the line start a record
+    :return: whether the line end inside a quoted value
+    """
+    quote = '"' if isinstance(line, str) else b'"'
+    position = 0
+    while True:
+        found = line.find(quote, position)
+        if found == -1:
+            return quoted
+        if quoted:
+            if line.startswith(quote, found + 1):
+                position = found + 2
+                continue
+            quoted = False
+        elif found == 0 or line.endswith(delimiter, 0, found):
+            quoted = True
+        position = found + 1
+
+
+def records(lines: Iterable[str], delimiter: str = ',') -> Iterator[str]:
+    """
+    Group the lines of a data file into records
+
+    ----
+
+    A record ends at a newline which is not inside a quoted value, lines are joined with the following ones while they
+    end inside a quoted value, see ``ends_quoted``
+
+    :param lines: lines of the data file, with their newlines, as read from a file opened in text mode
+    :param delimiter: delimiter of each value in the file
+    :return: generator of the records, without their final newline, blank lines included, a last record ending inside
+             a quoted value keep its newline, which belong to the value
+    """
+    lines = iter(lines)
+    for line in lines:
+        if '"' in line and ends_quoted(line, delimiter):
+            parts = [line]
+            quoted = True
+            while quoted:
+                following = next(lines, None)
+                if following is None:
+                    yield ''.join(parts)
+                    return
+                parts.append(following)
+                quoted = ends_quoted(following, delimiter, True)
+            line = ''.join(parts)
+        yield line[:-1] if line.endswith('\n') else line
+
+
+def _split_quoted(record: str, delimiter: str, wanted: Sequence[bool]) -> List[Optional[str]]:
+    """
+    Split the first fields of a record holding quotes, without building the values of the fields which are not wanted
+
+    ----
+
+    Fields are walked with ``str.find``, a quoted field end at a quote which is not doubled, and the characters
+    following it up to the delimiter are kept, as ``csv.reader`` does when it is not strict
+
+    :param record: record, without its final newline
+    :param delimiter: delimiter of each value in the file
+    :param wanted: whether the value of each field is wanted, no field after the last one is read
+    :return: value of each field read, None for fields which are not wanted, fields missing from the record excluded
+    """
+    values = []
+    end = len(record)
+    position = 0
+    while True:
+        keep = wanted[len(values)]
+        if position < end and record[position] == '"':
+            parts = []
+            start = position + 1
+            while True:
+                quote = record.find('"', start)
+                if quote == -1:
+                    if keep:
+                        parts.append(record[start:])
+                    position = end
+                    break
+                if keep:
+                    parts.append(record[start:quote])
+                if record.startswith('"', quote + 1):
+                    if keep:
+                        parts.append('"')
+                    start = quote + 2
+                else:
+                    position = quote + 1
+                    break
+            following = record.find(delimiter, position)
+            if keep:
+                parts.append(record[position:end if following == -1 else following])
+                values.append(''.join(parts))
+            else:
+                values.append(None)
+        else:
+            following = record.find(delimiter, position)
+            values.append(record[position:end if following == -1 else following] if keep else None)
+        if following == -1 or len(values) == len(wanted):
+            return values
+        position = following + len(delimiter)
+
+
+def project_lines(lines: Iterable[str], delimiter: str, positions: Sequence[int]) -> Iterator[List[str]]:
+    """
+    Parse only some fields of the records of a data file
+
+    ----
+
+    A record without quotes, the common case, is split with ``str.split`` up to the last wanted field only, the rest of
+    the record is never split. A record with quotes is walked field by field and the fields which are not wanted are
+    skipped without building their values, see ``_split_quoted``. Blank lines are skipped, as ``csv.reader`` does
+
+    :param lines: lines of the data file, with their newlines, as read from a file opened in text mode
+    :param delimiter: delimiter of each value in the file
+    :param positions: positions of the wanted fields in the records
+    :return: generator of the values of the wanted fields of each record, in the order of positions, records too short
+             to have a field get an empty value for it
+    """
+    return _project(records(lines, delimiter), delimiter, positions)
+
+
+def _project(texts: Iterable[str], delimiter: str, positions: Sequence[int]) -> Iterator[List[str]]:
+    """
+    Parse only some fields of records, see ``project_lines``
+
+    :param texts: records, without their final newline
+    :param delimiter: delimiter of each value in the file
+    :param positions: positions of the wanted fields in the records
+    :return: generator of the values of the wanted fields of each record, blank records excluded
+    """
+    positions = list(positions)
+    last = max(positions, default=-1)
+    wanted = [False] * (last + 1)
+    for position in positions:
+        wanted[position] = True
+    for record in texts:
+        if not record:
+            continue
+        if '"' in record:
+            fields = _split_quoted(record, delimiter, wanted) if wanted else []
+        else:
+            fields = record.split(delimiter, last + 1)
+        if len(fields) > last:
+            yield [fields[position] for position in positions]
+        else:
+            yield [fields[position] if position < len(fields) else '' for position in positions]
+
+
+def project_range(file: str, start: int, end: int, delimiter: str, positions: Sequence[int]) -> Iterator[List[str]]:
+    """
+    Parse only some fields of the rows of a byte range of a data file, see ``project_lines``
+
+    :param file: name of the data file
+    :param start: offset of the first byte of the range, a record boundary
+    :param end: offset following the last byte of the range, a record boundary
+    :param delimiter: delimiter of each value in the file
+    :param positions: positions of the wanted attributes in the fieldnames
+    :return: generator of the values of the wanted attributes of each row of the range, blank rows excluded
+    """
+    with open(file, 'rb') as data_file:
+        data_file.seek(start)
+        data = data_file.read(end - start)
+    return project_lines(io.StringIO(data.decode('utf-8'), newline=None), delimiter, positions)
+
+
+def sample_quote_free(file: str) -> bool:
+    """
+    Tell whether a data file seem to hold no quote, from a few blocks spread evenly across it
+
+    ----
+
+    The blocks are the same whatever the size of the file, so a quote outside of them is missed, it is only a hint of
+    whether the quote-free fast path of ``read_rows`` is worth trying, which check every block it reads anyway
+
+    :param file: name of the data file
+    :return: whether none of the sampled blocks hold a quote
+    """
+    size = os.path.getsize(file)
+    step = max(0, size - _SAMPLE_SIZE) / (_SAMPLES - 1)
+    with open(file, 'rb') as data_file:
+        for sample in range(_SAMPLES):
+            data_file.seek(round(step * sample))
+            if b'"' in data_file.read(_SAMPLE_SIZE):
+                return False
+    return True
+
+
+def _fast_rows(file: str, delimiter: str, positions: Optional[Sequence[int]],
+               block_size: int) -> Iterator[List[str]]:
+    """
+    Read the rows of a data file without the ``csv`` module, as long as no quote is found
+
+    ----
+
+    The file is read by big blocks, each block is cut after its last newline, decoded at once and split into lines then
+    values with ``str.split``, the end of the block being carried over to the next one. Without quotes, a newline
+    always end a record and a delimiter always end a value, so the rows are the same as with ``csv.reader``
+
+    |  As soon as a block holding a quote is read, the rest of the file, from the first record not returned yet, is
+    read with ``csv.reader``, or ``project_lines`` if positions are given
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param positions: if specified, only the fields at these positions are returned, see ``project_lines``
+    :param block_size: number of bytes read at once
+    :return: generator of the rows, fieldnames row and blank rows excluded
+    """
+    with open(file, 'rb') as data_file:
+        header = True
+        offset = 0
+        rest = b''
+        block = data_file.read(block_size)
+        while block and b'"' not in block:
+            data = rest + block
+            block = data_file.read(block_size)
+            cut = data.rfind(b'\n') + 1 if block else len(data)
+            rest = data[cut:]
+            if not cut:
+                continue
+            offset += cut
+            text = data[:cut].decode('utf-8')
+            if '\r' in text:
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+            lines = text.split('\n')
+            if header:
+                header = False
+                del lines[0]
+            if positions is None:
+                yield from (line.split(delimiter) for line in lines if line)
+            else:
+                yield from _project(lines, delimiter, positions)
+        if not block:
+            return
+        data_file.seek(offset)
+        lines = io.TextIOWrapper(data_file, encoding='utf-8', newline=None)
+        if header:
+            next(records(lines, delimiter), None)
+        yield from _csv_rows(lines, delimiter, positions)
+
+
+def _csv_rows(lines: Iterable[str], delimiter: str, positions: Optional[Sequence[int]]) -> Iterator[List[str]]:
+    """
+    Read rows with the ``csv`` module, or ``project_lines`` if positions are given
+
+    :param lines: lines of the data file following the fieldnames row, as read from a file opened in text mode
+    :param delimiter: delimiter of each value in the file
+    :param positions: if specified, only the fields at these positions are returned
+    :return: generator of the rows, blank rows excluded
+    """
+    if positions is None:
+        return filter(None, csv.reader(lines, delimiter=delimiter))
+    return project_lines(lines, delimiter, positions)
+
+
+def read_rows(file: str, delimiter: str = ',', positions: Sequence[int] = None, quote_free: bool = None,
+              block_size: int = _BLOCK_SIZE) -> Iterator[List[str]]:
+    """
+    Read the rows of a data file, with the quote-free fast path when the file seem to hold no quote
+
+    ----
+
+    Machine-generated data files often hold no quote, so they can be split with ``str.split`` over big blocks instead
+    of going through the state machine of ``csv.reader``, see ``_fast_rows``. If a quote is found, the rest of the
+    file is read with the ``csv`` module, so the rows are the same either way
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param positions: if specified, only the fields at these positions are returned, see ``project_lines``
+    :param quote_free: whether to try the fast path, if not specified, it is tried if ``sample_quote_free`` find no
+                       quote in the file
+    :param block_size: number of bytes read at once by the fast path
+    :return: generator of the rows, as lists of values, fieldnames row and blank rows excluded
+    """
+    if quote_free is None:
+        quote_free = sample_quote_free(file)
+    if quote_free:
+        yield from _fast_rows(file, delimiter, positions, block_size)
+        return
+    with open(file, 'r') as csv_file:
+        lines = iter(csv_file)
+        next(records(lines, delimiter), None)
+        yield from _csv_rows(lines, delimiter, positions)
@@ -0,0 +1,115 @@
+import math
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+# sub-ranges smaller than this are simply sorted, partitioning them cost more than it save
+_SMALL_RANGE = 16
+
+
+def _partition(values: array, left: int, right: int, pivot: float) -> Tuple[int, int]:
+    """
+    Three-way partition of values[left:right + 1] around a pivot
+
+    ----
+
+    Afterwards values smaller than the pivot are before index lt, values bigger than the pivot are after index gt, and
+    every value in between is equal to the pivot, so columns with many repeated values does not degrade the selection
+
+    :param values: values to partition, modified in place
+    :param left: index of the first value of the range
+    :param right: index of the last value of the range
+    :param pivot: value to partition around
+    :return: lt and gt, bounds of the range of values equal to the pivot
+    """
+    lt, i, gt = left, left, right
+    while i <= gt:
+        value = values[i]
+        if value < pivot:
+            values[i] = values[lt]
+            values[lt] = value
+            lt += 1
+            i += 1
+        elif value > pivot:
+            values[i] = values[gt]
+            values[gt] = value
+            gt -= 1
+        else:
+            i += 1
+    return lt, gt
+
+
+def _select(values: array, ranks: List[int], left: int, right: int, depth: int) -> None:
+    """
+    Move the values of given ranks to their sorted position, without sorting the whole range (introselect)
+
+    ----
+
+    Quickselect with a median-of-three pivot, each partition step keep going only on the sides that still contain a
+    requested rank, so selecting several ranks cost about as much as selecting one
+
+    |  If the partitions turn out badly and the depth limit is reached, the remaining range is sorted, which bound the
+    worst case to O(n log n) while the expected cost stay O(n)
+
+    :param values: values to select from, modified in place
+    :param ranks: sorted ranks to select, all inside [left, right]
+    :param left: index of the first value of the range
+    :param right: index of the last value of the range
+    :param depth: number of partition steps allowed before falling back to sorting
+    """
+    while ranks:
+        if right - left < _SMALL_RANGE or depth <= 0:
+            values[left:right + 1] = array('d', sorted(values[left:right + 1]))
+            return
+        depth -= 1
+        a, b, c = values[left], values[(left + right) // 2], values[right]
+        pivot = max(min(a, b), min(max(a, b), c))
+        lt, gt = _partition(values, left, right, pivot)
+        lower = [rank for rank in ranks if rank < lt]
+        if lower:
+            _select(values, lower, left, lt - 1, depth)
+        ranks = [rank for rank in ranks if rank > gt]
+        left = gt + 1
+
+
+def quantiles(values: array, qs: Sequence[float]) -> List[Optional[float]]:
+    """
+    Compute exact quantiles of NUMERIC values in linear time
+
+    ----
+
+    Each quantile q is located at position q * (n - 1) of the sorted values and linearly interpolated between the two
+    values around it, so the 0.5 quantile of an even number of values is the mean of the two middle ones
+
+    |  All needed ranks are selected together with ``_select`` instead of sorting the values, the values are reordered
+    in place to avoid copying them
+
+    :param values: compact array of values, modified in place
+    :param qs: quantiles to compute, each between 0-1
+    :return: value of each quantile, in the order of qs, None if there are no values
+    :raise: ValueError if a quantile is not between 0-1
+    """
+    for q in qs:
+        if q < 0 or q > 1:
+            raise ValueError("Quantile value must be between 0-1")
+    if not values:
+        return [None for _ in qs]
+    last = len(values) - 1
+    positions = [q * last for q in qs]
+    ranks = sorted({rank for position in positions for rank in (math.floor(position), math.ceil(position))})
+    _select(values, ranks, 0, last, 2 * last.bit_length())
+    results = []
+    for position in positions:
+        low = math.floor(position)
+        high = math.ceil(position)
+        results.append(values[low] + (values[high] - values[low]) * (position - low))
+    return results
+
+
+def median(values: array) -> Optional[float]:
+    """
+    Compute the exact median of NUMERIC values in linear time
+
+    :param values: compact array of values, modified in place
+    :return: median of the values, None if there are no values
+    """
+    return quantiles(values, [0.5])[0]
@@ -0,0 +1,270 @@
+import os
+import io
+import csv
+import sys
+import mmap
+import struct
+import tempfile
+from array import array
+from typing import Iterator, List, Optional
+from .cache import sample_hash
+from .projection import ends_quoted
+
+# suffix added to the data file's name to get the name of its row index
+INDEX_SUFFIX = '.idx'
+
+# first bytes of an index file
+_MAGIC = b'PPINDEX2'
+
+# number of rows decoded at once when rows are parsed
+_ROWS_PER_BLOCK = 4096
+
+
+def index_name(file: str) -> str:
+    """
+    Name of the row index of a data file
+
+    :param file: name of the data file
+    :return: name of the index file, next to the data file
+    """
+    return file + INDEX_SUFFIX
+
+
+def _identity(file: str, delimiter: str) -> bytes:
+    """
+    Identity of a data file in its current state, an index is fresh while its data file has the same
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file, which decide where quoted values start
+    :return: size, modification time, sampled content hash of the file and delimiter, packed
+    """
+    status = os.stat(file)
+    return struct.pack('<QQ', status.st_size, status.st_mtime_ns) + bytes.fromhex(sample_hash(file, status.st_size)) \
+        + delimiter.encode('utf-8')
+
+
+def build_index(file: str, delimiter: str = ',') -> array:
+    """
+    Find the offset of every record of a data file
+
+    ----
+
+    A record ends at a newline which is not inside a quoted value, the file is read once line by line and quotes are
+    read as ``csv.reader`` does, see ``projection.ends_quoted``, so records are the rows of ``csv.reader``. Blank lines
+    are not records, as ``csv.reader`` rows are filtered by the other methods, so the N-th offset is the start of the
+    row numbered N by the other methods
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :return: start offset of each row, the fieldnames row excluded, followed by the end offset of the last row
+    """
+    separator = delimiter.encode('utf-8')
+    offsets = array('Q')
+    header = True
+    start = 0
+    position = 0
+    quoted = False
+    with open(file, 'rb') as data_file:
+        for line in data_file:
+            position += len(line)
+            if quoted or b'"' in line:
+                quoted = ends_quoted(line, separator, quoted)
+                if quoted:
+                    continue
+            if header:
+                header = False
+            elif position - start > len(line) or line not in (b'\n', b'\r\n'):
+                offsets.append(start)
+            start = position
+    if position > start:
+        if header:
+            header = False
+        else:
+            offsets.append(start)
+    if not header:
+        offsets.append(position)
+    return offsets
+
+
+def save_index(file: str, offsets: array, path: str = None, delimiter: str = ',') -> None:
+    """
+    Save the row index of a data file, with the identity of the data file
+
+    :param file: name of the data file
+    :param offsets: offsets returned by ``build_index``
+    :param path: name of the index file, if not specified, the data file's name followed by ``INDEX_SUFFIX``
+    :param delimiter: delimiter the index was built with
+    """
+    path = path or index_name(file)
+    data = array('Q', offsets)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    fd, temporary = tempfile.mkstemp(suffix=INDEX_SUFFIX, dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as index_file:
+            index_file.write(_MAGIC + _identity(file, delimiter) + struct.pack('<Q', len(data)))
+            data.tofile(index_file)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def load_index(file: str, path: str = None, delimiter: str = ',') -> Optional[array]:
+    """
+    Load the row index of a data file, if it is up to date
+
+    :param file: name of the data file
+    :param path: name of the index file, if not specified, the data file's name followed by ``INDEX_SUFFIX``
+    :param delimiter: delimiter of each value in the file
+    :return: offsets as returned by ``build_index``, None if there is no readable index, the data file changed since
+             it was built or it was built with another delimiter
+    """
+    path = path or index_name(file)
+    identity = _identity(file, delimiter)
+    try:
+        with open(path, 'rb') as index_file:
+            if index_file.read(len(_MAGIC)) != _MAGIC or index_file.read(len(identity)) != identity:
+                return None
+            count, = struct.unpack('<Q', index_file.read(8))
+            offsets = array('Q')
+            offsets.fromfile(index_file, count)
+    except (OSError, EOFError, struct.error):
+        return None
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return offsets
+
+
+def record_index(file: str, delimiter: str = ',', save: bool = True) -> array:
+    """
+    Row index of a data file, loaded from its index file if it is up to date, built and saved otherwise
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param save: whether to save the index when it is built, not worth it if the data file is about to be replaced
+    :return: offsets as returned by ``build_index``
+    """
+    offsets = load_index(file, delimiter=delimiter)
+    if offsets is None:
+        offsets = build_index(file, delimiter)
+        if not save:
+            return offsets
+        try:
+            save_index(file, offsets, delimiter=delimiter)
+        except OSError:
+            pass
+    return offsets
+
+
+class RecordReader:
+    """
+    Random access to the rows of a data file, through a memory map and a row index
+
+    ----
+
+    The start offset of every row is kept in an ``array('Q')``, cached in an index file next to the data file, so row N
+    or a range of rows is found without reading the rows before it. Records are returned as memoryviews of the map,
+    without copy, in the exact bytes of the file, or parsed into lists of values
+
+    |  Views should be released, ex: with a ``with`` statement, before the reader is closed
+    """
+
+    def __init__(self, file: str, delimiter: str = ',', save_index: bool = True) -> None:
+        """
+        Class constructor, map the data file and load or build its index
+
+        :param file: name of the data file
+        :param delimiter: delimiter of each value in the file
+        :param save_index: whether to save the index next to the data file when it is built, see ``record_index``
+        """
+        self._delimiter = delimiter
+        self.offsets = record_index(file, delimiter, save_index)
+        with open(file, 'rb') as data_file:
+            self._map = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(data_file.fileno()).st_size else None
+        self._view = memoryview(self._map) if self._map is not None else memoryview(b'')
+
+    def close(self) -> None:
+        """
+        Unmap the data file
+        """
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+
+    def __enter__(self) -> 'RecordReader':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        Number of rows of the data file
+
+        :return: number of rows, the fieldnames row and blank lines excluded
+        """
+        return max(0, len(self.offsets) - 1)
+
+    @property
+    def header(self) -> memoryview:
+        """
+        Bytes of the fieldnames row, with its newline
+
+        :return: view of the fieldnames row
+        """
+        return self._view[:self.offsets[0] if self.offsets else len(self._view)]
+
+    def records(self, start: int = 0, stop: int = None) -> memoryview:
+        """
+        Bytes of consecutive rows, with their newlines, and the blank lines following them if any
+
+        :param start: number of the first row, start at 0 and exclude fieldnames row
+        :param stop: number following the last row, if not specified, up to the last row
+        :return: view of the rows
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return self._view[0:0]
+        return self._view[self.offsets[start]:self.offsets[stop]]
+
+    def record(self, row_number: int) -> memoryview:
+        """
+        Bytes of one row, with its newline
+
+        :param row_number: number of the row, start at 0 and exclude fieldnames row
+        :return: view of the row
+        :raise: IndexError if there is no such row
+        """
+        if row_number < 0:
+            row_number += len(self)
+        if not 0 <= row_number < len(self):
+            raise IndexError("Row number out of range")
+        return self.records(row_number, row_number + 1)
+
+    def rows(self, start: int = 0, stop: int = None) -> Iterator[List[str]]:
+        """
+        Parse consecutive rows, a block of rows at a time, so a long run of rows is never decoded at once
+
+        :param start: number of the first row, start at 0 and exclude fieldnames row
+        :param stop: number following the last row, if not specified, up to the last row
+        :return: generator of the rows, as lists of values
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        for block_start in range(start, stop, _ROWS_PER_BLOCK):
+            with self.records(block_start, min(block_start + _ROWS_PER_BLOCK, stop)) as data:
+                text = str(data, 'utf-8')
+            yield from (row for row in csv.reader(io.StringIO(text, newline=''), delimiter=self._delimiter) if row)
+
+    def row(self, row_number: int) -> List[str]:
+        """
+        Parse one row
+
+        :param row_number: number of the row, start at 0 and exclude fieldnames row
+        :return: values of the row
+        :raise: IndexError if there is no such row
+        """
+        with self.record(row_number) as data:
+            return next(csv.reader(io.StringIO(str(data, 'utf-8'), newline=''), delimiter=self._delimiter))
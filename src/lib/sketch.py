@@ -0,0 +1,327 @@
+import math
+import heapq
+import random
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+
+# normalized rank error of a KLL sketch is about this constant divided by k
+_KLL_ERROR_FACTOR = 1.65
+
+
+class KLLSketch:
+    """
+    Mergeable quantile sketch with bounded memory (KLL)
+
+    ----
+
+    Values are kept in a hierarchy of compactors, every item of compactor h stand for 2^h values of the data. When the
+    sketch is full, a compactor is sorted and every other item (starting at a random offset) is promoted to the next
+    compactor, which halve its size while keeping the rank of any value unbiased
+
+    |  Capacities shrink geometrically from the top compactor down, so the sketch hold about 3k values whatever the
+    number of values seen, and the rank of any quantile is off by about 1.65 / k of the number of values
+
+    |  Two sketches built on different parts of the data can be merged into one with the same guarantee
+    """
+
+    def __init__(self, k: int = 200, seed: int = None) -> None:
+        """
+        Class constructor
+
+        :param k: size of the top compactor, bigger values give smaller errors for more memory
+        :param seed: seed of the random offsets of the compactions, for reproducible results
+        :raise: ValueError if k is less than 2
+        """
+        if k < 2:
+            raise ValueError("k must be at least 2")
+        self.k = k
+        self.count = 0
+        self._compactors = []
+        self._size = 0
+        self._max_size = 0
+        self._random = random.Random(seed)
+        self._grow()
+
+    @classmethod
+    def for_error(cls, error: float, seed: int = None) -> 'KLLSketch':
+        """
+        Create a sketch whose quantiles are off by about the given fraction of the number of values
+
+        :param error: normalized rank error, must be between 0-1
+        :param seed: seed of the random offsets of the compactions
+        :return: a new empty sketch
+        :raise: ValueError if the error is not between 0-1
+        """
+        if error <= 0 or error >= 1:
+            raise ValueError("Error value must be between 0-1")
+        return cls(max(2, math.ceil(_KLL_ERROR_FACTOR / error)), seed)
+
+    @property
+    def rank_error(self) -> float:
+        """
+        Normalized rank error of the sketch's quantiles
+
+        :return: fraction of the number of values a quantile's rank may be off by
+        """
+        return _KLL_ERROR_FACTOR / self.k
+
+    def _capacity(self, level: int) -> int:
+        """
+        Capacity of a compactor, which shrink by 2/3 for each level below the top one
+
+        :param level: level of the compactor
+        :return: number of items this compactor can hold before being compacted
+        """
+        depth = len(self._compactors) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _grow(self) -> None:
+        """ Add a compactor on top of the hierarchy """
+        self._compactors.append(array('d'))
+        self._max_size = sum(self._capacity(level) for level in range(len(self._compactors)))
+
+    def _compress(self) -> None:
+        """
+        Compact full compactors, from the bottom up, until the sketch is no longer full
+        """
+        for level in range(len(self._compactors)):
+            if len(self._compactors[level]) >= self._capacity(level):
+                if level + 1 >= len(self._compactors):
+                    self._grow()
+                items = sorted(self._compactors[level])
+                kept = array('d', [items.pop()]) if len(items) % 2 else array('d')
+                offset = self._random.randint(0, 1)
+                self._compactors[level] = kept
+                self._compactors[level + 1].extend(items[offset::2])
+                self._size = sum(len(compactor) for compactor in self._compactors)
+                if self._size < self._max_size:
+                    break
+
+    def update(self, value: float) -> None:
+        """
+        Add one value to the sketch
+
+        :param value: value to add
+        """
+        self._compactors[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: 'KLLSketch') -> None:
+        """
+        Merge the values summarized by another sketch into this one
+
+        :param other: sketch to merge, it is left unchanged
+        """
+        while len(self._compactors) < len(other._compactors):
+            self._grow()
+        for level, compactor in enumerate(other._compactors):
+            self._compactors[level].extend(compactor)
+        self.count += other.count
+        self._size = sum(len(compactor) for compactor in self._compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Turn the sketch into a JSON-serializable dictionary
+
+        :return: a dictionary with k, the number of values seen and the items of each compactor
+        """
+        return {'k': self.k, 'count': self.count, 'compactors': [compactor.tolist() for compactor in self._compactors]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], seed: int = None) -> 'KLLSketch':
+        """
+        Create a sketch from a dictionary returned by ``to_dict``
+
+        :param data: dictionary of the sketch
+        :param seed: seed of the random offsets of the following compactions
+        :return: the sketch, which can keep being updated and merged
+        """
+        sketch = cls(data['k'], seed)
+        while len(sketch._compactors) < len(data['compactors']):
+            sketch._grow()
+        for level, items in enumerate(data['compactors']):
+            sketch._compactors[level].extend(items)
+        sketch.count = data['count']
+        sketch._size = sum(len(compactor) for compactor in sketch._compactors)
+        return sketch
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """
+        Approximate quantiles of the values added to the sketch
+
+        ----
+
+        Items are sorted with their weights and laid out as if each was repeated weight times, quantiles are then
+        located and interpolated the same way ``quantile.quantiles`` does, so a sketch that has not compacted anything
+        yet return exact results
+
+        :param qs: quantiles to compute, each between 0-1
+        :return: value of each quantile, in the order of qs, None if no value has been added
+        :raise: ValueError if a quantile is not between 0-1
+        """
+        for q in qs:
+            if q < 0 or q > 1:
+                raise ValueError("Quantile value must be between 0-1")
+        if not self.count:
+            return [None for _ in qs]
+        weighted = sorted((value, 1 << level) for level, compactor in enumerate(self._compactors)
+                          for value in compactor)
+        last = sum(weight for _, weight in weighted) - 1
+        positions = sorted(set(rank for q in qs for rank in (math.floor(q * last), math.ceil(q * last))))
+        located = {}
+        index, covered = 0, weighted[0][1]
+        for position in positions:
+            while covered <= position:
+                index += 1
+                covered += weighted[index][1]
+            located[position] = weighted[index][0]
+        results = []
+        for q in qs:
+            low = math.floor(q * last)
+            high = math.ceil(q * last)
+            results.append(located[low] + (located[high] - located[low]) * (q * last - low))
+        return results
+
+
+class SpaceSaving:
+    """
+    Heavy-hitters summary with bounded memory (Space-Saving)
+
+    ----
+
+    At most capacity values are counted, when a new value arrive and the summary is full, the value with the smallest
+    count is evicted and the new value take over its count, which is recorded as the new value's error
+
+    |  The count of a value is therefore never under-estimated and is over-estimated by at most its error, and any
+    value appearing more than 1 / capacity of the time is guaranteed to be in the summary
+
+    |  The smallest count is found with a heap of (count, value) entries, entries made stale by later increments are
+    skipped when popped, and the heap is rebuilt when stale entries outnumber the live ones
+    """
+
+    def __init__(self, capacity: int = 1000) -> None:
+        """
+        Class constructor
+
+        :param capacity: maximum number of values counted
+        :raise: ValueError if capacity is less than 1
+        """
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self.count = 0
+        self._counters = {}
+        self._heap = []
+
+    def _rebuild(self) -> None:
+        """ Rebuild the heap from the live counters, dropping every stale entry """
+        self._heap = [(counter[0], value) for value, counter in self._counters.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[Any, List[int]]:
+        """
+        Remove the value with the smallest count from the summary
+
+        :return: the evicted value and its [count, error] counter
+        """
+        while True:
+            count, value = heapq.heappop(self._heap)
+            counter = self._counters.get(value)
+            if counter is not None and counter[0] == count:
+                del self._counters[value]
+                return value, counter
+
+    def update(self, value: Any) -> None:
+        """
+        Count one occurrence of a value
+
+        :param value: value to count, must be hashable and comparable with the other values
+        """
+        self.count += 1
+        counter = self._counters.get(value)
+        if counter is None:
+            if len(self._counters) < self.capacity:
+                counter = [0, 0]
+            else:
+                _, evicted = self._pop_min()
+                counter = [evicted[0], evicted[0]]
+            self._counters[value] = counter
+        counter[0] += 1
+        heapq.heappush(self._heap, (counter[0], value))
+        if len(self._heap) > 2 * self.capacity:
+            self._rebuild()
+
+    def merge(self, other: 'SpaceSaving') -> None:
+        """
+        Merge the values counted by another summary into this one
+
+        ----
+
+        Counts of values in both summaries are added, a value missing from a full summary may have been evicted from it,
+        so the smallest count of that summary is added to both its count and error. Only the capacity values with the
+        biggest counts are then kept
+
+        :param other: summary to merge, it is left unchanged
+        """
+        own_floor = min((counter[0] for counter in self._counters.values()), default=0) \
+            if len(self._counters) >= self.capacity else 0
+        other_floor = min((counter[0] for counter in other._counters.values()), default=0) \
+            if len(other._counters) >= other.capacity else 0
+        merged = {}
+        for value in list(self._counters) + [value for value in other._counters if value not in self._counters]:
+            own = self._counters.get(value, [own_floor, own_floor])
+            theirs = other._counters.get(value, [other_floor, other_floor])
+            merged[value] = [own[0] + theirs[0], own[1] + theirs[1]]
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0])
+        self._counters = dict(kept)
+        self.count += other.count
+        self._rebuild()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Turn the summary into a JSON-serializable dictionary
+
+        :return: a dictionary with the capacity, the number of values counted and the [count, error] of each value
+        """
+        return {'capacity': self.capacity, 'count': self.count,
+                'counters': {value: list(counter) for value, counter in self._counters.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SpaceSaving':
+        """
+        Create a summary from a dictionary returned by ``to_dict``
+
+        :param data: dictionary of the summary
+        :return: the summary, which can keep being updated and merged
+        """
+        summary = cls(data['capacity'])
+        summary.count = data['count']
+        summary._counters = {value: list(counter) for value, counter in data['counters'].items()}
+        summary._rebuild()
+        return summary
+
+    def top(self, k: int = 1) -> List[Tuple[Any, int, int]]:
+        """
+        The most frequent values counted by the summary
+
+        :param k: number of values to return
+        :return: list of (value, count, error) tuples sorted by count, most frequent first, the true count of each
+                 value is between count - error and count
+        """
+        top = heapq.nlargest(k, self._counters.items(), key=lambda item: item[1][0])
+        return [(value, counter[0], counter[1]) for value, counter in top]
+
+    @property
+    def mode(self) -> Any:
+        """
+        Most frequent value counted by the summary
+
+        :return: the value with the biggest count, None if nothing has been counted
+        """
+        top = self.top(1)
+        return top[0][0] if top else None
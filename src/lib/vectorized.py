@@ -0,0 +1,328 @@
+import csv
+from collections import Counter
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from .accumulator import RunningStats
+from .profile import DataType, ColumnProfile
+from .sketch import SpaceSaving
+from .expression import Program
+from .projection import read_rows
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# whether the NumPy backend can be used
+HAS_NUMPY = np is not None
+
+# number of rows turned into arrays at once, big enough to amortize the per-array overhead
+BLOCK_ROWS = 1 << 16
+
+
+def read_blocks(file: str, delimiter: str = ',', block_rows: int = BLOCK_ROWS, positions: Sequence[int] = None,
+                quote_free: bool = None) -> Iterator[List[List[str]]]:
+    """
+    Read the rows of a data file by blocks
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param block_rows: maximum number of rows of each block
+    :param positions: if specified, only the fields at these positions are parsed, see ``projection.project_lines``
+    :param quote_free: whether the file hold no quote, if not specified, it is guessed from a sample of the file, see
+                       ``projection.read_rows``
+    :return: generator of blocks of rows, as lists of values, fieldnames row and blank rows excluded
+    """
+    rows = read_rows(file, delimiter, positions, quote_free)
+    block = list(islice(rows, block_rows))
+    while block:
+        yield block
+        block = list(islice(rows, block_rows))
+
+
+def column_values(block: Sequence[Sequence[str]], index: int) -> List[Optional[str]]:
+    """
+    Take the values of one attribute out of a block of rows
+
+    :param block: rows, as lists of values
+    :param index: position of the attribute in the rows
+    :return: value of the attribute in each row, None for rows too short to have it
+    """
+    return [row[index] if index < len(row) else None for row in block]
+
+
+def missing_mask(values: Sequence[Optional[str]]) -> 'np.ndarray':
+    """
+    Flag the missing values of an attribute
+
+    ----
+
+    NaN can't tell a missing value from a literal NaN of the file, ex: ``nan``, which ``float`` parse and
+    ``ColumnProfile.update`` accumulate, so missing values are tracked by this mask instead
+
+    :param values: raw string values, empty string or None for missing values
+    :return: boolean array, True for the missing values
+    """
+    return np.array([value == '' or value is None for value in values], dtype=bool)
+
+
+def _is_number(value: str) -> bool:
+    """
+    Tell whether a value is parsed by ``float``, as ``ColumnProfile.update`` parse it
+
+    :param value: raw string value
+    :return: whether the value is a number, NaN included
+    """
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def to_array(values: Sequence[Optional[str]], strict: bool = True) -> 'np.ndarray':
+    """
+    Convert raw values of a NUMERIC attribute to a float64 array, missing values are turned into NaN, see
+    ``missing_mask`` to tell them from literal NaN
+
+    :param values: raw string values, empty string or None for missing values
+    :param strict: whether a value which is not a number is an error, if not, it is turned into NaN as well
+    :return: array of the values
+    :raise: TypeError if strict and one of the values is not NUMERIC
+    """
+    prepared = ['nan' if value == '' or value is None else value for value in values]
+    try:
+        return np.array(prepared, dtype=np.float64)
+    except ValueError:
+        if strict:
+            raise TypeError(f"Data type is not {DataType.NUMERIC.name}") from None
+    numbers = np.empty(len(prepared), dtype=np.float64)
+    for index, value in enumerate(prepared):
+        try:
+            numbers[index] = float(value)
+        except ValueError:
+            numbers[index] = np.nan
+    return numbers
+
+
+def from_array(numbers: 'np.ndarray', mask: 'np.ndarray', missing: Any = '') -> List[Any]:
+    """
+    Convert an array back to values to write, flagged values are turned into missing values
+
+    :param numbers: float64 array
+    :param mask: boolean array, True for the values which are missing, other NaN are written as NaN
+    :param missing: value written in place of the flagged values
+    :return: list of Python floats, missing in place of the flagged values
+    """
+    values = numbers.astype(object)
+    values[mask] = missing
+    return values.tolist()
+
+
+class ArrayColumnProfile(ColumnProfile):
+    """
+    Statistics of a single attribute, accumulated block by block with NumPy
+
+    ----
+
+    Give the same results as ``ColumnProfile`` except for float rounding, but NUMERIC values of each block are converted
+    and aggregated as a whole array instead of one by one, and exact quantiles are selected with ``numpy.quantile``
+
+    |  The data type is still decided by the first non-empty value of the attribute, and literal NaN values, ex:
+    ``nan``, are accumulated like ``ColumnProfile.update`` does, only values which are not numbers are skipped
+    """
+
+    def update_block(self, values: Sequence[Optional[str]], first_row: int) -> None:
+        """
+        Accumulate consecutive values of this attribute
+
+        :param values: raw string values read from the data file, empty string or None for missing values
+        :param first_row: index of the row the first value belong to, start at 0 and exclude fieldnames row
+        """
+        self.rows += len(values)
+        present = [value for value in values if value != '' and value is not None]
+        if len(present) < len(values):
+            self.missing += len(values) - len(present)
+            for row_number, value in enumerate(values, first_row):
+                if value == '' or value is None:
+                    self.missing_rows.add(row_number)
+        if not present:
+            return
+        if self.data_type == DataType.UNKNOWN:
+            try:
+                float(present[0])
+                self.data_type = DataType.NUMERIC
+            except ValueError:
+                self.data_type = DataType.CATEGORICAL
+        if self._distributions:
+            if isinstance(self._frequency, SpaceSaving):
+                for value in present:
+                    self._frequency.update(value)
+            else:
+                for value, count in Counter(present).items():
+                    self._frequency[value] = self._frequency.get(value, 0) + count
+        if self.data_type != DataType.NUMERIC:
+            return
+        numbers = to_array(present, strict=False)
+        nan = np.isnan(numbers)
+        if nan.any():
+            keep = ~nan
+            for index in np.flatnonzero(nan).tolist():
+                keep[index] = _is_number(present[index])
+            numbers = numbers[keep]
+            nan = nan[keep]
+        if not len(numbers):
+            return
+        mean = float(numbers.mean())
+        self._stats.merge(RunningStats(len(numbers), mean, float(np.square(numbers - mean).sum())))
+        self.total += float(numbers.sum())
+        if nan[0]:
+            low = high = float(numbers[0])
+        else:
+            low = float(np.nanmin(numbers))
+            high = float(np.nanmax(numbers))
+        if self.min is None or low < self.min:
+            self.min = low
+        if self.max is None or high > self.max:
+            self.max = high
+        if self._sketch is not None:
+            for number in numbers.tolist():
+                self._sketch.update(number)
+        elif self._distributions:
+            self._values.frombytes(numbers.tobytes())
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """
+        Quantiles of the NUMERIC attribute, empty values are skipped
+
+        :param qs: quantiles to compute, each between 0-1
+        :return: value of each quantile, in the order of qs, None if the attribute is not NUMERIC
+        :raise: ValueError if a quantile is not between 0-1
+        """
+        if self.data_type != DataType.NUMERIC or self._sketch is not None or not self._values:
+            return super().quantiles(qs)
+        values = np.frombuffer(self._values, dtype=np.float64)
+        if np.isnan(values).any():
+            return super().quantiles(qs)
+        for q in qs:
+            if q < 0 or q > 1:
+                raise ValueError("Quantile value must be between 0-1")
+        return np.quantile(values, list(qs)).tolist()
+
+
+def profile(file: str, delimiter: str = ',', columns: Iterable[str] = None, distributions: bool = True,
+            quantile_error: float = None, mode_capacity: int = None,
+            quote_free: bool = None) -> Dict[str, ColumnProfile]:
+    """
+    Compute the profile of every attribute of a data file in a single read, with NumPy
+
+    ----
+
+    Same as ``profile.profile``, but rows are read by blocks and the values of each attribute in a block are profiled
+    together by an ``ArrayColumnProfile``
+
+    :param file: name of the data file
+    :param delimiter: delimiter of each value in the file
+    :param columns: names of the attributes to profile, if not specified, all attributes will be profiled
+    :param distributions: whether to keep what median and mode need
+    :param quantile_error: if specified, quantiles are approximated with this normalized rank error
+    :param mode_capacity: if specified, modes are approximated by counting at most this many distinct values
+    :param quote_free: whether the file hold no quote, if not specified, it is guessed from a sample of the file
+    :return: a dictionary which hold key-value pair, in the order of the file's fieldnames:
+                key: name of the attribute
+                value: profile of this attribute
+    :raise: AttributeError if one of the given columns is not an attribute of the file
+    """
+    with open(file, 'r') as csv_file:
+        fieldnames = next(csv.reader(csv_file, delimiter=delimiter), [])
+    names = list(fieldnames) if columns is None else list(columns)
+    for name in names:
+        if name not in fieldnames:
+            raise AttributeError(f"No such attribute: {name}")
+    profiles = {name: ArrayColumnProfile(name, distributions, quantile_error, mode_capacity)
+                for name in fieldnames if name in names}
+    targets = [(fieldnames.index(name), column) for name, column in profiles.items()]
+    positions = None
+    if len(targets) < len(fieldnames):
+        positions = [index for index, _ in targets]
+        targets = list(enumerate(profiles.values()))
+    first_row = 0
+    for block in read_blocks(file, delimiter, positions=positions, quote_free=quote_free):
+        for index, column in targets:
+            column.update_block(column_values(block, index), first_row)
+        first_row += len(block)
+    return profiles
+
+
+def z_score(numbers: 'np.ndarray', mean: float, standard_deviation: float) -> 'np.ndarray':
+    """
+    Re-scale an array with the z-score normalization, NaN are left NaN, everything is 0 if the deviation is 0, missing
+    values included, they are told apart with ``missing_mask``
+
+    :param numbers: values of the attribute
+    :param mean: mean of the attribute
+    :param standard_deviation: standard deviation of the attribute
+    :return: re-scaled values
+    """
+    if not standard_deviation:
+        return np.zeros_like(numbers)
+    return (numbers - mean) / standard_deviation
+
+
+def min_max(numbers: 'np.ndarray', _min: float, _max: float) -> 'np.ndarray':
+    """
+    Re-scale an array with the min-max normalization, NaN are left NaN, everything is 0 if min and max are equal,
+    missing values included, they are told apart with ``missing_mask``
+
+    :param numbers: values of the attribute
+    :param _min: min of the attribute
+    :param _max: max of the attribute
+    :return: re-scaled values
+    """
+    if _max == _min:
+        return np.zeros_like(numbers)
+    return (numbers - _min) / (_max - _min)
+
+
+def evaluate_program(program: Program, arrays: Dict[str, 'np.ndarray'], masks: Dict[str, 'np.ndarray'],
+                     size: int) -> List[Tuple['np.ndarray', 'np.ndarray']]:
+    """
+    Evaluate the formulas of a program on whole arrays
+
+    ----
+
+    A result is missing if one of its operands is missing or if it divide by zero, like the row evaluator return None,
+    missing results are tracked in a mask next to each array, so a literal NaN operand still give a NaN result, and
+    each shared sub-expression is computed once for the whole block
+
+    :param program: program to evaluate, as returned by ``expression.plan_formulas``
+    :param arrays: values of each attribute loaded by the program, all of the same length
+    :param masks: missing values of each attribute loaded by the program, see ``missing_mask``
+    :param size: length of the arrays, the number of rows evaluated
+    :return: value of each formula for each position and the mask of its missing values, in the order of the formulas
+    """
+    slots = {slot: arrays[name] for slot, name in program.loads.items()}
+    slots.update((slot, np.full(size, value)) for slot, value in program.constants.items())
+    missing = {slot: masks[name] for slot, name in program.loads.items()}
+    missing.update((slot, np.zeros(size, dtype=bool)) for slot in program.constants)
+    for slot, (item, slot_a, slot_b) in program.steps.items():
+        operand_a = slots[slot_a]
+        if item == 'neg':
+            slots[slot] = -operand_a
+            missing[slot] = missing[slot_a]
+            continue
+        operand_b = slots[slot_b]
+        missing[slot] = missing[slot_a] | missing[slot_b]
+        if item == '+':
+            slots[slot] = operand_a + operand_b
+        elif item == '-':
+            slots[slot] = operand_a - operand_b
+        elif item == '*':
+            slots[slot] = operand_a * operand_b
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = operand_a / operand_b
+            result[operand_b == 0] = np.nan
+            slots[slot] = result
+            missing[slot] = missing[slot] | (operand_b == 0)
+    return [(slots[slot], missing[slot]) for slot in program.results.values()]
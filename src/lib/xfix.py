@@ -1,6 +1,6 @@
 import re
 from enum import Enum
-from typing import List
+from typing import List, Optional, Union
 from .stack import Stack
 
 
@@ -108,6 +108,8 @@ def infix_to_postfix(infix_seq: str) -> List:
         1. Parse input string to get list contain separated operand and operand (parenthesis included)
         2. Use algorithm to re-arrange that list to a list follow post-fix convention
 
+    |  Operators of the same precedence are evaluated from left to right, ex: 'a - b - c' is '(a - b) - c'
+
 
     :param infix_seq: input expression
     :return: a list of element follow the post-fix convention
@@ -120,7 +122,7 @@ def infix_to_postfix(infix_seq: str) -> List:
             output_stack.push(item)
         else:
             if type_of(item) == EquationType.OPERATOR:
-                while not operator_stack.is_empty() and operator[item]['precede'] < operator[operator_stack.top()][
+                while not operator_stack.is_empty() and operator[item]['precede'] <= operator[operator_stack.top()][
                     'precede']:
                     output_stack.push(operator_stack.pop())
                 operator_stack.push(item)
@@ -133,3 +135,281 @@ def infix_to_postfix(infix_seq: str) -> List:
     while not operator_stack.is_empty():
         output_stack.push(operator_stack.pop())
     return output_stack.items()
+
+
+# a numeric literal, ex: 2, 0.5, .5, 1e-3
+_NUMBER = re.compile(r'(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?')
+
+# start of a numeric literal whose exponent sign has been split from it by ``parse_infix``, ex: '1e' of '1e-3'
+_EXPONENT_START = re.compile(r'(\d+\.?\d*|\.\d+)[eE]')
+
+
+class Number:
+    """
+    Leaf of an expression tree holding a numeric literal
+    """
+
+    def __init__(self, value: float) -> None:
+        """
+        Class constructor
+
+        :param value: value of the literal
+        """
+        self.value = value
+
+
+class Attribute:
+    """
+    Leaf of an expression tree referring to an attribute of the data
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Class constructor
+
+        :param name: name of the attribute
+        """
+        self.name = name
+
+
+class Negation:
+    """
+    Node of an expression tree holding an unary minus
+    """
+
+    def __init__(self, operand: 'Node') -> None:
+        """
+        Class constructor
+
+        :param operand: negated sub-expression
+        """
+        self.operand = operand
+
+
+class Operation:
+    """
+    Node of an expression tree holding one of the operators +, -, *, /
+    """
+
+    def __init__(self, operator: str, left: 'Node', right: 'Node') -> None:
+        """
+        Class constructor
+
+        :param operator: one of '+', '-', '*', '/'
+        :param left: left operand
+        :param right: right operand
+        """
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+
+Node = Union[Number, Attribute, Negation, Operation]
+
+
+def _tokens(infix_seq: str) -> List[str]:
+    """
+    Split an expression into tokens with ``parse_infix``, then join back the exponent of numeric literals
+
+    :param infix_seq: an operation expression
+    :return: operands, operators and parentheses of the expression
+    """
+    items = parse_infix(infix_seq)
+    tokens = []
+    index = 0
+    while index < len(items):
+        item = items[index]
+        if _EXPONENT_START.fullmatch(item) and index + 2 < len(items) and items[index + 1] in ('+', '-') \
+                and items[index + 2].isdigit():
+            item = item + items[index + 1] + items[index + 2]
+            index += 2
+        tokens.append(item)
+        index += 1
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive-descent parser turning the tokens of an expression into a tree, following:
+
+    |      expression := term (('+' | '-') term)*
+    |      term       := factor (('*' | '/') factor)*
+    |      factor     := ('+' | '-') factor | number | attribute | '(' expression ')'
+    """
+
+    def __init__(self, tokens: List[str]) -> None:
+        """
+        Class constructor
+
+        :param tokens: tokens of the expression
+        """
+        self._tokens = tokens
+        self._index = 0
+
+    def _peek(self) -> Optional[str]:
+        """
+        Look at the next token without consuming it
+
+        :return: the next token, None at the end of the expression
+        """
+        return self._tokens[self._index] if self._index < len(self._tokens) else None
+
+    def _next(self) -> Optional[str]:
+        """
+        Consume the next token
+
+        :return: the next token, None at the end of the expression
+        """
+        token = self._peek()
+        self._index += 1
+        return token
+
+    def parse(self) -> Node:
+        """
+        Parse the whole expression
+
+        :return: root of the tree
+        :raise: ValueError if the expression is not well-formed
+        """
+        node = self._expression()
+        if self._peek() is not None:
+            raise ValueError(f"Invalid expression: unexpected '{self._peek()}'")
+        return node
+
+    def _expression(self) -> Node:
+        """ Parse a sum or difference of terms """
+        node = self._term()
+        while self._peek() in ('+', '-'):
+            node = Operation(self._next(), node, self._term())
+        return node
+
+    def _term(self) -> Node:
+        """ Parse a product or quotient of factors """
+        node = self._factor()
+        while self._peek() in ('*', '/'):
+            node = Operation(self._next(), node, self._factor())
+        return node
+
+    def _factor(self) -> Node:
+        """ Parse a signed factor, a literal, an attribute or a parenthesized expression """
+        token = self._next()
+        if token == '-':
+            return Negation(self._factor())
+        if token == '+':
+            return self._factor()
+        if token == '(':
+            node = self._expression()
+            if self._next() != ')':
+                raise ValueError("Invalid expression: missing ')'")
+            return node
+        if token is None or type_of(token) != EquationType.OPERAND:
+            raise ValueError(f"Invalid expression: missing operand before '{token or 'end'}'")
+        if _NUMBER.fullmatch(token):
+            return Number(float(token))
+        return Attribute(token)
+
+
+def parse_expression(infix_seq: str) -> Node:
+    """
+    Turn a math expression into a tree, support numeric literals, unary minus and parentheses
+
+    ----
+
+    Operators of the same precedence are evaluated from left to right, like ``infix_to_postfix``, and an operand made
+    only of digits, with an optional decimal part and exponent, is a numeric literal instead of an attribute's name
+
+    :param infix_seq: input expression, ex: '-(a + b) * 0.5'
+    :return: root of the expression tree
+    :raise: ValueError if the expression is not well-formed
+    """
+    return _Parser(_tokens(infix_seq)).parse()
+
+
+def _is_number(node: Node, value: float) -> bool:
+    """
+    Check whether a node is a given numeric literal
+
+    :param node: node to check
+    :param value: value of the literal
+    :return: True if the node is a literal of this value
+    """
+    return isinstance(node, Number) and node.value == value
+
+
+def _fold(operator_name: str, left: float, right: float) -> Optional[float]:
+    """
+    Compute an operation on two literals, the same way it would be computed on each row
+
+    :param operator_name: one of '+', '-', '*', '/'
+    :param left: value of the left literal
+    :param right: value of the right literal
+    :return: result of the operation, None for a division by zero, which is left to be computed on each row
+    """
+    if operator_name == '+':
+        return left + right
+    if operator_name == '-':
+        return left - right
+    if operator_name == '*':
+        return left * right
+    if right == 0:
+        return None
+    return left / right
+
+
+def optimize(node: Node) -> Node:
+    """
+    Simplify an expression tree before it is evaluated on every row
+
+    ----
+
+    Operate bottom-up:
+        - constant folding: operations on numeric literals only are computed once, ex: '2 * 3' become '6'
+        - algebraic simplification of neutral elements: 'x * 1', '1 * x', 'x / 1', 'x + 0', '0 + x' and 'x - 0'
+          become 'x', 'x * -1' and 'x / -1' become '-x', and '- -x' become 'x'
+
+    |  Rules which would turn a missing value into a number, such as 'x * 0' or 'x - x', are not applied, so a missing
+    operand still make the result missing. Common sub-expressions are merged later on, when the tree is turned into a
+    program, see ``expression.Program``
+
+    :param node: root of the tree, as returned by ``parse_expression``
+    :return: root of the simplified tree
+    """
+    if isinstance(node, Negation):
+        operand = optimize(node.operand)
+        if isinstance(operand, Number):
+            return Number(-operand.value)
+        if isinstance(operand, Negation):
+            return operand.operand
+        return Negation(operand)
+    if not isinstance(node, Operation):
+        return node
+    left = optimize(node.left)
+    right = optimize(node.right)
+    operator_name = node.operator
+    if isinstance(left, Number) and isinstance(right, Number):
+        folded = _fold(operator_name, left.value, right.value)
+        if folded is not None:
+            return Number(folded)
+    if operator_name == '+':
+        if _is_number(right, 0):
+            return left
+        if _is_number(left, 0):
+            return right
+    elif operator_name == '-':
+        if _is_number(right, 0):
+            return left
+    elif operator_name == '*':
+        if _is_number(right, 1):
+            return left
+        if _is_number(left, 1):
+            return right
+        if _is_number(right, -1):
+            return optimize(Negation(left))
+        if _is_number(left, -1):
+            return optimize(Negation(right))
+    elif operator_name == '/':
+        if _is_number(right, 1):
+            return left
+        if _is_number(right, -1):
+            return optimize(Negation(left))
+    return Operation(operator_name, left, right)
@@ -1,5 +1,7 @@
 from tabulate import tabulate
 from lib.preprocessor import DataPreprocessor, FillType, NormalizationType
+from lib.model import PreprocessingModel
+from lib.cache import ProfileCache
 import argparse
 
 
@@ -10,7 +12,9 @@ def undefined(_):
 
 def list_func(list_args):
     """ Handle list info CLI interaction """
-    processor = DataPreprocessor(list_args.file)
+    cache = None if list_args.no_cache else ProfileCache(refresh=list_args.refresh)
+    processor = DataPreprocessor(list_args.file, workers=list_args.jobs, vectorized=list_args.numpy,
+                                 incremental=list_args.incremental, cache=cache, quote_free=list_args.quote_free)
     if list_args.missing:
         table = []
         data = processor.missing_cols()
@@ -32,7 +36,8 @@ def list_func(list_args):
 
 def fill_na_func(fill_args):
     """Handle fill N/A CLI interaction"""
-    processor = DataPreprocessor(fill_args.file)
+    processor = DataPreprocessor(fill_args.file, workers=fill_args.jobs, vectorized=fill_args.numpy,
+                                 incremental=fill_args.incremental, quote_free=fill_args.quote_free)
     if fill_args.outfile:
         if not fill_args.outfile.endswith('.csv'):
             raise NameError("output filename must end with '.csv'")
@@ -42,7 +47,8 @@ def fill_na_func(fill_args):
     else:
         fill_type = FillType.MEDIAN
     print(f"filling N/A value with {fill_type.name}...")
-    processor.fill_nan(numeric_fill=fill_type, fall_back=fill_args.fallback, file_name=fill_args.outfile)
+    processor.fill_nan(numeric_fill=fill_type, fall_back=fill_args.fallback, file_name=fill_args.outfile,
+                       quantile_error=fill_args.quantile_error, mode_capacity=fill_args.mode_capacity)
     if fill_args.outfile:
         print(f"Saved to {fill_args.outfile}")
     else:
@@ -52,13 +58,15 @@ def fill_na_func(fill_args):
 
 def delete_duplicate(deldup_args):
     """Handle delete duplicate data CLI interaction"""
-    processor = DataPreprocessor(deldup_args.file)
+    processor = DataPreprocessor(deldup_args.file, workers=deldup_args.jobs, vectorized=deldup_args.numpy,
+                                 incremental=deldup_args.incremental, quote_free=deldup_args.quote_free)
     if deldup_args.outfile:
         if not deldup_args.outfile.endswith('.csv'):
             raise NameError("output filename must end with '.csv'")
     if deldup_args.type == 'row':
         print("deleting duplicate row...")
-        processor.delete_duplicate_row(deldup_args.outfile)
+        memory_budget = deldup_args.memory_budget * 2 ** 20 if deldup_args.memory_budget else None
+        processor.delete_duplicate_row(deldup_args.outfile, memory_budget=memory_budget)
     if deldup_args.outfile:
         print(f"Saved to {deldup_args.outfile}")
     else:
@@ -68,7 +76,8 @@ def delete_duplicate(deldup_args):
 
 def delete_with_threshold(delthres_args):
     """ Handle delete with threshold CLI interaction"""
-    processor = DataPreprocessor(delthres_args.file)
+    processor = DataPreprocessor(delthres_args.file, workers=delthres_args.jobs, vectorized=delthres_args.numpy,
+                                 incremental=delthres_args.incremental, quote_free=delthres_args.quote_free)
     if delthres_args.outfile:
         if not delthres_args.outfile.endswith('.csv'):
             raise NameError("output filename must end with '.csv'")
@@ -90,8 +99,9 @@ def delete_with_threshold(delthres_args):
 
 
 def normalization(norm_args):
-    """ Handle normalization on a NUMERIC attribute CLI interaction"""
-    processor = DataPreprocessor(norm_args.file)
+    """ Handle normalization on NUMERIC attributes CLI interaction"""
+    processor = DataPreprocessor(norm_args.file, workers=norm_args.jobs, vectorized=norm_args.numpy,
+                                 incremental=norm_args.incremental, quote_free=norm_args.quote_free)
     if norm_args.outfile:
         if not norm_args.outfile.endswith('.csv'):
             raise NameError("output filename must end with '.csv'")
@@ -114,12 +124,18 @@ def normalization(norm_args):
 
 def attribute_calculation(calc_args):
     """ Handle attributes calculations on a NUMERIC attribute CLI interaction"""
-    processor = DataPreprocessor(calc_args.file)
+    processor = DataPreprocessor(calc_args.file, workers=calc_args.jobs, vectorized=calc_args.numpy,
+                                 incremental=calc_args.incremental, quote_free=calc_args.quote_free)
     if calc_args.outfile:
         if not calc_args.outfile.endswith('.csv'):
             raise NameError("output filename must end with '.csv'")
-    processor.attributes_calculation(calc_str=calc_args.calc_string, col_name=calc_args.attribute_name,
-                                     file_name=calc_args.outfile)
+    attribute_names = calc_args.attribute_name or []
+    if attribute_names and len(attribute_names) != len(calc_args.calc_string):
+        raise ValueError("each calc-string must be given an attribute-name, or none of them")
+    formulas = {}
+    for index, calc_string in enumerate(calc_args.calc_string):
+        formulas[attribute_names[index] if attribute_names else calc_string.replace(' ', '')] = calc_string
+    processor.attributes_calculation(calc_str=formulas, file_name=calc_args.outfile)
     if calc_args.outfile:
         print(f"Saved to {calc_args.outfile}")
     else:
@@ -127,6 +143,59 @@ def attribute_calculation(calc_args):
     print("done!")
 
 
+def fit(fit_args):
+    """ Handle fitting a preprocessing model CLI interaction"""
+    processor = DataPreprocessor(fit_args.file, workers=fit_args.jobs, vectorized=fit_args.numpy,
+                                 incremental=fit_args.incremental, quote_free=fit_args.quote_free)
+    if not fit_args.model.endswith('.json'):
+        raise NameError("model filename must end with '.json'")
+    fill_type = None
+    if fit_args.filltype == 'mean':
+        fill_type = FillType.MEAN
+    elif fit_args.filltype == 'median':
+        fill_type = FillType.MEDIAN
+    elif fit_args.filltype == 'mode':
+        fill_type = FillType.MODE
+    normalization_type = None
+    if fit_args.type == 'min-max':
+        normalization_type = NormalizationType.MIN_MAX
+    elif fit_args.type == 'z-score':
+        normalization_type = NormalizationType.Z_SCORE
+    print("fitting preprocessing model...")
+    model = processor.fit(numeric_fill=fill_type, normalization=fit_args.attribute,
+                          normalization_type=normalization_type, fall_back=fit_args.fallback,
+                          quantile_error=fit_args.quantile_error, mode_capacity=fit_args.mode_capacity)
+    model.save(fit_args.model)
+    print(f"Saved to {fit_args.model}")
+    print("done!")
+
+
+def apply(apply_args):
+    """ Handle applying a preprocessing model CLI interaction"""
+    processor = DataPreprocessor(apply_args.file, workers=apply_args.jobs, vectorized=apply_args.numpy,
+                                 incremental=apply_args.incremental, quote_free=apply_args.quote_free)
+    if apply_args.outfile:
+        if not apply_args.outfile.endswith('.csv'):
+            raise NameError("output filename must end with '.csv'")
+    model = PreprocessingModel.load(apply_args.model)
+    print(f"applying preprocessing model {apply_args.model}...")
+    processor.transform(model, file_name=apply_args.outfile)
+    if apply_args.outfile:
+        print(f"Saved to {apply_args.outfile}")
+    else:
+        print(f"Saved to {apply_args.file}")
+    print("done!")
+
+
+def compile_data(compile_args):
+    """ Handle compiling the data to a columnar file CLI interaction"""
+    processor = DataPreprocessor(compile_args.file, workers=compile_args.jobs, vectorized=compile_args.numpy,
+                                 incremental=compile_args.incremental, quote_free=compile_args.quote_free)
+    print("compiling data to columnar file...")
+    print(f"Saved to {processor.compile()}")
+    print("done!")
+
+
 if __name__ == '__main__':
     """Entry point to interact with the processor class, handle CLI"""
 
@@ -134,7 +203,18 @@ if __name__ == '__main__':
     main_parser = argparse.ArgumentParser(description="Simple program to do csv file pre-processing",
                                           epilog="Thank you for using", allow_abbrev=False, )
     main_parser.add_argument('-f', '--file', help="name of the data file to be pre-processed", action='store',
-                             required=True, metavar='')
+                             required=True, metavar='FILE')
+    main_parser.add_argument('-j', '--jobs', type=int, default=1,
+                             help="number of processes used to scan the data file, default to 1", metavar='N')
+    main_parser.add_argument('-np', '--numpy', action='store_true',
+                             help="compute on NUMERIC attributes as whole arrays with NumPy, an optional dependency, "
+                                  "a warning is printed and the default implementation used if it is not installed")
+    main_parser.add_argument('-inc', '--incremental', action='store_true',
+                             help="keep the statistics of the data file in a sidecar file next to it, so following "
+                                  "runs only read the rows appended since then")
+    main_parser.add_argument('-qf', '--quote-free', action='store_const', const=True, default=None,
+                             help="the data file hold no quote, split it without the csv module, which still take over "
+                                  "if a quote is found, default to guessing it from a sample of the file")
     main_parser.add_argument('-v', '--version', action='version', version='preprocessor version 1.0.0', )
     main_parser.set_defaults(func=undefined)
 
@@ -149,19 +229,30 @@ if __name__ == '__main__':
     list_parser.add_argument('-mr', '--missing-rows', help="list missing rows", action='store_true')
     list_parser.add_argument('-mc', '--missing-cols', help="list missing columns", action='store_true')
     list_parser.add_argument('-m', '--missing', help="list missing info", action='store_true')
+    list_parser.add_argument('-nc', '--no-cache', action='store_true',
+                             help="do not read nor save the profile of the data in the profile cache")
+    list_parser.add_argument('-r', '--refresh', action='store_true',
+                             help="profile the data again even if it is in the profile cache, and replace it there")
     list_parser.set_defaults(func=list_func)
 
     # fill nan value: 3
-    # fill_nan(self, numeric_fill: FillType, fall_back: str = '0', file_name: str = None) -> None
+    # fill_nan(self, numeric_fill: FillType, fall_back: str = '0', file_name: str = None, buffer_size: int = 1000,
+    #          quantile_error: float = None, mode_capacity: int = None) -> None
     fill_parser = sub_parsers.add_parser("fill", help="fill the missing N/A value of the data with specified type")
     fill_parser.add_argument("-ft", '--filltype',
                              help="set the fill type for NUMERIC value, must be one of [mean, median]", required=True,
-                             choices=["mean", "median"], metavar='')
+                             choices=["mean", "median"], metavar='TYPE')
     fill_parser.add_argument("-fb", "--fallback", help="set fallback value if fill failed, default value will be '0'",
-                             metavar='', default='0')
+                             metavar='VALUE', default='0')
+    fill_parser.add_argument("-qe", "--quantile-error", type=float,
+                             help="approximate medians with this rank error (ex: 0.01) using bounded memory, "
+                                  "if not specified, medians are exact", metavar='ERROR')
+    fill_parser.add_argument("-mcp", "--mode-capacity", type=int,
+                             help="approximate modes by counting at most this many distinct values (ex: 1000) of each "
+                                  "attribute, if not specified, modes are exact", metavar='N')
     fill_parser.add_argument("-o", "--outfile",
                              help="set the name of the output file, if not specified, the current file will be "
-                                  "overwritten", metavar='')
+                                  "overwritten", metavar='FILE')
     fill_parser.set_defaults(func=fill_na_func)
 
     # delete with threshold: 4, 5
@@ -172,61 +263,118 @@ if __name__ == '__main__':
     delete_with_threshold_parser.add_argument('-t', '--type', choices=['row', 'col'],
                                               help='type of deletion to performed, on attributes (col) or rows (row),'
                                                    ' must be one of ["row", "col"]',
-                                              required=True, metavar='')
+                                              required=True, metavar='TYPE')
     delete_with_threshold_parser.add_argument('-ti', '--threshold-int', type=int, default=1,
                                               help="threshold to delete using count, "
                                                    "if missing rows or cols is bigger than this threshold, "
-                                                   "it will be deleted, default to 1 ", metavar='')
+                                                   "it will be deleted, default to 1 ", metavar='N')
     delete_with_threshold_parser.add_argument('-tp', '--threshold-percentage', type=float,
                                               help="threshold to delete using percentage, "
                                                    "if missing rows or cols is bigger than this threshold, "
                                                    "it will be deleted, threshold-int will be ignored if this is set, "
                                                    "the float value must be between 0-1",
-                                              metavar='')
+                                              metavar='PCT')
     delete_with_threshold_parser.add_argument("-o", "--outfile",
                                               help="set the name of the output file, if not specified, the current "
-                                                   "file will be overwritten", metavar='')
+                                                   "file will be overwritten", metavar='FILE')
     delete_with_threshold_parser.set_defaults(func=delete_with_threshold)
 
     # delete duplicate: 6
-    # delete_duplicate_row(self, file_name: str = None) -> None
+    # delete_duplicate_row(self, file_name: str = None, buffer_size: int = 1000, memory_budget: int = None,
+    #                      workers: int = None) -> None
     delete_duplicate_parser = sub_parsers.add_parser("deldup", help="delete duplicate data")
     delete_duplicate_parser.add_argument('-t', '--type', choices=['row'],
                                          help='choose the type of duplicate deletion, must be one of ["row"]',
-                                         metavar='', required=True)
+                                         metavar='TYPE', required=True)
+    delete_duplicate_parser.add_argument("-mb", "--memory-budget", type=int,
+                                         help="maximum memory in MB used to remember seen rows, if rows are not "
+                                              "expected to fit, they are spilled to temporary files on disk",
+                                         metavar='MB')
     delete_duplicate_parser.add_argument("-o", "--outfile",
                                          help="set the name of the output file, if not specified, the current file "
-                                              "will be overwritten", metavar='')
+                                              "will be overwritten", metavar='FILE')
     delete_duplicate_parser.set_defaults(func=delete_duplicate)
 
     # normalization: 7
-    # normalization(self, attribute: str, normalization_type: NormalizationType, file_name: str = None) -> None
-    norm_parser = sub_parsers.add_parser('norm', help="perform normalization on a given NUMERIC attribute")
+    # normalization(self, attribute: Union[str, Iterable[str], Dict[str, NormalizationType]] = None,
+    #               normalization_type: NormalizationType = None, file_name: str = None, buffer_size: int = 1000) -> None
+    norm_parser = sub_parsers.add_parser('norm', help="perform normalization on given NUMERIC attributes")
     norm_parser.add_argument('-t', '--type', choices=['min-max', 'z-score'], required=True,
-                             help="select the type of normalization, must be one of ['min-max', 'z-score']", metavar='')
-    norm_parser.add_argument('-a', '--attribute', required=True,
-                             help="name of a given NUMERIC attribute to perform normalization", metavar='')
+                             help="select the type of normalization, must be one of ['min-max', 'z-score']",
+                             metavar='TYPE')
+    norm_parser.add_argument('-a', '--attribute', action='append',
+                             help="name of a given NUMERIC attribute to perform normalization, can be repeated to "
+                                  "normalize several attributes in one pass, if not specified, every NUMERIC attribute "
+                                  "will be normalized", metavar='ATTRIBUTE')
     norm_parser.add_argument("-o", "--outfile",
                              help="set the name of the output file, if not specified, the current file "
-                                  "will be overwritten", metavar='')
+                                  "will be overwritten", metavar='FILE')
     norm_parser.set_defaults(func=normalization)
 
     # attribute calc: 8
-    # attributes_calculation(self, calc_str: str, col_name: str = None, file_name: str = None) -> None
+    # attributes_calculation(self, calc_str: Union[str, Dict[str, str]], col_name: str = None, file_name: str = None,
+    #                        buffer_size: int = 1000) -> None
     attribute_calc_parser = sub_parsers.add_parser('acalc',
                                                    help='perform attributes calculations on NUMERIC attributes')
-    attribute_calc_parser.add_argument('-c', '--calc-string', required=True,
+    attribute_calc_parser.add_argument('-c', '--calc-string', required=True, action='append',
                                        help="operations to perform, must contain correct attribute names in the data, "
                                             "only support + - * /, calc_string must be inside '', "
-                                            "ex: '(atr1 + atr2) * atr3'", metavar='')
-    attribute_calc_parser.add_argument('-a', '--attribute-name',
+                                            "ex: '(atr1 + atr2) * atr3', can be repeated to compute several attributes "
+                                            "in one pass, each one can use the attributes computed before it",
+                                       metavar='CALC')
+    attribute_calc_parser.add_argument('-a', '--attribute-name', action='append',
                                        help='name of the attribute to store calculations results, if not specified, '
-                                            'the calc-string will be used as the new attribute\'s name', metavar='')
+                                            'the calc-string will be used as the new attribute\'s name, must be '
+                                            'repeated once for each calc-string if used', metavar='NAME')
     attribute_calc_parser.add_argument("-o", "--outfile",
                                        help="set the name of the output file, if not specified, the current file "
-                                            "will be overwritten", metavar='')
+                                            "will be overwritten", metavar='FILE')
     attribute_calc_parser.set_defaults(func=attribute_calculation)
 
+    # fit a preprocessing model: 9
+    # fit(self, numeric_fill: FillType = None,
+    #     normalization: Union[str, Iterable[str], Dict[str, NormalizationType]] = None,
+    #     normalization_type: NormalizationType = None, fall_back: str = '0', quantile_error: float = None,
+    #     mode_capacity: int = None) -> PreprocessingModel
+    fit_parser = sub_parsers.add_parser('fit', help="compute fill values and normalization parameters of the data "
+                                                    "and save them as a JSON model")
+    fit_parser.add_argument("-ft", '--filltype', choices=["mean", "median", "mode"],
+                            help="fill type for NUMERIC value, must be one of [mean, median, mode], if not specified, "
+                                 "the model does not fill missing values", metavar='TYPE')
+    fit_parser.add_argument("-fb", "--fallback", help="set fallback value if fill failed, default value will be '0'",
+                            metavar='VALUE', default='0')
+    fit_parser.add_argument('-t', '--type', choices=['min-max', 'z-score'],
+                            help="type of normalization, must be one of ['min-max', 'z-score'], if not specified, the "
+                                 "model does not normalize", metavar='TYPE')
+    fit_parser.add_argument('-a', '--attribute', action='append',
+                            help="name of a NUMERIC attribute to normalize, can be repeated, if not specified, every "
+                                 "NUMERIC attribute will be normalized", metavar='ATTRIBUTE')
+    fit_parser.add_argument("-qe", "--quantile-error", type=float,
+                            help="approximate medians with this rank error (ex: 0.01) using bounded memory, "
+                                 "if not specified, medians are exact", metavar='ERROR')
+    fit_parser.add_argument("-mcp", "--mode-capacity", type=int,
+                            help="approximate modes by counting at most this many distinct values (ex: 1000) of each "
+                                 "attribute, if not specified, modes are exact", metavar='N')
+    fit_parser.add_argument('-m', '--model', required=True, help="name of the JSON file to save the model to",
+                            metavar='FILE')
+    fit_parser.set_defaults(func=fit)
+
+    # apply a preprocessing model: 10
+    # transform(self, model: PreprocessingModel, file_name: str = None, buffer_size: int = 1000) -> None
+    apply_parser = sub_parsers.add_parser('apply', help="fill and normalize the data with a model saved by fit, "
+                                                        "in a single pass")
+    apply_parser.add_argument('-m', '--model', required=True, help="name of the JSON file of the model", metavar='FILE')
+    apply_parser.add_argument("-o", "--outfile",
+                              help="set the name of the output file, if not specified, the current file "
+                                   "will be overwritten", metavar='FILE')
+    apply_parser.set_defaults(func=apply)
+
+    # compile to columnar file: 11
+    # compile(self) -> str
+    compile_parser = sub_parsers.add_parser('compile', help="convert the data into a binary columnar file next to it, "
+                                                            "read instead of the data while it is unchanged")
+    compile_parser.set_defaults(func=compile_data)
+
     # run the parser
     args = main_parser.parse_args()
     args.func(args)